@@ -3,6 +3,7 @@ import numpy as np
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from models import AirQualityData, Anomaly
+import rollups
 import logging
 
 logger = logging.getLogger(__name__)
@@ -74,6 +75,15 @@ class AnomalyDetector:
     def _get_last_24h_average(self, latitude: float, longitude: float) -> Dict[str, float]:
         """Son 24 saatlik ortalamayı hesaplar"""
         last_24h = datetime.utcnow() - timedelta(hours=24)
+        
+        # Saatlik özet varsa ham satırlar yerine hücre özetleri okunur
+        if rollups.is_available():
+            try:
+                return rollups.window_averages(self.db, latitude, longitude, since=last_24h, tolerance=0.1)
+            except Exception as e:
+                self.db.rollback()
+                logger.warning(f"Saatlik özetten ortalama alınamadı, ham veri kullanılıyor: {str(e)}")
+        
         data = self.db.query(AirQualityData).filter(
             AirQualityData.latitude.between(latitude - 0.1, latitude + 0.1),
             AirQualityData.longitude.between(longitude - 0.1, longitude + 0.1),
@@ -7,6 +7,11 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Union
 import time
 
+from hourly_store import HourlySeriesStore
+from ttl_cache import TTLCache
+from rate_limiter import TokenBucketRateLimiter
+from disk_cache import DiskCache
+
 # Loglama yapılandırması
 logging.basicConfig(
     level=logging.INFO,
@@ -16,21 +21,75 @@ logger = logging.getLogger("api_client")
 
 class AirQualityClient:
     
-    def __init__(self):
+    def __init__(self, base_url: Optional[str] = None):
         """
-        Open-Meteo API için istemci başlatır
+        Open-Meteo API için istemci başlatır.
+        base_url verilmezse AIR_QUALITY_API_URL ortam değişkeni, o da yoksa Open-Meteo kullanılır
+        (testler/ölçümler için fake_provider.py adresi verilebilir).
         """
         # API endpoint
-        self.base_url = "https://air-quality-api.open-meteo.com/v1/air-quality"
+        self.base_url = base_url or os.getenv(
+            "AIR_QUALITY_API_URL",
+            "https://air-quality-api.open-meteo.com/v1/air-quality"
+        )
         
-        # Rate limitleme için zamanlayıcı
+        # Rate limitleme: Open-Meteo dakikada en fazla 60 istek öneriyor, marj bırakarak 50/dk
         self._last_request_time = 0
         self._request_count = 0
-        self._request_times = []
+        self._rate_limiter = TokenBucketRateLimiter(
+            rate=float(os.getenv("API_RATE_LIMIT_PER_MINUTE", "50")) / 60.0,
+            burst=int(os.getenv("API_RATE_LIMIT_BURST", "10"))
+        )
+        
+        # Eşzamanlı istek sınırı (toplu çekimlerde aynı anda açık istek sayısı)
+        self.max_concurrency = int(os.getenv("API_MAX_CONCURRENCY", "8"))
+        
+        # Tek istekte gönderilecek en fazla koordinat sayısı (Open-Meteo virgüllü liste kabul eder)
+        self.batch_size = int(os.getenv("API_BATCH_SIZE", "25"))
+        
+        # Her istekte istenen saatlik parametreler
+        self.hourly_fields = "pm10,pm2_5,nitrogen_dioxide,sulphur_dioxide,ozone,european_aqi"
         
-        # Önbellek (cache)
-        self._cache = {}
+        # Kalıcı HTTP oturumu ve bağlantı havuzu ayarları
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.pool_limit = int(os.getenv("API_POOL_LIMIT", "20"))
+        self.dns_cache_ttl = int(os.getenv("API_DNS_CACHE_TTL", "300"))
+        self.keepalive_timeout = float(os.getenv("API_KEEPALIVE_TIMEOUT", "60"))
+        self._pool_stats = {
+            "sessions_created": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "requests": 0,
+            "in_flight": 0,
+            "max_in_flight": 0
+        }
+        
+        # Önbellek (cache) - boyutu sınırlı LRU + TTL
         self._cache_expire = 120  # 2 dakika
+        self._cache = TTLCache(
+            max_entries=int(os.getenv("API_CACHE_MAX_ENTRIES", "2048")),
+            ttl=self._cache_expire,
+            max_bytes=int(os.getenv("API_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+        )
+        self._cache_purge_interval = float(os.getenv("API_CACHE_PURGE_INTERVAL", "30"))
+        self._maintenance_task = None
+        
+        # Opsiyonel disk önbelleği: yeniden başlatmada yanıtlar diskten yüklenir
+        disk_cache_path = os.getenv("API_DISK_CACHE_PATH", "")
+        self._disk_cache = DiskCache(
+            disk_cache_path,
+            ttl=float(os.getenv("API_DISK_CACHE_TTL", "3600"))  # Sağlayıcı saatlik güncelliyor
+        ) if disk_cache_path else None
+        self._disk_pending: Dict[str, Any] = {}
+        self._disk_loaded = False
+        
+        # Uçuştaki istekler: aynı önbellek anahtarını isteyenler tek bir sonucu bekler
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._coalesced_requests = 0
+        
+        # Saatlik serilerin tamamı (tahmin ve grafikler ayrı istek atmadan buradan okunur)
+        self.hourly = HourlySeriesStore(max_locations=int(os.getenv("API_HOURLY_MAX_LOCATIONS", "5000")))
+        self.hourly_max_age = 3600  # Sağlayıcı saatlik güncelliyor
         
         # Şehir ve ilçe listesi
         self.tr_cities = [
@@ -87,30 +146,151 @@ class AirQualityClient:
         # Tüm lokasyonları birleştir
         self.all_locations = self.tr_cities + self.istanbul_districts + self.world_cities
         
+        # Lokasyonun listedeki sırası sensör ID'si olarak kullanılır
+        for index, location in enumerate(self.all_locations):
+            location["index"] = index
+        
         logger.info("Open-Meteo Air Quality API istemcisi başlatıldı")
     
+    async def open(self):
+        """Uzun ömürlü HTTP oturumunu ve bağlantı havuzunu açar"""
+        if self._disk_cache is not None and not self._disk_loaded:
+            await self._load_disk_cache()
+        
+        if self._session is not None and not self._session.closed:
+            return
+        
+        # Bağlantı açılışı/yeniden kullanımı sayaçları için trace kancaları
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+        
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_limit,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30),
+            trace_configs=[trace_config]
+        )
+        self._pool_stats["sessions_created"] += 1
+        logger.info(f"API HTTP oturumu açıldı (havuz limiti: {self.pool_limit})")
+        
+        # Süresi dolan önbellek kayıtlarını arka planda temizle
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+    
+    async def close(self):
+        """HTTP oturumunu ve havuzdaki bağlantıları kapatır"""
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+        
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("API HTTP oturumu kapatıldı")
+        self._session = None
+        
+        if self._disk_cache is not None:
+            await self._flush_disk_cache()
+            await asyncio.get_event_loop().run_in_executor(None, self._disk_cache.close)
+    
+    async def _load_disk_cache(self):
+        """Diskteki süresi dolmamış yanıtları bellek önbelleğine yükler"""
+        self._disk_loaded = True
+        try:
+            entries = await asyncio.get_event_loop().run_in_executor(None, self._disk_cache.load)
+        except Exception as e:
+            logger.error(f"Disk önbelleği yüklenemedi: {str(e)}")
+            return
+        
+        now = time.time()
+        loaded = 0
+        for key, stored_at, value in entries:
+            if not self._persist_key(key):
+                continue
+            # Kayıt bellekte normal kayıtlardan uzun yaşamaz (en fazla _cache_expire); böylece yeniden
+            # başlatmadan sonra döngüler aynı yanıtı bir saat boyunca tekrar yazmaz, bayat kayıtlar yenilenir
+            ttl = min(stored_at + self._disk_cache.ttl - now, self._cache_expire - (now - stored_at))
+            if ttl > 0:
+                self._cache.set(key, value, ttl=ttl)
+                loaded += 1
+        
+        logger.info(f"Disk önbelleğinden {loaded} kayıt yüklendi: {self._disk_cache.path}")
+    
+    async def _flush_disk_cache(self):
+        """Bekleyen önbellek yazımlarını diske aktarır ve süresi dolanları siler"""
+        if self._disk_cache is None:
+            return
+        
+        pending, self._disk_pending = self._disk_pending, {}
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self._disk_cache.put_many, pending)
+            await loop.run_in_executor(None, self._disk_cache.purge_expired)
+        except Exception as e:
+            logger.error(f"Disk önbelleğine yazılırken hata: {str(e)}")
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Açık oturumu döndürür, yoksa açar"""
+        if self._session is None or self._session.closed:
+            await self.open()
+        return self._session
+    
+    async def _maintenance_loop(self):
+        """Önbellekte süresi dolan kayıtları periyodik olarak temizler"""
+        while True:
+            try:
+                await asyncio.sleep(self._cache_purge_interval)
+                purged = self._cache.purge_expired()
+                if purged:
+                    logger.debug(f"Önbellekten {purged} süresi dolmuş kayıt temizlendi")
+                
+                await self._flush_disk_cache()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Önbellek bakımı sırasında hata: {str(e)}")
+    
+    async def _on_connection_create(self, session, trace_config_ctx, params):
+        self._pool_stats["connections_created"] += 1
+    
+    async def _on_connection_reuse(self, session, trace_config_ctx, params):
+        self._pool_stats["connections_reused"] += 1
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Bağlantı havuzu kullanım sayaçlarını döndürür"""
+        stats = dict(self._pool_stats)
+        stats["pool_limit"] = self.pool_limit
+        stats["coalesced_requests"] = self._coalesced_requests
+        stats["inflight_keys"] = len(self._inflight)
+        stats["session_open"] = self._session is not None and not self._session.closed
+        return stats
+    
     async def _make_request(self, params: Dict) -> Dict:
       
         # Rate limiting kontrolü
         await self._respect_rate_limit()
         
         url = self.base_url
-        timeout = aiohttp.ClientTimeout(total=30)
+        
+        self._pool_stats["requests"] += 1
+        self._pool_stats["in_flight"] += 1
+        self._pool_stats["max_in_flight"] = max(self._pool_stats["max_in_flight"], self._pool_stats["in_flight"])
         
         try:
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(url, params=params) as response:
-                    # İstek zamanını kaydet
-                    self._update_request_time()
-                    
-                    if response.status == 200:
-                        result = await response.json()
-                        return result
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"API isteği başarısız: {response.status} - {error_text}")
-                        await asyncio.sleep(0.5)  # Hata durumunda bekle
-                        return {"error": f"API isteği başarısız: {response.status}", "details": error_text}
+            session = await self._get_session()
+            async with session.get(url, params=params) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    return result
+                else:
+                    error_text = await response.text()
+                    logger.error(f"API isteği başarısız: {response.status} - {error_text}")
+                    await asyncio.sleep(0.5)  # Hata durumunda bekle
+                    return {"error": f"API isteği başarısız: {response.status}", "details": error_text}
         except aiohttp.ClientError as e:
             logger.error(f"API bağlantı hatası: {str(e)}")
             await asyncio.sleep(1)  # Hata durumunda bekle
@@ -123,58 +303,71 @@ class AirQualityClient:
             logger.error(f"API isteği sırasında beklenmeyen hata: {str(e)}")
             await asyncio.sleep(1)  # Hata durumunda bekle
             return {"error": f"API isteği sırasında beklenmeyen hata: {str(e)}"}
+        finally:
+            self._pool_stats["in_flight"] -= 1
     
     async def _respect_rate_limit(self):
-        """API rate limitlerini aşmamak için bekler"""
-        current_time = time.time()
-        self._request_times = [t for t in self._request_times if current_time - t <= 60.0]
-        
-        # Open-Meteo dakikada maksimum 60 istek öneriyor (güvenli limit)
-        if len(self._request_times) >= 50:  # 60'tan az tutarak marj bırakalım
-            oldest_request = min(self._request_times)
-            sleep_time = 60.0 - (current_time - oldest_request) + 0.1
-            
-            if sleep_time > 0:
-                logger.warning(f"API rate limiti aşılmak üzere, {sleep_time:.2f} saniye bekleniyor...")
-                await asyncio.sleep(sleep_time)
-        
-        # İstekler arasında en az 100ms bekle
-        elapsed = current_time - self._last_request_time
-        if elapsed < 0.1 and self._request_count > 0:
-            await asyncio.sleep(0.1 - elapsed)
-            
+        """API rate limitlerini aşmamak için token alınana kadar bekler"""
+        waited = await self._rate_limiter.acquire()
+        if waited > 1:
+            logger.warning(f"API rate limiti nedeniyle {waited:.2f} saniye beklendi")
+        
         self._last_request_time = time.time()
         self._request_count += 1
     
-    def _update_request_time(self):
-        """İstek zamanını günceller"""
-        self._request_times.append(time.time())
+    def get_rate_limit_stats(self) -> Dict[str, Any]:
+        """Rate limiter bekleme süresi ve kısıtlanan istek sayaçlarını döndürür"""
+        return self._rate_limiter.stats()
     
     def _get_from_cache(self, key: str) -> Optional[Dict]:
         """Önbellekten veri al"""
-        if key in self._cache:
-            timestamp, data = self._cache[key]
-            if time.time() - timestamp < self._cache_expire:
-                logger.debug(f"Cache hit: {key}")
-                return data
-            else:
-                logger.debug(f"Cache expired: {key}")
-                del self._cache[key]
-        return None
+        data = self._cache.get(key)
+        if data is not None:
+            logger.debug(f"Cache hit: {key}")
+        return data
     
     def _add_to_cache(self, key: str, data: Dict):
         """Veriyi önbelleğe ekle"""
-        self._cache[key] = (time.time(), data)
+        self._cache.set(key, data)
         logger.debug(f"Cache added: {key}")
+        
+        # Hatalı yanıtlar diske yazılmaz; yeniden başlatmada tekrar denensin
+        if (self._disk_cache is not None and self._persist_key(key)
+                and not (isinstance(data, dict) and "error" in data)):
+            self._disk_pending[key] = (time.time(), data)
+    
+    @staticmethod
+    def _persist_key(key: str) -> bool:
+        """Diskte yalnızca koordinat yanıtları tutulur; toplu lokasyon listeleri (locations_*) her seferinde yeniden kurulur"""
+        return not key.startswith("locations_")
     
-    def _normalize_air_quality_data(self, data: Dict, location_name: str) -> Dict:
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Önbellek isabet/ıskalama/atılma sayaçlarını döndürür"""
+        stats = self._cache.stats()
+        stats["disk_cache"] = self._disk_cache.path if self._disk_cache is not None else None
+        stats["disk_pending"] = len(self._disk_pending)
+        return stats
+    
+    def _normalize_air_quality_data(self, data: Dict, location_name: str,
+                                    latitude: Optional[float] = None, longitude: Optional[float] = None) -> Dict:
        
         try:
             if "error" in data:
                 return data
                 
-            # Şu anki saat için veriyi al
-            current_hour_index = 0  # İlk saat verisi (şu an)
+            # Şu anki saat için veriyi al (zaman bilgisi yoksa ilk saat)
+            current_hour_index = 0
+            
+            # Saatlik bloğun tamamını sakla; istenen koordinat anahtar olarak kullanılır
+            if "hourly" in data:
+                series = self.hourly.put(
+                    latitude if latitude is not None else data.get("latitude", 0),
+                    longitude if longitude is not None else data.get("longitude", 0),
+                    data["hourly"],
+                    data.get("utc_offset_seconds", 0)
+                )
+                if series is not None:
+                    current_hour_index = series.index_for(time.time())
                 
             result = {
                 "timestamp": datetime.now().isoformat(),
@@ -228,21 +421,52 @@ class AirQualityClient:
             logger.error(f"Ham veri: {data}")
             return {"error": f"Veri normalleştirme hatası: {str(e)}"}
     
+    def _latest_cache_key(self, latitude: float, longitude: float) -> str:
+        """Koordinat için önbellek anahtarı"""
+        return f"latest_{latitude:.6f}_{longitude:.6f}"
+    
     async def get_latest_by_coordinates(self, latitude: float, longitude: float, location_name: str = "Unknown") -> Dict:
         
         # Önbellek anahtarı oluşturma
-        cache_key = f"latest_{latitude:.6f}_{longitude:.6f}"
+        cache_key = self._latest_cache_key(latitude, longitude)
         
         # Önbellekte varsa döndürme
         cached_data = self._get_from_cache(cache_key)
         if cached_data:
             return cached_data
         
+        # Aynı koordinat için süren bir istek varsa yenisini atma, onun sonucunu bekle
+        inflight = self._inflight.get(cache_key)
+        if inflight is not None:
+            self._coalesced_requests += 1
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_event_loop().create_future()
+        self._inflight[cache_key] = future
+        try:
+            normalized_data = await self._fetch_latest(latitude, longitude, location_name)
+            future.set_result(normalized_data)
+            return normalized_data
+        except asyncio.CancelledError:
+            # Bekleyenler iptal edilmedi; CancelledError (BaseException) onların "except Exception"
+            # bloklarından kaçar. get_latest_batch gibi hata sonucu ile serbest bırakılırlar.
+            future.set_result({"error": "İstek iptal edildi"})
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Bekleyen yoksa "exception never retrieved" uyarısını önle
+            raise
+        finally:
+            self._inflight.pop(cache_key, None)
+    
+    async def _fetch_latest(self, latitude: float, longitude: float, location_name: str = "Unknown") -> Dict:
+        """Koordinatı önbelleğe bakmadan API'den çeker, normalleştirir ve önbelleğe yazar"""
+        
         # API parametreleri
         params = {
             "latitude": latitude,
             "longitude": longitude,
-            "hourly": "pm10,pm2_5,nitrogen_dioxide,sulphur_dioxide,ozone,european_aqi",
+            "hourly": self.hourly_fields,
             "timezone": "auto",
             "forecast_days": 1  # Sadece bugünün verilerini getir
         }
@@ -251,13 +475,159 @@ class AirQualityClient:
         response = await self._make_request(params)
         
         # Verileri normalize etme
-        normalized_data = self._normalize_air_quality_data(response, location_name)
+        normalized_data = self._normalize_air_quality_data(response, location_name, latitude, longitude)
         
         # Önbelleğe ekle
-        self._add_to_cache(cache_key, normalized_data)
+        self._add_to_cache(self._latest_cache_key(latitude, longitude), normalized_data)
         
         return normalized_data
     
+    async def get_hourly_series(self, latitude: float, longitude: float, location_name: str = "Unknown") -> List[Dict]:
+        """
+        Koordinatın saatlik serisini döndürür (sağlayıcının yerel saatiyle).
+        Seri bellekte ve güncelse ağ isteği yapılmaz.
+        """
+        series = self.hourly.get(latitude, longitude)
+        if series is None or time.time() - series.fetched_at >= self.hourly_max_age:
+            # Son değer önbellekte kalmış olabilir; seriyi tazelemek için önbelleği atla
+            self._cache.pop(self._latest_cache_key(latitude, longitude), None)
+            await self.get_latest_by_coordinates(latitude, longitude, location_name)
+        
+        return self.hourly.rows(latitude, longitude)
+    
+    async def get_latest_many(self, locations: List[Dict], concurrency: Optional[int] = None) -> List[Dict]:
+        """
+        Birden çok lokasyonun verisini eşzamanlı olarak çeker.
+        Sonuçlar girdi sırasıyla döner; hata alan lokasyonlar için {"error": ...} döner.
+        """
+        return await self._gather_limited(locations, self.get_latest_by_coordinates, concurrency)
+    
+    async def _gather_limited(self, locations: List[Dict], fetch_func, concurrency: Optional[int] = None) -> List[Dict]:
+        """fetch_func'ı her lokasyon için eşzamanlılık sınırı altında çalıştırır"""
+        semaphore = asyncio.Semaphore(concurrency or self.max_concurrency)
+        
+        async def fetch(location: Dict) -> Dict:
+            async with semaphore:
+                try:
+                    return await fetch_func(
+                        latitude=location["lat"],
+                        longitude=location["lon"],
+                        location_name=location["name"]
+                    )
+                except Exception as e:
+                    logger.error(f"{location['name']} verileri çekilirken hata: {str(e)}")
+                    return {"error": str(e)}
+        
+        return await asyncio.gather(*(fetch(location) for location in locations))
+    
+    async def get_latest_batch(self, locations: List[Dict], batch_size: Optional[int] = None) -> List[Dict]:
+        """
+        Çok sayıda lokasyonu olabildiğince az API isteğiyle çeker.
+        Önbellekte olmayan koordinatlar batch_size'lık gruplar halinde tek istekte gönderilir.
+        Başka bir çağrının zaten çektiği koordinatlar için o isteğin sonucu beklenir.
+        Sonuçlar girdi sırasıyla döner.
+        """
+        batch_size = batch_size or self.batch_size
+        results: List[Optional[Dict]] = [None] * len(locations)
+        
+        # Önce önbellekte olanları ve başka istekte çekilmekte olanları ayır
+        pending = []
+        waiting = []
+        owned: Dict[str, asyncio.Future] = {}
+        loop = asyncio.get_event_loop()
+        
+        for index, location in enumerate(locations):
+            cache_key = self._latest_cache_key(location["lat"], location["lon"])
+            cached_data = self._get_from_cache(cache_key)
+            if cached_data:
+                results[index] = cached_data
+            elif cache_key in self._inflight:
+                self._coalesced_requests += 1
+                waiting.append((index, self._inflight[cache_key]))
+            else:
+                future = loop.create_future()
+                self._inflight[cache_key] = future
+                owned[cache_key] = future
+                pending.append((index, location, cache_key))
+        
+        chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run_chunk(chunk):
+            async with semaphore:
+                chunk_results = await self._fetch_batch([location for _, location, _ in chunk])
+            for (index, _, cache_key), result in zip(chunk, chunk_results):
+                results[index] = result
+                if not owned[cache_key].done():
+                    owned[cache_key].set_result(result)
+        
+        try:
+            if chunks:
+                await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+                logger.info(f"{len(pending)} lokasyon {len(chunks)} toplu istekle çekildi")
+        finally:
+            # Sonuçlanmamış kalan (hata/iptal) anahtarları bekleyenleri serbest bırak
+            for cache_key, future in owned.items():
+                if not future.done():
+                    future.set_result({"error": "Toplu istek tamamlanamadı"})
+                self._inflight.pop(cache_key, None)
+        
+        for index, future in waiting:
+            try:
+                results[index] = await asyncio.shield(future)
+            except Exception as e:
+                results[index] = {"error": str(e)}
+        
+        return results
+    
+    async def _fetch_batch(self, locations: List[Dict]) -> List[Dict]:
+        """Bir grup koordinatı tek istekte çeker, hatalı kısımlar için tekil isteğe düşer"""
+        # Not: Bu lokasyonların anahtarları get_latest_batch tarafından uçuşta işaretlendi,
+        # bu yüzden tekil denemeler birleştirme yapmayan _fetch_latest ile yapılır
+        if len(locations) == 1:
+            return await self._gather_limited(locations, self._fetch_latest)
+        
+        params = {
+            "latitude": ",".join(str(location["lat"]) for location in locations),
+            "longitude": ",".join(str(location["lon"]) for location in locations),
+            "hourly": self.hourly_fields,
+            "timezone": "auto",
+            "forecast_days": 1
+        }
+        
+        response = await self._make_request(params)
+        
+        # Çoklu koordinatta yanıt, her koordinat için bir nesne içeren liste olmalı
+        if not isinstance(response, list) or len(response) != len(locations):
+            error = response.get("error") if isinstance(response, dict) else "beklenmeyen yanıt biçimi"
+            logger.warning(f"Toplu istek başarısız ({error}), {len(locations)} lokasyon tekil isteklerle çekilecek")
+            return await self._gather_limited(locations, self._fetch_latest)
+        
+        results: List[Optional[Dict]] = []
+        failed = []
+        
+        for index, (location, item) in enumerate(zip(locations, response)):
+            normalized_data = None
+            if isinstance(item, dict) and "error" not in item:
+                normalized_data = self._normalize_air_quality_data(item, location["name"], location["lat"], location["lon"])
+            
+            if normalized_data is None or "error" in normalized_data:
+                failed.append(index)
+                results.append(None)
+                continue
+            
+            self._add_to_cache(self._latest_cache_key(location["lat"], location["lon"]), normalized_data)
+            results.append(normalized_data)
+        
+        # Kısmi hatalar: sadece hatalı lokasyonları tek tek dene
+        if failed:
+            logger.warning(f"Toplu yanıtta {len(failed)} lokasyon hatalı, tekil isteklerle tekrar deneniyor")
+            retried = await self._gather_limited([locations[index] for index in failed], self._fetch_latest)
+            for index, result in zip(failed, retried):
+                results[index] = result
+        
+        return results
+    
     async def get_locations(self, limit: int = 40) -> List:
         
         # Önbellek anahtarı oluştur
@@ -268,34 +638,34 @@ class AirQualityClient:
         if cached_data:
             return cached_data
         
+        results = await self.get_stations(self.all_locations[:limit])
+        
+        # Önbelleğe ekle
+        self._add_to_cache(cache_key, results)
+        
+        return results
+    
+    async def get_stations(self, locations: List[Dict]) -> List:
+        """Verilen lokasyonları toplu çekip standart istasyon formatında döndürür (hatalı olanlar atlanır)"""
         results = []
         
-        locations_to_check = self.all_locations[:limit]
+        # Tüm lokasyonları toplu isteklerle çek
+        air_quality_list = await self.get_latest_batch(locations)
         
-        for location in locations_to_check:
-            try:
-                # Her lokasyon için veri çek
-                air_quality = await self.get_latest_by_coordinates(
-                    latitude=location["lat"],
-                    longitude=location["lon"],
-                    location_name=location["name"]
-                )
-                
-                # Standart istasyon formatına dönüştür
-                if "error" not in air_quality:
-                    station = {
+        for location, air_quality in zip(locations, air_quality_list):
+            # Standart istasyon formatına dönüştür
+            if "error" not in air_quality:
+                station = {
+                    "index": location.get("index", 0),
+                    "name": location["name"],
+                    "station": {
                         "name": location["name"],
-                        "station": {
-                            "name": location["name"],
-                            "geo": [location["lat"], location["lon"]]
-                        },
-                        "aqi": air_quality.get("measurements", {}).get("aqi", 0)
-                    }
-                    results.append(station)
-            except Exception as e:
-                logger.error(f"{location['name']} verileri çekilirken hata: {str(e)}")
-        
-        # Önbelleğe ekle
-        self._add_to_cache(cache_key, results)
+                        "geo": [location["lat"], location["lon"]]
+                    },
+                    "aqi": air_quality.get("measurements", {}).get("aqi", 0),
+                    # Normalleştirilmiş veri; çağıran taraf aynı lokasyonu tekrar çekmesin
+                    "air_quality": air_quality
+                }
+                results.append(station)
         
-        return results 
+        return results
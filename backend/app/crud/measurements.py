@@ -1,10 +1,10 @@
 from typing import List
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select, text
 from app.models.measurement import AirQualityMeasurement
 from app.schemas.measurement import MeasurementCreate
 
-def create(db: Session, *, obj_in: MeasurementCreate) -> AirQualityMeasurement:
+async def create(db: AsyncSession, *, obj_in: MeasurementCreate) -> AirQualityMeasurement:
     db_obj = AirQualityMeasurement(
         timestamp=obj_in.timestamp,
         latitude=obj_in.latitude,
@@ -16,25 +16,25 @@ def create(db: Session, *, obj_in: MeasurementCreate) -> AirQualityMeasurement:
         o3=obj_in.o3
     )
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
     return db_obj
 
-def get_multi(db: Session, *, skip: int = 0, limit: int = 100) -> List[AirQualityMeasurement]:
-    return db.query(AirQualityMeasurement)\
+async def get_multi(db: AsyncSession, *, skip: int = 0, limit: int = 100) -> List[AirQualityMeasurement]:
+    query = select(AirQualityMeasurement)\
         .order_by(desc(AirQualityMeasurement.timestamp))\
         .offset(skip)\
-        .limit(limit)\
-        .all()
+        .limit(limit)
+    return (await db.execute(query)).scalars().all()
 
-def get_latest(db: Session, *, limit: int = 10) -> List[AirQualityMeasurement]:
-    return db.query(AirQualityMeasurement)\
+async def get_latest(db: AsyncSession, *, limit: int = 10) -> List[AirQualityMeasurement]:
+    query = select(AirQualityMeasurement)\
         .order_by(desc(AirQualityMeasurement.timestamp))\
-        .limit(limit)\
-        .all()
+        .limit(limit)
+    return (await db.execute(query)).scalars().all()
 
-def get_by_location(
-    db: Session,
+async def get_by_location(
+    db: AsyncSession,
     *,
     latitude: float,
     longitude: float,
@@ -55,9 +55,9 @@ def get_by_location(
         LIMIT 100;
     """)
     
-    result = db.execute(
-        query,
+    result = await db.execute(
+        select(AirQualityMeasurement).from_statement(query),
         {"lat": latitude, "lon": longitude, "radius": radius}
     )
     
-    return [AirQualityMeasurement(**dict(row)) for row in result] 
\ No newline at end of file
+    return result.scalars().all()
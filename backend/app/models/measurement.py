@@ -5,8 +5,9 @@ from app.db.base_class import Base
 class AirQualityMeasurement(Base):
     __tablename__ = "air_quality_measurements"
 
-    id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime(timezone=True), nullable=False)
+    # Hypertable: primary key must include the partitioning column
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    timestamp = Column(DateTime(timezone=True), primary_key=True, nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     pm25 = Column(Float)
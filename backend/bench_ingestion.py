@@ -0,0 +1,82 @@
+"""
+Veri çekme yolunun sahte sağlayıcıya karşı ölçümü (ağ bağlantısı gerektirmez).
+
+Kullanım:
+    python bench_ingestion.py --locations 2000 --latency 0.05 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+
+from fake_provider import FakeAirQualityProvider
+
+
+async def run(args):
+    provider = FakeAirQualityProvider(
+        seed=args.seed,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        item_error_rate=args.item_error_rate
+    )
+    runner = await provider.start()
+
+    # İstemci ayarları ortam değişkenlerinden okunur; rate limit ölçümü bozmasın diye yükseltilir
+    # (komut satırı değerleri ortamda tanımlı değerlerin üzerine yazılır)
+    os.environ["AIR_QUALITY_API_URL"] = provider.base_url
+    os.environ["API_RATE_LIMIT_PER_MINUTE"] = str(args.rate_per_minute)
+    os.environ["API_RATE_LIMIT_BURST"] = str(args.burst)
+    from api_client import AirQualityClient
+
+    client = AirQualityClient()
+    await client.open()
+
+    rng = random.Random(args.seed)
+    locations = [
+        {"name": f"Bench {i}", "lat": round(rng.uniform(-60, 70), 4), "lon": round(rng.uniform(-180, 180), 4), "index": i}
+        for i in range(args.locations)
+    ]
+
+    try:
+        for round_number in range(1, args.rounds + 1):
+            started = time.perf_counter()
+            results = await client.get_latest_batch(locations)
+            elapsed = time.perf_counter() - started
+
+            errors = sum(1 for result in results if "error" in result)
+            print(
+                f"Tur {round_number}: {len(locations)} lokasyon {elapsed:.3f} sn, "
+                f"hatalı: {errors}, sağlayıcı istekleri: {provider.requests}"
+            )
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+    print("Sağlayıcı:", provider.stats())
+    print("Havuz:", client.get_pool_stats())
+    print("Önbellek:", client.get_cache_stats())
+    print("Rate limit:", client.get_rate_limit_stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sahte sağlayıcı ile veri çekme ölçümü")
+    parser.add_argument("--locations", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=2, help="2. ve sonraki turlar önbellekten gelir")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--item-error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-per-minute", type=int, default=60000)
+    parser.add_argument("--burst", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Sensör kayıtlarının bellek ve JSON serileştirme ölçümü.
+Eski (__dict__'li, to_dict + json.dumps) gösterim ile __slots__'lu Sensor + sensors_to_json karşılaştırılır.
+
+Kullanım:
+    python bench_sensors.py --sensors 100000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from sensor_registry import Sensor, SensorRegistry, sensors_to_json
+
+
+class LegacySensor:
+    """Eski main.Sensor ile aynı yapı (örnek başına __dict__)"""
+
+    def __init__(self, id, location, latitude, longitude, aqi=0, pm25=0, pm10=0, no2=0, so2=0, o3=0):
+        self.id = id
+        self.location = location
+        self.latitude = latitude
+        self.longitude = longitude
+        self.aqi = aqi
+        self.pm25 = pm25
+        self.pm10 = pm10
+        self.no2 = no2
+        self.so2 = so2
+        self.o3 = o3
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "location": self.location,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "aqi": self.aqi,
+            "pm25": self.pm25,
+            "pm10": self.pm10,
+            "no2": self.no2,
+            "so2": self.so2,
+            "o3": self.o3
+        }
+
+
+def make_rows(count, seed):
+    rng = random.Random(seed)
+    return [
+        (i + 1, f"Station {i + 1}", round(rng.uniform(-60, 70), 4), round(rng.uniform(-180, 180), 4),
+         rng.randint(0, 300), round(rng.uniform(0, 150), 1), round(rng.uniform(0, 250), 1),
+         round(rng.uniform(0, 120), 1), round(rng.uniform(0, 40), 1), round(rng.uniform(10, 180), 1))
+        for i in range(count)
+    ]
+
+
+def measure(build):
+    """build() sonucunun tuttuğu bellek (MB) ve süresi (sn)"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current / (1024 * 1024), elapsed
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        output = func()
+    return (time.perf_counter() - started) / repeat, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sensör kaydı bellek / serileştirme ölçümü")
+    parser.add_argument("--sensors", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = make_rows(args.sensors, args.seed)
+
+    legacy, legacy_mb, _ = measure(lambda: [LegacySensor(*row) for row in rows])
+    slotted, slotted_mb, _ = measure(lambda: [Sensor(*row) for row in rows])
+    print(f"{args.sensors} sensör nesnesi: eski {legacy_mb:.1f} MB, __slots__ {slotted_mb:.1f} MB "
+          f"({legacy_mb / slotted_mb:.2f}x)")
+
+    registry, registry_mb, registry_s = measure(lambda: _build_registry(slotted))
+    print(f"SensorRegistry (indeksler + ızgara + sütunlar, nesneler hariç): {registry_mb:.1f} MB, "
+          f"kurulum {registry_s:.2f} sn")
+
+    legacy_s, legacy_out = timed(lambda: json.dumps([sensor.to_dict() for sensor in legacy]).encode("utf-8"),
+                                 args.repeat)
+    # İlk çağrı kayıtların JSON parçalarını üretir, sonrakiler önbellekten birleştirir
+    cold_s, slotted_out = timed(lambda: sensors_to_json(slotted), 1)
+    warm_s, _ = timed(lambda: sensors_to_json(slotted), args.repeat)
+    assert json.loads(legacy_out) == json.loads(slotted_out)
+    print(f"JSON serileştirme: to_dict + json.dumps {legacy_s * 1000:.0f} ms, "
+          f"sensors_to_json ilk {cold_s * 1000:.0f} ms, önbellekli {warm_s * 1000:.1f} ms "
+          f"({legacy_s / warm_s:.0f}x)")
+
+
+def _build_registry(sensors):
+    registry = SensorRegistry()
+    registry.upsert_many(sensors)
+    registry.snapshot()
+    return registry
+
+
+if __name__ == "__main__":
+    main()
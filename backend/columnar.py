@@ -0,0 +1,235 @@
+"""
+Her sensörün son ölçümünü paralel NumPy dizilerinde (sütunlarda) tutan yapı.
+Herhangi bir sensör alt kümesi üzerinde ortalama / maksimum / yüzdelik tek vektörel geçişte hesaplanır.
+"""
+import math
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from spatial_index import EARTH_RADIUS_KM
+
+COLUMNS = ("pm25", "pm10", "no2", "so2", "o3", "aqi")
+
+
+def haversine_km_array(latitudes: np.ndarray, longitudes: np.ndarray, latitude: float, longitude: float) -> np.ndarray:
+    """Dizideki koordinatların (latitude, longitude) noktasına büyük daire mesafeleri (km)"""
+    lat = np.radians(latitudes)
+    phi = math.radians(latitude)
+    a = (np.sin((lat - phi) / 2) ** 2
+         + math.cos(phi) * np.cos(lat) * np.sin((np.radians(longitudes) - math.radians(longitude)) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+class LatestColumns:
+    """
+    Satır i: ids[i] sensörünün konumu ve son değerleri. Eksik değerler NaN tutulur.
+    Ekleme/güncelleme/silme O(1)'dir (silmede son satır boşalan yere taşınır); kapasite dolunca iki katına çıkar.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._capacity = capacity
+        self._size = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.lat = np.zeros(capacity, dtype=np.float64)
+        self.lon = np.zeros(capacity, dtype=np.float64)
+        self.values = np.full((capacity, len(COLUMNS)), np.nan, dtype=np.float64)
+        self._slot: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, sensor_id: int) -> bool:
+        return sensor_id in self._slot
+
+    def _grow(self):
+        capacity = self._capacity * 2
+        for name in ("ids", "lat", "lon"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+        values = np.full((capacity, len(COLUMNS)), np.nan, dtype=np.float64)
+        values[:self._size] = self.values[:self._size]
+        self.values = values
+        self._capacity = capacity
+
+    def set(self, sensor_id: int, latitude: float, longitude: float, values: Sequence[Optional[float]]):
+        """Sensörün satırını ekler veya günceller; values COLUMNS sırasındadır"""
+        slot = self._slot.get(sensor_id)
+        if slot is None:
+            if self._size == self._capacity:
+                self._grow()
+            slot = self._size
+            self._size += 1
+            self._slot[sensor_id] = slot
+            self.ids[slot] = sensor_id
+
+        self.lat[slot] = latitude
+        self.lon[slot] = longitude
+        self.values[slot] = [np.nan if value is None else value for value in values]
+
+    def remove(self, sensor_id: int) -> bool:
+        slot = self._slot.pop(sensor_id, None)
+        if slot is None:
+            return False
+
+        last = self._size - 1
+        if slot != last:
+            # Son satırı boşalan yere taşı
+            moved_id = int(self.ids[last])
+            self.ids[slot] = moved_id
+            self.lat[slot] = self.lat[last]
+            self.lon[slot] = self.lon[last]
+            self.values[slot] = self.values[last]
+            self._slot[moved_id] = slot
+        self.values[last] = np.nan
+        self._size = last
+        return True
+
+    def clear(self):
+        self._slot.clear()
+        self._size = 0
+        self.values[:] = np.nan
+
+    def copy(self) -> "LatestColumns":
+        """Dolu satırların bağımsız kopyası (yayınlanan nesiller için)"""
+        other = LatestColumns.__new__(LatestColumns)
+        capacity = max(1, self._size)
+        other._capacity = capacity
+        other._size = self._size
+        other.ids = self.ids[:capacity].copy()
+        other.lat = self.lat[:capacity].copy()
+        other.lon = self.lon[:capacity].copy()
+        other.values = self.values[:capacity].copy()
+        other._slot = dict(self._slot)
+        return other
+
+    def column(self, name: str) -> np.ndarray:
+        """Bir ölçüm sütununun (kopyasız) görünümü"""
+        return self.values[:self._size, COLUMNS.index(name)]
+
+    def indices(self, sensor_ids: Iterable[int]) -> np.ndarray:
+        """Sensör kimliklerinin satır numaraları (bilinmeyenler atlanır)"""
+        slots = [self._slot[sensor_id] for sensor_id in sensor_ids if sensor_id in self._slot]
+        return np.asarray(slots, dtype=np.int64)
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Tüm satırlar üzerinde vektörel haversine ile yarıçap içindeki satır numaraları"""
+        distance = haversine_km_array(self.lat[:self._size], self.lon[:self._size], latitude, longitude)
+        return np.nonzero(distance <= radius_km)[0]
+
+    def aggregate(self, indices: Optional[np.ndarray] = None,
+                  percentiles: Sequence[float] = (50, 90)) -> Dict[str, Any]:
+        """
+        Seçilen satırlar (None: hepsi) için sütun başına ortalama, maksimum, yüzdelikler ve değer sayısı.
+        Hiç değeri olmayan sütunlarda sonuçlar None döner.
+        """
+        block = self.values[:self._size] if indices is None else self.values[indices]
+        result: Dict[str, Any] = {"count": int(block.shape[0])}
+
+        # Sütunları bir kez sırala (NaN'lar sona gider); maksimum ve yüzdelikler sıralı diziden okunur
+        # (Boş seçimde tek NaN satırı: tüm sütunlar "değer yok" olur)
+        ordered = np.sort(block, axis=0) if block.shape[0] else np.full((1, len(COLUMNS)), np.nan)
+        counts = np.count_nonzero(~np.isnan(ordered), axis=0)
+        valid = counts > 0
+        columns = np.arange(len(COLUMNS))
+        last = np.maximum(counts - 1, 0)
+
+        means = np.full(len(COLUMNS), np.nan)
+        means[valid] = np.nansum(ordered, axis=0)[valid] / counts[valid]
+        maxima = np.where(valid, ordered[last, columns], np.nan)
+
+        quantiles = []
+        for percentile in percentiles:
+            # Doğrusal ara değer (numpy.percentile varsayılanı ile aynı)
+            position = last * (percentile / 100.0)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.ceil(position).astype(np.int64)
+            low_values = ordered[lower, columns]
+            high_values = ordered[upper, columns]
+            value = low_values + (high_values - low_values) * (position - lower)
+            quantiles.append(np.where(valid, value, np.nan))
+
+        def clean(value: float) -> Optional[float]:
+            return None if math.isnan(value) else float(value)
+
+        for column, name in enumerate(COLUMNS):
+            stats = {
+                "count": int(counts[column]),
+                "mean": clean(means[column]),
+                "max": clean(maxima[column])
+            }
+            for i, percentile in enumerate(percentiles):
+                stats[f"p{int(percentile)}"] = clean(quantiles[i][column])
+            result[name] = stats
+
+        return result
+
+
+class CellAggregates:
+    """
+    Izgara hücresi başına son değerlerin sütun toplamları ve değer sayıları.
+    Sensörün son değeri değiştikçe eski satırı çıkarılıp yenisi eklenir (O(1));
+    bölge ortalaması, tamamen içeride kalan hücrelerin toplamlarından sensörlere bakmadan hesaplanır.
+    NaN değerler toplamlara ve sayılara katılmaz.
+    """
+
+    def __init__(self):
+        # Hücre -> [toplamlar, değer sayıları] (2 x len(COLUMNS)) ve hücredeki sensör sayısı
+        self._totals: Dict[int, np.ndarray] = {}
+        self._sensors: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._totals)
+
+    @staticmethod
+    def row(values: Sequence[Optional[float]]) -> np.ndarray:
+        """COLUMNS sırasındaki değerleri (None: NaN) float dizisine çevirir"""
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+    def add(self, cell: int, row: np.ndarray):
+        totals = self._totals.get(cell)
+        if totals is None:
+            totals = self._totals[cell] = np.zeros((2, len(COLUMNS)), dtype=np.float64)
+            self._sensors[cell] = 0
+        present = ~np.isnan(row)
+        totals[0, present] += row[present]
+        totals[1] += present
+        self._sensors[cell] += 1
+
+    def subtract(self, cell: int, row: np.ndarray):
+        totals = self._totals.get(cell)
+        if totals is None:
+            return
+        self._sensors[cell] -= 1
+        if self._sensors[cell] <= 0:
+            # Boşalan hücre silinir (kayan nokta artıkları da böylece sıfırlanır)
+            del self._totals[cell]
+            del self._sensors[cell]
+            return
+        present = ~np.isnan(row)
+        totals[0, present] -= row[present]
+        totals[1] -= present
+
+    def clear(self):
+        self._totals.clear()
+        self._sensors.clear()
+
+    def copy(self) -> "CellAggregates":
+        """Bağımsız kopya (yayınlanan nesiller için)"""
+        other = CellAggregates()
+        other._totals = {cell: totals.copy() for cell, totals in self._totals.items()}
+        other._sensors = dict(self._sensors)
+        return other
+
+    def combine(self, cells: Iterable[int]) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Hücrelerin (toplamlar, değer sayıları, sensör sayısı) birleşimi"""
+        totals = np.zeros((2, len(COLUMNS)), dtype=np.float64)
+        sensors = 0
+        for cell in cells:
+            cell_totals = self._totals.get(cell)
+            if cell_totals is not None:
+                totals += cell_totals
+                sensors += self._sensors[cell]
+        return totals[0], totals[1], sensors
@@ -1,11 +1,17 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from contextlib import contextmanager
+import logging
 import os
 from dotenv import load_dotenv
+from pool_metrics import TimedAsyncQueuePool, TimedQueuePool
 
 load_dotenv()
 
+logger = logging.getLogger("database")
+
 # TimescaleDB bağlantı bilgileri
 POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres")
@@ -17,16 +23,43 @@ POSTGRES_DB = os.getenv("POSTGRES_DB", "air_quality")
 DATABASE_URL = os.getenv("DATABASE_URL")
 SQLALCHEMY_DATABASE_URL = DATABASE_URL if DATABASE_URL else f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
-# TimescaleDB için özel engine oluştur
+# Bağlantı havuzu ayarları (ölçümleri /debug/db-pool altında)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# TimescaleDB için süreç genelindeki tek engine (tüm oturumlar ve yazma tamponu bu havuzu kullanır)
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
+    poolclass=TimedQueuePool,
     pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def to_async_url(url: str) -> str:
+    """Senkron PostgreSQL bağlantı adresini asyncpg sürücüsüne çevirir"""
+    scheme, separator, rest = url.partition("://")
+    if scheme in ("postgres", "postgresql") or scheme.startswith("postgresql+"):
+        return f"postgresql+asyncpg{separator}{rest}"
+    return url
+
+# Event loop'u bloke etmeyen sorgular için asyncpg tabanlı engine (FastAPI endpoint'leri)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    poolclass=TimedAsyncQueuePool,
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -37,26 +70,83 @@ def get_db():
     finally:
         db.close()
 
-def init_db():
-    """Veritabanını başlatır ve TimescaleDB uzantısını etkinleştirir"""
+@contextmanager
+def session_scope():
+    """
+    Tek iş birimi için oturum: blok hatasız biterse commit, hata olursa rollback yapılır,
+    her durumda bağlantı havuza geri verilir.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+async def get_async_db():
+    """Asenkron veritabanı oturumu oluşturur (async def endpoint'ler için)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def ensure_hypertable() -> bool:
+    """
+    air_quality_data tablosunu TimescaleDB hypertable'ına çevirir (zaten öyleyse dokunmaz). Bloke edicidir.
+    Eski şemadan gelen tablolarda önce anomalies yabancı anahtarı kaldırılır ve birincil anahtar
+    (id, timestamp) yapılır; mevcut satırlar chunk'lara taşınır (migrate_data).
+    TimescaleDB yoksa uyarı yazılır ve False döner.
+    """
     from sqlalchemy import text
     
-    # Veritabanı bağlantısı oluştur
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
-    
-    # TimescaleDB uzantısını etkinleştir
-    with engine.connect() as conn:
-        conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb CASCADE"))
-        conn.commit()
+    try:
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS timescaledb CASCADE"))
+            exists = conn.execute(
+                text("SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = 'air_quality_data'")
+            ).first()
+            if exists is not None:
+                return True
+            
+            # Eski şema: tek sütunlu id birincil anahtarı ve ona bağlı yabancı anahtar
+            conn.execute(text("ALTER TABLE anomalies DROP CONSTRAINT IF EXISTS anomalies_air_quality_data_id_fkey"))
+            primary_key = conn.execute(text("""
+                SELECT c.conname, array_agg(a.attname::text) AS columns
+                FROM pg_constraint c
+                JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey)
+                WHERE c.conrelid = 'air_quality_data'::regclass AND c.contype = 'p'
+                GROUP BY c.conname
+            """)).first()
+            if primary_key is not None and "timestamp" not in primary_key.columns:
+                conn.execute(text('UPDATE air_quality_data SET "timestamp" = now() WHERE "timestamp" IS NULL'))
+                conn.execute(text(f'ALTER TABLE air_quality_data DROP CONSTRAINT "{primary_key.conname}", '
+                                  'ADD PRIMARY KEY (id, "timestamp")'))
+            
+            conn.execute(text("""
+                SELECT create_hypertable('air_quality_data', 'timestamp',
+                    chunk_time_interval => INTERVAL '1 day',
+                    if_not_exists => TRUE,
+                    migrate_data => TRUE)
+            """))
+        logger.info("air_quality_data hypertable olarak ayarlandı")
+        return True
+    except Exception as e:
+        logger.warning(f"air_quality_data hypertable'a çevrilemedi: {str(e)}")
+        return False
+
+def init_db():
+    """Veritabanını başlatır ve TimescaleDB uzantısını etkinleştirir"""
+    # Model tabloları models.Base üzerinde tanımlı
+    from models import Base as ModelBase
     
     # Tabloları oluştur
-    Base.metadata.create_all(bind=engine)
+    ModelBase.metadata.create_all(bind=engine)
+    
+    # AirQualityData tablosunu hypertable olarak ayarla (eski şemayı da dönüştürür)
+    ensure_hypertable()
     
-    # AirQualityData tablosunu hypertable olarak ayarla
-    with engine.connect() as conn:
-        conn.execute(text("""
-            SELECT create_hypertable('air_quality_data', 'timestamp', 
-                chunk_time_interval => INTERVAL '1 day',
-                if_not_exists => TRUE)
-        """))
-        conn.commit() 
\ No newline at end of file
+    # Saatlik ve günlük özet görünümleri (continuous aggregate) ve yenileme politikaları
+    import rollups
+    rollups.ensure_rollups(engine)
@@ -0,0 +1,219 @@
+"""
+AirQualityData satırları için toplu yazma (write-behind) tamponu.
+Üreticiler (API döngüsü, RabbitMQ callback'leri, manuel giriş) satırı kuyruğa bırakır ve beklemez;
+arka plan thread'i satırları boyut veya süre dolunca tek bir çok satırlı INSERT ile, tek transaction'da yazar.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from models import AirQualityData
+
+logger = logging.getLogger("db_writer")
+
+# Tampona alınan sütunlar (çok satırlı INSERT için tüm satırlar aynı anahtarlara sahip olmalı)
+ROW_FIELDS = ("timestamp", "latitude", "longitude", "pm25", "pm10", "no2", "so2", "o3", "aqi")
+
+# (satır, callback, kuyruğa girdiği an)
+PendingRow = Tuple[Dict[str, Any], Optional[Callable[[AirQualityData], None]], float]
+
+
+class AirQualityWriteBuffer:
+    """
+    max_rows: bu kadar satır birikince hemen yazılır
+    max_delay: en eski satır bu kadar saniye bekleyince yazılır
+    max_pending: bellekte tutulacak en fazla satır; dolunca en eski satır atılır (dropped sayacı)
+    Yazma hatasında satırlar kuyruğun başına geri konur ve artan aralıklarla yeniden denenir.
+    Callback'ler satır eklendikten sonra, veritabanı kimliği atanmış AirQualityData ile ayrı
+    tek bir thread'de sırayla çağrılır (ör. anomali tespiti kayıt kimliğine ihtiyaç duyar).
+    """
+
+    def __init__(self, engine, max_rows: int = 500, max_delay: float = 1.0, max_pending: int = 20000):
+        self.engine = engine
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+
+        self._pending: Deque[PendingRow] = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._callbacks: Optional[ThreadPoolExecutor] = None
+        self._stopping = False
+        self._statement = insert(AirQualityData.__table__).returning(
+            AirQualityData.__table__.c.id, sort_by_parameter_order=True
+        )
+
+        self.enqueued = 0
+        self.inserted = 0
+        self.dropped = 0
+        self.dropped_after_close = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self._latencies: Deque[float] = deque(maxlen=256)  # Son yazmaların süresi (saniye)
+        self._waits: Deque[float] = deque(maxlen=256)  # Son yazmalarda en eski satırın bekleme süresi
+        self._last_flush: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._callbacks = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer-callbacks")
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, row: Dict[str, Any], callback: Optional[Callable[[AirQualityData], None]] = None):
+        """Satırı kuyruğa ekler; hiçbir zaman beklemez (bellek sınırında en eski satır atılır)"""
+        row = {name: row.get(name) for name in ROW_FIELDS}
+        if row["timestamp"] is None:
+            row["timestamp"] = datetime.now()
+
+        with self._condition:
+            if self._stopping:
+                # Kapanış başladı: yazma thread'i bu satırı görmeyebilir, sessizce kaybolmasın
+                self.dropped += 1
+                self.dropped_after_close += 1
+                if self.dropped_after_close == 1 or self.dropped_after_close % 1000 == 0:
+                    logger.warning(f"Yazma tamponu kapatıldıktan sonra satır eklendi ve atıldı: toplam {self.dropped_after_close}")
+                return
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    logger.warning(f"Yazma tamponu dolu ({self.max_pending} satır), en eski satırlar atılıyor: toplam {self.dropped}")
+            self._pending.append((row, callback, time.monotonic()))
+            self.enqueued += 1
+            if len(self._pending) >= self.max_rows:
+                self._condition.notify()
+
+    def close(self, timeout: float = 10.0):
+        """
+        Kalan satırları yazar ve thread'i durdurur (bloke edici; kapanışta, üreticiler durdurulduktan sonra çağrılır).
+        Bundan sonra add() ile gelen satırlar yazılmaz, dropped sayacına eklenir.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is None:
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"Yazma tamponu {timeout} sn içinde boşaltılamadı, {len(self._pending)} satır yazılmadı")
+        self._thread = None
+        if self._callbacks is not None:
+            self._callbacks.shutdown(wait=True)
+            self._callbacks = None
+
+    def _next_batch(self) -> Optional[List[PendingRow]]:
+        """Boyut veya süre dolana kadar bekler; durdurulmuş ve kuyruk boşsa None"""
+        with self._condition:
+            while not self._stopping:
+                if len(self._pending) >= self.max_rows:
+                    break
+                if self._pending:
+                    remaining = self._pending[0][2] + self.max_delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                else:
+                    self._condition.wait()
+
+            if not self._pending:
+                return None
+            return [self._pending.popleft() for _ in range(min(self.max_rows, len(self._pending)))]
+
+    def _run(self):
+        retry_delay = 0.0
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            if self._write(batch):
+                retry_delay = 0.0
+                continue
+
+            # Hata: satırları geri koy (sınırı aşan en eski satırlar atılır) ve bekle
+            with self._condition:
+                self._pending.extendleft(reversed(batch))
+                while len(self._pending) > self.max_pending:
+                    self._pending.popleft()
+                    self.dropped += 1
+                if self._stopping:
+                    logger.error(f"Kapanışta veritabanına yazılamadı, {len(self._pending)} satır kayboldu")
+                    self.dropped += len(self._pending)
+                    self._pending.clear()
+                    return
+                retry_delay = min(30.0, retry_delay * 2 or 1.0)
+                self._condition.wait(retry_delay)
+
+    def _write(self, batch: List[PendingRow]) -> bool:
+        started = time.perf_counter()
+        try:
+            with self.engine.begin() as conn:
+                ids = conn.execute(self._statement, [row for row, _, _ in batch]).scalars().all()
+        except Exception as e:
+            self.failed_flushes += 1
+            logger.error(f"Toplu yazma başarısız ({len(batch)} satır): {str(e)}")
+            return False
+
+        elapsed = time.perf_counter() - started
+        waited = time.monotonic() - batch[0][2]
+        self.flushes += 1
+        self.inserted += len(batch)
+        self._latencies.append(elapsed)
+        self._waits.append(waited)
+        self._last_flush = {
+            "rows": len(batch),
+            "seconds": round(elapsed, 4),
+            "oldest_row_wait_seconds": round(waited, 3),
+            "at": datetime.now().isoformat()
+        }
+        logger.debug(f"{len(batch)} satır {elapsed * 1000:.1f} ms'de yazıldı")
+
+        for (row, callback, _), row_id in zip(batch, ids):
+            if callback is not None:
+                self._callbacks.submit(self._run_callback, callback, AirQualityData(id=row_id, **row))
+        return True
+
+    @staticmethod
+    def _run_callback(callback: Callable[[AirQualityData], None], record: AirQualityData):
+        try:
+            callback(record)
+        except Exception as e:
+            logger.error(f"Yazma sonrası callback hatası: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        def percentile(values: List[float], fraction: float) -> Optional[float]:
+            if not values:
+                return None
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 4)
+
+        latencies = list(self._latencies)
+        waits = list(self._waits)
+        return {
+            "pending": len(self._pending),
+            "max_rows": self.max_rows,
+            "max_delay_seconds": self.max_delay,
+            "max_pending": self.max_pending,
+            "enqueued": self.enqueued,
+            "inserted": self.inserted,
+            "dropped": self.dropped,
+            "dropped_after_close": self.dropped_after_close,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "avg_rows_per_flush": round(self.inserted / self.flushes, 1) if self.flushes else 0,
+            "flush_seconds": {"p50": percentile(latencies, 0.5), "p95": percentile(latencies, 0.95),
+                              "max": round(max(latencies), 4) if latencies else None},
+            "oldest_row_wait_seconds": {"p50": percentile(waits, 0.5), "p95": percentile(waits, 0.95)},
+            "last_flush": self._last_flush
+        }
@@ -0,0 +1,91 @@
+"""
+Sağlayıcı yanıtlarını yeniden başlatmalar arasında saklayan SQLite tabanlı önbellek
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("disk_cache")
+
+
+class DiskCache:
+    """
+    Normalleştirilmiş API yanıtlarını TTL ile diskte tutar.
+    Bağlantı ilk kullanımda açılır; metodlar bloke edicidir, event loop'tan executor ile çağrılmalıdır.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600):
+        self.path = path
+        self.ttl = ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " stored_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " payload TEXT NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def load(self) -> List[Tuple[str, float, Any]]:
+        """Süresi dolmamış kayıtları (key, stored_at, value) olarak döndürür"""
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT key, stored_at, payload FROM cache WHERE expires_at > ?",
+                (time.time(),)
+            ).fetchall()
+
+        result = []
+        for key, stored_at, payload in rows:
+            try:
+                result.append((key, stored_at, json.loads(payload)))
+            except ValueError:
+                logger.warning(f"Bozuk önbellek kaydı atlandı: {key}")
+        return result
+
+    def put_many(self, items: Dict[str, Tuple[float, Any]]):
+        """key -> (stored_at, value) kayıtlarını tek işlemde yazar"""
+        if not items:
+            return
+
+        rows = [
+            (key, stored_at, stored_at + self.ttl, json.dumps(value, default=str))
+            for key, (stored_at, value) in items.items()
+        ]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, stored_at, expires_at, payload) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
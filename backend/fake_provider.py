@@ -0,0 +1,196 @@
+"""
+Open-Meteo Air Quality API'sinin yerine geçen çevrimdışı sahte sağlayıcı.
+Gerçek yanıt biçiminde, koordinata ve tohuma (seed) göre belirlenimci saatlik veri üretir.
+Gecikme ve hata oranı ayarlanabilir; virgülle ayrılmış çoklu koordinatları destekler.
+
+Kullanım:
+    python fake_provider.py --port 8081 --latency 0.05 --error-rate 0.01
+    AIR_QUALITY_API_URL=http://localhost:8081/v1/air-quality uvicorn main:app
+"""
+import argparse
+import asyncio
+import logging
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from aiohttp import web
+
+logger = logging.getLogger("fake_provider")
+
+HOURLY_UNITS = {
+    "time": "iso8601",
+    "pm10": "μg/m³",
+    "pm2_5": "μg/m³",
+    "nitrogen_dioxide": "μg/m³",
+    "sulphur_dioxide": "μg/m³",
+    "ozone": "μg/m³",
+    "european_aqi": "EAQI"
+}
+
+
+class FakeAirQualityProvider:
+    """
+    seed: aynı tohum ve koordinat her zaman aynı seriyi üretir
+    latency / jitter: her isteğe eklenen gecikme (saniye)
+    error_rate: isteğin tamamen hata (HTTP 429/500) döndürme olasılığı
+    item_error_rate: çoklu yanıtta tek bir koordinatın hata nesnesi döndürme olasılığı
+    """
+
+    def __init__(self, seed: int = 42, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, item_error_rate: float = 0.0):
+        self.seed = seed
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.item_error_rate = item_error_rate
+
+        # Gecikme/hata kararları için ayrı üreteç (veri üretimini etkilemesin)
+        self._rng = random.Random(seed)
+
+        self.requests = 0
+        self.errors = 0
+        self.coordinates_served = 0
+
+    def payload_for(self, latitude: float, longitude: float, forecast_days: int = 1) -> Dict[str, Any]:
+        """Tek bir koordinat için Open-Meteo biçiminde yanıt üretir"""
+        # timezone=auto davranışına yaklaşık: boylamdan saat dilimi
+        utc_offset = int(round(longitude / 15.0)) * 3600
+        local_now = datetime.utcnow() + timedelta(seconds=utc_offset)
+        day_start = local_now.replace(hour=0, minute=0, second=0, microsecond=0)
+        hours = 24 * max(1, forecast_days)
+
+        # Koordinat ve güne bağlı belirlenimci üreteç
+        rng = random.Random(f"{self.seed}:{latitude:.4f}:{longitude:.4f}:{day_start.date().isoformat()}")
+        base_pm25 = rng.uniform(5, 60)
+        base_pm10 = base_pm25 * rng.uniform(1.3, 2.2)
+        base_no2 = rng.uniform(5, 80)
+        base_so2 = rng.uniform(1, 25)
+        base_o3 = rng.uniform(20, 120)
+
+        hourly: Dict[str, List] = {field: [] for field in HOURLY_UNITS}
+        for hour in range(hours):
+            # Günlük döngü: trafik saatlerinde partikül/NO2 artar, öğleden sonra ozon artar
+            traffic = 1 + 0.35 * math.sin((hour % 24 - 4) / 24 * 2 * math.pi)
+            sun = 1 + 0.5 * math.sin((hour % 24 - 9) / 24 * 2 * math.pi)
+            noise = rng.uniform(0.9, 1.1)
+
+            pm25 = round(base_pm25 * traffic * noise, 1)
+            pm10 = round(base_pm10 * traffic * noise, 1)
+            no2 = round(base_no2 * traffic * noise, 1)
+            so2 = round(base_so2 * noise, 1)
+            o3 = round(base_o3 * sun * noise, 1)
+
+            hourly["time"].append((day_start + timedelta(hours=hour)).strftime("%Y-%m-%dT%H:%M"))
+            hourly["pm2_5"].append(pm25)
+            hourly["pm10"].append(pm10)
+            hourly["nitrogen_dioxide"].append(no2)
+            hourly["sulphur_dioxide"].append(so2)
+            hourly["ozone"].append(o3)
+            hourly["european_aqi"].append(int(max(pm25 * 1.6, pm10 * 0.9, no2 * 0.5, o3 * 0.5)))
+
+        return {
+            "latitude": round(latitude, 2),
+            "longitude": round(longitude, 2),
+            "generationtime_ms": 0.1,
+            "utc_offset_seconds": utc_offset,
+            "timezone": "GMT",
+            "timezone_abbreviation": "GMT",
+            "elevation": 0.0,
+            "hourly_units": HOURLY_UNITS,
+            "hourly": hourly
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """/v1/air-quality isteğini karşılar"""
+        self.requests += 1
+
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.errors += 1
+            status = self._rng.choice([429, 500])
+            return web.json_response({"error": True, "reason": f"Simulated error {status}"}, status=status)
+
+        try:
+            latitudes = [float(value) for value in request.query["latitude"].split(",")]
+            longitudes = [float(value) for value in request.query["longitude"].split(",")]
+            forecast_days = int(request.query.get("forecast_days", "1"))
+        except (KeyError, ValueError):
+            return web.json_response({"error": True, "reason": "Invalid latitude/longitude"}, status=400)
+
+        if len(latitudes) != len(longitudes):
+            return web.json_response(
+                {"error": True, "reason": "Latitude and longitude must have the same number of elements"},
+                status=400
+            )
+
+        payloads = []
+        for latitude, longitude in zip(latitudes, longitudes):
+            if len(latitudes) > 1 and self.item_error_rate and self._rng.random() < self.item_error_rate:
+                payloads.append({"error": True, "reason": "Simulated item error"})
+            else:
+                payloads.append(self.payload_for(latitude, longitude, forecast_days))
+        self.coordinates_served += len(payloads)
+
+        # Open-Meteo tek koordinatta nesne, çoklu koordinatta liste döndürür
+        return web.json_response(payloads[0] if len(payloads) == 1 else payloads)
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "coordinates_served": self.coordinates_served
+        }
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/v1/air-quality", self.handle)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+        """Sunucuyu mevcut event loop içinde başlatır; base_url ve runner döndürür"""
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+
+        # port=0 verildiyse işletim sisteminin atadığı portu bul
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{bound_port}/v1/air-quality"
+        logger.info(f"Sahte sağlayıcı başlatıldı: {self.base_url}")
+        return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Çevrimdışı sahte hava kalitesi sağlayıcısı")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.0, help="Sabit gecikme (saniye)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Rastgele ek gecikme üst sınırı (saniye)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="İstek hata olasılığı (0-1)")
+    parser.add_argument("--item-error-rate", type=float, default=0.0, help="Çoklu yanıtta koordinat hata olasılığı (0-1)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    provider = FakeAirQualityProvider(
+        seed=args.seed,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        item_error_rate=args.item_error_rate
+    )
+    web.run_app(provider.make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Sağlayıcıdan gelen saatlik hava kalitesi serilerini koordinat bazında saklar.
+Her istek 24 saatlik bir blok döndürür; bu blok tek seferde saklanır ve
+"son değer", tahmin ve grafik uçları aynı veriden beslenir.
+"""
+import calendar
+import math
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Uygulamadaki alan adı -> Open-Meteo saatlik alan adı
+HOURLY_FIELDS = {
+    "pm25": "pm2_5",
+    "pm10": "pm10",
+    "no2": "nitrogen_dioxide",
+    "so2": "sulphur_dioxide",
+    "o3": "ozone",
+    "aqi": "european_aqi"
+}
+
+HOUR = 3600
+
+
+class HourlySeries:
+    """Tek bir koordinatın saatlik serisi (her kirletici için bir array('d'))"""
+
+    __slots__ = ("start", "utc_offset", "fetched_at", "values")
+
+    def __init__(self, start: int, utc_offset: int, values: Dict[str, array]):
+        self.start = start  # İlk saatin UTC epoch saniyesi
+        self.utc_offset = utc_offset  # Lokasyonun UTC farkı (saniye)
+        self.fetched_at = time.time()
+        self.values = values
+
+    def __len__(self) -> int:
+        return min((len(column) for column in self.values.values()), default=0)
+
+    def index_for(self, timestamp: float) -> int:
+        """Verilen UTC zamanına denk gelen saat indeksini döndürür (seri sınırlarına kırpılır)"""
+        index = int((timestamp - self.start) // HOUR)
+        return max(0, min(index, len(self) - 1))
+
+    def epoch_at(self, index: int) -> int:
+        return self.start + index * HOUR
+
+    def row(self, index: int) -> Dict[str, Optional[float]]:
+        """İndeksteki ölçümleri sözlük olarak döndürür (eksik değerler None)"""
+        result = {}
+        for field, column in self.values.items():
+            value = column[index]
+            result[field] = None if math.isnan(value) else value
+        return result
+
+
+class HourlySeriesStore:
+    """Koordinat anahtarlı, boyutu sınırlı saatlik seri deposu"""
+
+    def __init__(self, max_locations: int = 5000):
+        self.max_locations = max_locations
+        self._series: "OrderedDict[str, HourlySeries]" = OrderedDict()
+
+    @staticmethod
+    def key(latitude: float, longitude: float) -> str:
+        return f"{latitude:.4f}_{longitude:.4f}"
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def put(self, latitude: float, longitude: float, hourly: Dict, utc_offset: int = 0) -> Optional[HourlySeries]:
+        """Sağlayıcının 'hourly' bloğunu saklar"""
+        times = hourly.get("time") or []
+        if not times:
+            return None
+
+        # Open-Meteo timezone=auto ile yerel saat döndürür; UTC'ye çevir
+        first_local = datetime.strptime(times[0], "%Y-%m-%dT%H:%M")
+        start = calendar.timegm(first_local.timetuple()) - int(utc_offset or 0)
+
+        values = {}
+        for field, source in HOURLY_FIELDS.items():
+            raw = hourly.get(source) or []
+            column = array("d", (math.nan if value is None else float(value) for value in raw[:len(times)]))
+            # Eksik alanlar NaN ile doldurulur, böylece tüm kolonlar aynı uzunlukta kalır
+            if len(column) < len(times):
+                column.extend([math.nan] * (len(times) - len(column)))
+            values[field] = column
+
+        series = HourlySeries(start, int(utc_offset or 0), values)
+
+        key = self.key(latitude, longitude)
+        self._series[key] = series
+        self._series.move_to_end(key)
+        while len(self._series) > self.max_locations:
+            self._series.popitem(last=False)
+
+        return series
+
+    def get(self, latitude: float, longitude: float) -> Optional[HourlySeries]:
+        series = self._series.get(self.key(latitude, longitude))
+        if series is not None:
+            self._series.move_to_end(self.key(latitude, longitude))
+        return series
+
+    def rows(self, latitude: float, longitude: float, start: Optional[float] = None,
+             end: Optional[float] = None, local_time: bool = True) -> List[Dict]:
+        """
+        Koordinatın saatlik satırlarını döndürür.
+        local_time=True ise zaman damgası sağlayıcının yerel saatidir ("2024-01-01T13:00"),
+        aksi halde sunucu saatine göre ISO formatındadır.
+        """
+        series = self.get(latitude, longitude)
+        if series is None:
+            return []
+
+        result = []
+        for index in range(len(series)):
+            epoch = series.epoch_at(index)
+            if start is not None and epoch < start:
+                continue
+            if end is not None and epoch > end:
+                break
+
+            if local_time:
+                timestamp = datetime.utcfromtimestamp(epoch + series.utc_offset).strftime("%Y-%m-%dT%H:%M")
+            else:
+                timestamp = datetime.fromtimestamp(epoch).isoformat()
+
+            row = {"timestamp": timestamp}
+            row.update(series.row(index))
+            result.append(row)
+
+        return result
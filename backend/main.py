@@ -1,4 +1,4 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Body, HTTPException, Query, Depends
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Body, HTTPException, Query, Depends, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
 import json
 import random
@@ -9,17 +9,37 @@ import logging
 import os
 from pydantic import BaseModel, Field
 import math
+import time
 
 # api_client modülünü import et
 from api_client import AirQualityClient
 # RabbitMQ istemcisini import et
 from rabbitmq_client import RabbitMQClient
 # Veritabanı ve model importları
-from database import engine, get_db, init_db
+from database import engine, async_engine, ensure_hypertable, get_async_db, init_db, session_scope
+from pool_metrics import pool_stats
+# TimescaleDB saatlik/günlük özetleri (continuous aggregate)
+import rollups
+# Ham veriler için sıkıştırma/saklama politikaları ve depolama raporu
+import storage_policies
 from models import Base, AirQualityData, Anomaly
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 # Anomali tespit modülünü import et
 from anomaly_detector import AnomalyDetector
+# Uyarlamalı veri çekme zamanlayıcısı
+from poll_scheduler import AdaptivePollScheduler
+# Sensör kayıt defteri
+from sensor_registry import Sensor, SensorRegistry, MANUAL_SENSOR_ID_START, sensors_to_json
+# Sensör başına zaman serisi tamponları
+from timeseries import TimeSeriesStore
+# Bellekteki durumun diske anlık görüntüsü
+from snapshot import load_snapshot, save_snapshot
+# Çoklu worker için paylaşılan durum ve lider seçimi
+from state_store import create_state_store
+# AirQualityData satırları için toplu yazma tamponu
+from db_writer import AirQualityWriteBuffer
 
 # Loglama yapılandırması
 logging.basicConfig(
@@ -32,7 +52,30 @@ logger = logging.getLogger("main")
 SIMULATION_MODE_ENABLED = False  # Simülasyon modu devre dışı
 api_client = None
 rabbitmq_client = None
-anomaly_detector = None  # Anomali tespit nesnesi
+main_loop = None  # Uygulamanın event loop'u (başka thread'lerden bildirim göndermek için)
+background_tasks: List[asyncio.Task] = []  # Kapanışta iptal edilen arka plan döngüleri
+
+# Ölçümler veritabanına satır satır değil, toplu olarak yazılır
+db_writer = AirQualityWriteBuffer(
+    engine,
+    max_rows=int(os.getenv("DB_WRITE_BATCH_SIZE", "500")),
+    max_delay=float(os.getenv("DB_WRITE_MAX_DELAY_SECONDS", "1")),
+    max_pending=int(os.getenv("DB_WRITE_MAX_PENDING", "20000"))
+)
+
+# Veri çekme modu: "adaptive" (lokasyon bazında, zamanı gelince) veya "fixed" (5 dakikada bir hepsi)
+POLL_MODE = os.getenv("POLL_MODE", "adaptive")
+POLL_TICK_SECONDS = float(os.getenv("POLL_TICK_SECONDS", "300"))
+# Çok yakın zamanlı lokasyonlar için en kısa bekleme (sıkı döngüyü önler)
+POLL_MIN_SLEEP_SECONDS = float(os.getenv("POLL_MIN_SLEEP_SECONDS", "5"))
+# Uyanıldığında bu kadar saniye içinde zamanı gelecek lokasyonlar da aynı toplu istekle çekilir
+POLL_BATCH_WINDOW_SECONDS = float(os.getenv("POLL_BATCH_WINDOW_SECONDS", "300"))
+poll_scheduler = AdaptivePollScheduler(
+    provider_delay=float(os.getenv("POLL_PROVIDER_DELAY_SECONDS", "300")),
+    spread=float(os.getenv("POLL_SPREAD_SECONDS", "1800")),
+    # Bir grup, api_client'ın tek istekte gönderdiği koordinat sayısı kadar lokasyondur
+    batch_size=int(os.getenv("API_BATCH_SIZE", "25"))
+)
 
 app = FastAPI(
     title="HavaQualityApp API",
@@ -67,65 +110,37 @@ class ManualAirQualityInput(BaseModel):
     o3: Optional[float] = Field(None, description="O3 değeri (μg/m³)")
     co: Optional[float] = Field(None, description="CO değeri (μg/m³)")
 
-# Sensör ve hava kalitesi verileri için modeller
-class Sensor:
-    def __init__(self, id: int, location: str, latitude: float, longitude: float, aqi: int = 0, 
-                 pm25: float = 0, pm10: float = 0, no2: float = 0, so2: float = 0, o3: float = 0):
-        self.id = id
-        self.location = location
-        self.latitude = latitude
-        self.longitude = longitude
-        self.aqi = aqi
-        self.pm25 = pm25
-        self.pm10 = pm10
-        self.no2 = no2
-        self.so2 = so2
-        self.o3 = o3
-    
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "location": self.location,
-            "latitude": self.latitude,
-            "longitude": self.longitude,
-            "aqi": self.aqi,
-            "pm25": self.pm25,
-            "pm10": self.pm10,
-            "no2": self.no2,
-            "so2": self.so2,
-            "o3": self.o3
-        }
-
 # Global değişkenler
-sensors = []  # Sensör listesi
-air_quality_data = []  # Tüm hava kalitesi verileri listesi
+SENSOR_GRID_CELL_DEGREES = float(os.getenv("SENSOR_GRID_CELL_DEGREES", "0.1"))
+# Sensör başına en fazla ölçüm; tamponlar küçük başlar ve gerektikçe bu sınıra kadar büyür
+READINGS_CAPACITY = int(os.getenv("READINGS_CAPACITY", "512"))
+READINGS_RETENTION_SECONDS = float(os.getenv("READINGS_RETENTION_HOURS", "24")) * 3600
 
-# Örnek hava kalitesi verileri
-air_quality_data = []
+def new_sensor_registry() -> SensorRegistry:
+    return SensorRegistry(cell_size=SENSOR_GRID_CELL_DEGREES)
 
-# Uygulama başlangıcında son 24 saatlik örnek veri oluştur
-def generate_initial_data():
-    now = datetime.now()
-    data = []
-    # NOT: Artık sadece tarih bilgisi oluşturacağız, veriler API'den çekilecek
-    # Sadece örnek bir yapı oluşturalım, update_data_background tarafından gerçek verilerle doldurulacak
-    for i in range(1):  # Sadece 1 zaman dilimi oluştur, geri kalanını gerçek API'den alacağız
-        timestamp = now
-        for sensor in sensors:
-            data.append({
-                "sensor_id": sensor["id"],
-                "location": sensor["location"],
-                "timestamp": timestamp.isoformat(),
-                "pm25": 0,
-                "pm10": 0,
-                "no2": 0,
-                "so2": 0,
-                "o3": 0,
-            })
-    return data
+def new_readings() -> TimeSeriesStore:
+    return TimeSeriesStore(capacity=READINGS_CAPACITY, retention=READINGS_RETENTION_SECONDS)
+
+sensor_registry = new_sensor_registry()  # Sensörler (kimlik, ad, koordinat ve ızgara indeksli)
+# Sensör başına son 24 saatin ölçümleri (halka tamponlar)
+readings = new_readings()
+
+# Worker'lar arası durum paylaşımı (STATE_STORE=shared ile uvicorn --workers N desteklenir)
+state_store = create_state_store()
+STATE_SYNC_INTERVAL_SECONDS = float(os.getenv("STATE_SYNC_INTERVAL_SECONDS", "2"))
+
+# Geçmiş sorgularında otomatik çözünürlük: bu saatlere kadar ham veri, sonra saatlik, daha uzunsa günlük özet
+HISTORY_RAW_MAX_HOURS = int(os.getenv("HISTORY_RAW_MAX_HOURS", "48"))
+HISTORY_HOURLY_MAX_HOURS = int(os.getenv("HISTORY_HOURLY_MAX_HOURS", "720"))
+# Özet görünümleri henüz hazır değilse (ör. lider tabloyu dönüştürmeden önce) takipçilerin yeniden kontrol aralığı
+ROLLUP_RECHECK_SECONDS = float(os.getenv("ROLLUP_RECHECK_SECONDS", "60"))
+rollups_checked_at = 0.0
 
-# Başlangıç verilerini oluştur
-air_quality_data = generate_initial_data()
+# Kayıt defteri ve ölçümlerin periyodik anlık görüntüsü (boş bırakılırsa devre dışı)
+STATE_SNAPSHOT_PATH = os.getenv("STATE_SNAPSHOT_PATH", "")
+STATE_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("STATE_SNAPSHOT_INTERVAL_SECONDS", "300"))
+snapshot_stats: Dict[str, Any] = {}
 
 # Routerları bağla
 # app.include_router(air_quality.router)
@@ -149,39 +164,68 @@ async def health_check():
     """
     return {"status": "healthy"}
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match başlığı verilen ETag'i (veya *) içeriyor mu"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
 @app.get("/sensors")
-async def get_sensors(limit: int = Query(100, ge=1, le=100), location: Optional[str] = None):
+async def get_sensors(
+    limit: int = Query(100, ge=1, le=100),
+    location: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    
+    # Tek bir nesil üzerinden çalış: güncelleme sürerken bile tutarlı liste döner
+    generation = sensor_registry.generation()
+    headers = {"ETag": generation.etag, "Cache-Control": "no-cache"}
+    
+    # İstemcideki kopya güncelse gövde gönderme
+    if etag_matches(if_none_match, generation.etag):
+        return Response(status_code=304, headers=headers)
     
     # Filtreleme işlemi
-    filtered_sensors = []
-    
-    for sensor in sensors:
-        if location and isinstance(sensor, Sensor):
-            if location.lower() in sensor.location.lower():
-                filtered_sensors.append(sensor.to_dict())
-        elif isinstance(sensor, Sensor):
-            filtered_sensors.append(sensor.to_dict())
-        elif isinstance(sensor, dict):
-            # Eski tip dict objesi de olabilir
-            filtered_sensors.append(sensor)
-    
-    # Limit uygula
-    result = filtered_sensors[:limit]
-    
-    return {"sensors": result}
+    result = []
+    needle = location.lower() if location else None
+    
+    for sensor in generation.sensors:
+        if needle and needle not in sensor.location.lower():
+            continue
+        result.append(sensor)
+        
+        # Limit uygula
+        if len(result) >= limit:
+            break
+    
+    # Ara dict oluşturmadan doğrudan JSON olarak yaz
+    return Response(content=sensors_to_json(result, key="sensors"), media_type="application/json", headers=headers)
 
 @app.get("/air-quality")
 async def get_air_quality(hours: int = 24):
     """Son birkaç saatin hava kalitesi verilerini döndürür"""
-    # Direkt olarak mevcut verileri döndür (update_data_background tarafından sürekli güncellenir)
-    return air_quality_data
+    # Tamponlardaki verileri döndür (update_data_background ve kuyruk tarafından sürekli güncellenir)
+    since = (datetime.now() - timedelta(hours=hours)).timestamp()
+    return readings.rows(since=since)
+
+def regional_averages_from_stats(stats: Dict[str, Any], rounded: bool = False) -> Dict[str, Any]:
+    """sensor_registry.aggregate sonucundan ortalamalar; değeri olmayan ölçümler 0 döner"""
+    averages = {}
+    for param in ("pm25", "pm10", "no2", "so2", "o3", "aqi"):
+        mean = stats[param]["mean"] or 0
+        if rounded:
+            mean = round(mean) if param == "aqi" else round(mean, 2)
+        averages[param] = mean
+    return averages
 
 @app.get("/api/v1/air-quality/regional")
 async def get_air_quality_regional(
     lat: float = Query(..., description="Merkez noktanın enlemi"),
     lon: float = Query(..., description="Merkez noktanın boylamı"),
     radius: float = Query(25.0, description="Yarıçap (km cinsinden, varsayılan 25 km)"),
-    hours: int = Query(24, description="Kaç saatlik veri getirileceği")
+    hours: int = Query(24, description="Kaç saatlik veri getirileceği"),
+    include_stats: bool = Query(False, description="Maksimum ve yüzdelik istatistiklerini de döndür")
 ):
   
     logger.info(f"Regional API çağrıldı: lat={lat}, lon={lon}, radius={radius}, hours={hours}")
@@ -189,53 +233,17 @@ async def get_air_quality_regional(
     # Geçerli zaman aralığını hesapla
     time_threshold = datetime.now() - timedelta(hours=hours)
     
+    # Tüm sorgular aynı yayınlanmış nesil üzerinde yapılır (sensörler, ortalamalar ve istatistikler tutarlı)
+    generation = sensor_registry.generation()
+    
     # Verilen bölge içindeki sensörleri bul
-    region_sensors = []
-    for sensor in sensors:
-        if isinstance(sensor, Sensor):
-            # İki nokta arasındaki mesafeyi hesapla (Haversine formülü kullanarak)
-            sensor_lat = sensor.latitude
-            sensor_lon = sensor.longitude
-        elif isinstance(sensor, dict):
-            sensor_lat = sensor.get("latitude")
-            sensor_lon = sensor.get("longitude")
-        else:
-            continue
-            
-        if sensor_lat is None or sensor_lon is None:
-            continue
-            
-        # Haversine formülü: kilometre cinsinden iki koordinat arası mesafe
-        # Basitleştirilmiş hali: 1 derece yaklaşık 111 km
-        distance = (((float(sensor_lat) - float(lat)) ** 2 + 
-                     (float(sensor_lon) - float(lon)) ** 2) ** 0.5) * 111
-        
-        if distance <= radius:
-            if isinstance(sensor, Sensor):
-                region_sensors.append(sensor.to_dict())
-            else:
-                region_sensors.append(sensor)
+    # (Izgara indeksi yalnızca yakın hücreleri tarar, mesafe haversine ile hesaplanır)
+    region_sensors = [sensor.to_dict() for _, sensor in generation.within_radius(lat, lon, radius)]
     
     # Bölge içindeki hava kalitesi verilerini filtrele
-    region_data = []
-    for data in air_quality_data:
-        # Verinin saati uygun mu?
-        if "timestamp" not in data:
-            continue
-            
-        try:
-            data_time = datetime.fromisoformat(data["timestamp"].replace('Z', '+00:00'))
-            if data_time < time_threshold:
-                continue
-        except (ValueError, TypeError):
-            continue
-            
-        # Veri bölge içinde mi?
-        sensor_id = data.get("sensor_id")
-        for sensor in region_sensors:
-            if sensor.get("id") == sensor_id:
-                region_data.append(data)
-                break
+    # (Ölçümler nesil yayınlanmadan önce eklenir; neslin sensörlerinin ölçümleri her zaman bulunur)
+    region_ids = [sensor["id"] for sensor in region_sensors]
+    region_data = readings.rows(since=time_threshold.timestamp(), sensor_ids=region_ids)
     
     # Eğer veri yoksa, her sensör için örnek veri oluştur
     if len(region_data) == 0 and len(region_sensors) > 0:
@@ -243,127 +251,50 @@ async def get_air_quality_regional(
         logger.info("Bölgesel veri bulunamadı ve örnek veri üretimi devre dışı")
         region_data = []
     
-    # Bölgesel ortalama değerleri hesapla
-    if len(region_data) > 0:
-        total_pm25 = sum(d.get("pm25", 0) for d in region_data if d.get("pm25") is not None)
-        total_pm10 = sum(d.get("pm10", 0) for d in region_data if d.get("pm10") is not None)
-        total_no2 = sum(d.get("no2", 0) for d in region_data if d.get("no2") is not None)
-        total_so2 = sum(d.get("so2", 0) for d in region_data if d.get("so2") is not None)
-        total_o3 = sum(d.get("o3", 0) for d in region_data if d.get("o3") is not None)
-        total_aqi = sum(d.get("aqi", 0) for d in region_data if d.get("aqi") is not None)
-        
-        count = len(region_data)
-        regional_averages = {
-            "pm25": round(total_pm25 / count, 2) if total_pm25 > 0 else 0,
-            "pm10": round(total_pm10 / count, 2) if total_pm10 > 0 else 0,
-            "no2": round(total_no2 / count, 2) if total_no2 > 0 else 0,
-            "so2": round(total_so2 / count, 2) if total_so2 > 0 else 0,
-            "o3": round(total_o3 / count, 2) if total_o3 > 0 else 0,
-            "aqi": round(total_aqi / count) if total_aqi > 0 else 0,
-        }
-    else:
-        regional_averages = {
-            "pm25": 0, 
-            "pm10": 0,
-            "no2": 0,
-            "so2": 0,
-            "o3": 0,
-            "aqi": 0
-        }
+    # Bölgesel ortalamalar hücre toplamlarından (yalnızca sınır hücrelerindeki sensörler tek tek okunur)
+    regional_averages = regional_averages_from_stats(generation.regional_summary(lat, lon, radius), rounded=True)
     
-    return {
+    response = {
         "sensors": region_sensors,
         "air_quality": region_data,
         "regional_averages": regional_averages
     }
+    # Maksimum ve yüzdelikler sensör değerlerinin tamamını gerektirir, yalnızca istenirse hesaplanır
+    if include_stats:
+        response["regional_stats"] = generation.aggregate(region_ids)
+    return response
 
 @app.get("/api/v1/air-quality/by-region")
 async def get_air_quality_by_region(
     latitude: float = Query(..., description="Merkez noktanın enlemi"),
     longitude: float = Query(..., description="Merkez noktanın boylamı"),
     radius: float = Query(25.0, description="Yarıçap (km cinsinden, varsayılan 25 km)"),
-    hours: int = Query(24, description="Kaç saatlik veri getirileceği")
+    hours: int = Query(24, description="Kaç saatlik veri getirileceği"),
+    include_stats: bool = Query(False, description="Maksimum ve yüzdelik istatistiklerini de döndür")
 ):
    
     # Geçerli zaman aralığını hesapla
     time_threshold = datetime.now() - timedelta(hours=hours)
     
+    # Tüm sorgular aynı yayınlanmış nesil üzerinde yapılır (sensörler, ortalamalar ve istatistikler tutarlı)
+    generation = sensor_registry.generation()
+    
     # Verilen bölge içindeki sensörleri bul
-    region_sensors = []
-    for sensor in sensors:
-        if isinstance(sensor, Sensor):
-            # İki nokta arasındaki mesafeyi hesapla (Haversine formülü kullanarak)
-            sensor_lat = sensor.latitude
-            sensor_lon = sensor.longitude
-        elif isinstance(sensor, dict):
-            sensor_lat = sensor.get("latitude")
-            sensor_lon = sensor.get("longitude")
-        else:
-            continue
-            
-        # Haversine formülü: kilometre cinsinden iki koordinat arası mesafe
-        # Basitleştirilmiş hali: 1 derece yaklaşık 111 km
-        distance = (((sensor_lat - latitude) ** 2 + 
-                     (sensor_lon - longitude) ** 2) ** 0.5) * 111
-        
-        if distance <= radius:
-            if isinstance(sensor, Sensor):
-                region_sensors.append(sensor.to_dict())
-            else:
-                region_sensors.append(sensor)
+    # (Izgara indeksi yalnızca yakın hücreleri tarar, mesafe haversine ile hesaplanır)
+    region_sensors = [sensor.to_dict() for _, sensor in generation.within_radius(latitude, longitude, radius)]
     
     # Bölge içindeki hava kalitesi verilerini filtrele
-    region_data = []
-    for data in air_quality_data:
-        # Verinin saati uygun mu?
-        try:
-            data_time = datetime.fromisoformat(data["timestamp"])
-            if data_time < time_threshold:
-                continue
-                
-            # Veri bölge içinde mi?
-            sensor_id = data.get("sensor_id")
-            for sensor in region_sensors:
-                if sensor.get("id") == sensor_id:
-                    region_data.append(data)
-                    break
-        except (ValueError, TypeError):
-            continue
+    # (Ölçümler nesil yayınlanmadan önce eklenir; neslin sensörlerinin ölçümleri her zaman bulunur)
+    region_ids = [sensor["id"] for sensor in region_sensors]
+    region_data = readings.rows(since=time_threshold.timestamp(), sensor_ids=region_ids)
     
     # Debug bilgisi
     logger.info(f"Bölge içinde {len(region_sensors)} sensör ve {len(region_data)} veri noktası bulundu.")
     if region_data and len(region_data) > 0:
         logger.info(f"Örnek veri: {region_data[0]}")
     
-    # Bölgesel ortalama değerleri hesapla
-    regional_averages = {
-        "pm25": 0,
-        "pm10": 0,
-        "no2": 0,
-        "so2": 0,
-        "o3": 0,
-        "aqi": 0
-    }
-    
-    # Sensör verileri ortalaması (direkt sensör objelerinden)
-    if region_sensors:
-        sensor_averages = {
-            "pm25": 0,
-            "pm10": 0,
-            "no2": 0,
-            "so2": 0,
-            "o3": 0,
-            "aqi": 0
-        }
-        
-        for param in sensor_averages.keys():
-            values = [sensor.get(param, 0) for sensor in region_sensors if sensor.get(param) is not None]
-            logger.debug(f"Sensör {param}, Değer sayısı: {len(values)}, Değerler: {values[:5]}")
-            if values:
-                sensor_averages[param] = sum(values) / len(values)
-                
-        # Sensör ortalamalarını kullan
-        regional_averages = sensor_averages
+    # Bölgesel ortalamalar hücre toplamlarından (yalnızca sınır hücrelerindeki sensörler tek tek okunur)
+    regional_averages = regional_averages_from_stats(generation.regional_summary(latitude, longitude, radius))
     
     # Eğer veri yoksa, her sensör için örnek veri oluştur
     if len(region_data) == 0 and len(region_sensors) > 0:
@@ -372,7 +303,7 @@ async def get_air_quality_by_region(
         region_data = []
     
     # Sensör verileri ve bölgesel ortalamaları döndür
-    return {
+    response = {
         "region": {
             "center": {"latitude": latitude, "longitude": longitude},
             "radius": radius,
@@ -386,6 +317,10 @@ async def get_air_quality_by_region(
             "to": datetime.now().isoformat()
         }
     }
+    # Maksimum ve yüzdelikler sensör değerlerinin tamamını gerektirir, yalnızca istenirse hesaplanır
+    if include_stats:
+        response["regional_stats"] = generation.aggregate(region_ids)
+    return response
 
 @app.websocket("/ws/alerts")
 async def websocket_endpoint(websocket: WebSocket):
@@ -433,98 +368,75 @@ async def process_sensor_data_message(message: Dict[str, Any]):
     """RabbitMQ'dan gelen sensör veri mesajını işler"""
     logger.info(f"RabbitMQ'dan sensör verisi alındı: {message.get('location', 'Unknown')}")
     
-    # Mesajı işle ve gerekli veri yapılarını güncelle
-    global air_quality_data, anomaly_detector
-    
     try:
         # Mesajdaki verileri al
         location = message.get("location")
         timestamp = message.get("timestamp")
         sensor_id = message.get("sensor_id")
         
-        # Veritabanı bağlantısı oluştur
-        from sqlalchemy.orm import sessionmaker
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        db = SessionLocal()
+        # Sensörün tamponuna ekle (24 saatten eski ölçümler tampondan atılır);
+        # kuyruk tüketicileri tüm worker'larda çalışır, takipçiler ölçümü lidere iletir
+        if sensor_id is not None:
+            store_reading(message)
         
-        try:
-            # Hava kalitesi verilerini güncelle veya ekle
-            for i, item in enumerate(air_quality_data):
-                if item.get("sensor_id") == sensor_id:
-                    # Aynı sensör için veriyi güncelle
-                    air_quality_data[i] = message
-                    break
-            else:
-                # Eğer mevcut bir veri bulunamazsa yeni ekle
-                air_quality_data.append(message)
-            
-            # Veri sayısını sınırla (son 24 saatlik veri)
-            now = datetime.now()
-            cutoff_time = now - timedelta(hours=24)
-            air_quality_data = [
-                item for item in air_quality_data 
-                if datetime.fromisoformat(item["timestamp"]) > cutoff_time
-            ]
-            
-            # Veritabanına kaydet
-            db_record = AirQualityData(
-                timestamp=datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp,
-                latitude=message.get("latitude", 0),
-                longitude=message.get("longitude", 0),
-                pm25=message.get("pm25", 0),
-                pm10=message.get("pm10", 0),
-                no2=message.get("no2", 0),
-                so2=message.get("so2", 0),
-                o3=message.get("o3", 0),
-                aqi=message.get("aqi", 0)
-            )
-            db.add(db_record)
-            db.commit()
-            
-            # Anomali tespiti yap
-            if anomaly_detector is None:
-                from anomaly_detector import AnomalyDetector
-                anomaly_detector = AnomalyDetector(db)
-                
-            # Anomali kontrolü yap
-            anomalies = anomaly_detector.detect_anomalies(db_record)
-            
-            # Eğer anomali varsa bildirim gönder
-            if anomalies:
-                for anomaly in anomalies:
-                    # Anomaliyi WebSocket üzerinden kullanıcılara bildir
-                    alert = {
-                        "id": anomaly.get("id", random.randint(1000, 9999)),
-                        "timestamp": now.isoformat(),
-                        "location": location,
-                        "title": "Anomali Tespit Edildi",
-                        "message": anomaly.get("description", "Anormal hava kalitesi değeri tespit edildi"),
-                        "severity": anomaly.get("severity", "medium").lower(),
-                        "parameter": anomaly.get("type", "unknown")
-                    }
-                    
-                    # WebSocket aracılığıyla bildirim gönder
-                    for ws in connected_websockets.copy():
-                        try:
-                            await ws.send_text(json.dumps(alert))
-                        except Exception as e:
-                            logger.error(f"WebSocket üzerinden uyarı gönderilirken hata: {str(e)}")
-                            if ws in connected_websockets:
-                                connected_websockets.remove(ws)
-                    
-                    # RabbitMQ aracılığıyla da bildirim gönder
-                    if rabbitmq_client:
-                        await send_alert_to_queue(alert)
-            
-        except Exception as inner_e:
-            db.rollback()
-            logger.error(f"Veritabanı işlemi sırasında hata: {str(inner_e)}")
-        finally:
-            db.close()
+        # Veritabanına yazma tamponu üzerinden kaydet; anomali tespiti satır yazılıp kimlik alındıktan sonra yapılır
+        db_writer.add(
+            {
+                "timestamp": datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp,
+                "latitude": message.get("latitude", 0),
+                "longitude": message.get("longitude", 0),
+                "pm25": message.get("pm25", 0),
+                "pm10": message.get("pm10", 0),
+                "no2": message.get("no2", 0),
+                "so2": message.get("so2", 0),
+                "o3": message.get("o3", 0),
+                "aqi": message.get("aqi", 0)
+            },
+            callback=lambda record: check_anomalies(record, location)
+        )
             
     except Exception as e:
         logger.error(f"Sensör verisi işlenirken hata: {str(e)}")
 
+def check_anomalies(record: AirQualityData, location: Optional[str]):
+    """
+    Veritabanına yazılmış ölçümde anomali arar (db_writer callback thread'inde çalışır).
+    Her ölçüm kendi oturumunda işlenir; bağlantı iş bitince havuza döner.
+    Anomali varsa bildirimler uygulamanın event loop'unda gönderilir.
+    """
+    with session_scope() as db:
+        anomalies = AnomalyDetector(db).detect_anomalies(record)
+    if anomalies and main_loop is not None:
+        asyncio.run_coroutine_threadsafe(notify_anomalies(anomalies, location), main_loop)
+
+async def notify_anomalies(anomalies: List[Dict[str, Any]], location: Optional[str]):
+    """Tespit edilen anomalileri WebSocket ve RabbitMQ üzerinden bildirir"""
+    now = datetime.now()
+    for anomaly in anomalies:
+        # Anomaliyi WebSocket üzerinden kullanıcılara bildir
+        alert = {
+            "id": anomaly.get("id", random.randint(1000, 9999)),
+            "timestamp": now.isoformat(),
+            "location": location,
+            "title": "Anomali Tespit Edildi",
+            "message": anomaly.get("description", "Anormal hava kalitesi değeri tespit edildi"),
+            "severity": anomaly.get("severity", "medium").lower(),
+            "parameter": anomaly.get("type", "unknown")
+        }
+        
+        # WebSocket aracılığıyla bildirim gönder
+        for ws in connected_websockets.copy():
+            try:
+                await ws.send_text(json.dumps(alert))
+            except Exception as e:
+                logger.error(f"WebSocket üzerinden uyarı gönderilirken hata: {str(e)}")
+                if ws in connected_websockets:
+                    connected_websockets.remove(ws)
+        
+        # RabbitMQ aracılığıyla da bildirim gönder
+        if rabbitmq_client:
+            await send_alert_to_queue(alert)
+
 # Uygulamaya gelen uyarı mesajı işlemek için callback
 async def process_alert_message(message: Dict[str, Any]):
     """RabbitMQ'dan gelen uyarı mesajını işler ve WebSocket üzerinden kullanıcılara iletir"""
@@ -661,30 +573,32 @@ async def check_and_create_alert(location, pm25, pm10, aqi, thresholds, last_ale
     return False
 
 # Periyodik olarak sensör verilerini gerçek API'den güncelleme
-async def update_sensors_from_api():
-    """Sensör verilerini periyodik olarak API'den günceller"""
-    global api_client, sensors, rabbitmq_client, connected_websockets
+async def update_sensors_from_api(locations: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Sensör verilerini API'den günceller.
+    locations verilirse sadece o lokasyonlar çekilir (diğer sensörler korunur).
+    Başarıyla çekilen lokasyonların adı -> AQI eşlemesini döndürür.
+    """
+    global api_client, rabbitmq_client, connected_websockets
     
-    # Veritabanı bağlantısı için Session oluştur
-    from sqlalchemy.orm import sessionmaker
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db = SessionLocal()
+    fetched: Dict[str, Any] = {}
     
     try:
         logger.info("Sensör verileri API'den güncelleniyor...")
         logger.info(f"Aktif WebSocket bağlantı sayısı: {len(connected_websockets)}")
         
-        # Manuel girilen sensörleri koru - ID'si 1000 ve üzeri olanlar manuel eklenenler
-        manual_sensors = [s for s in sensors if (isinstance(s, dict) and s.get("id", 0) >= 1000) or 
-                         (isinstance(s, Sensor) and s.id >= 1000)]
-        
         if api_client:
-            # Tüm lokasyonlardan veri getir
-            all_locations = await api_client.get_locations(limit=40)  # 20 TR şehri + 5 İstanbul ilçesi + 15 dünya şehri
+            if locations is None:
+                # Tüm lokasyonlardan veri getir (toplu çekilir, ölçümler istasyonlarla birlikte döner)
+                all_locations = await api_client.get_locations(limit=40)  # 20 TR şehri + 5 İstanbul ilçesi + 15 dünya şehri
+            else:
+                # Sadece zamanı gelen lokasyonları çek
+                all_locations = await api_client.get_stations(locations)
             
             if all_locations:
                 updated_sensors = []
                 for i, loc in enumerate(all_locations):
+                    fetched[loc.get("name", "Unknown")] = loc.get("aqi", 0)
                     station = loc.get("station", {})
                     if "geo" in station and len(station.get("geo", [])) >= 2:
                         lat = station.get("geo", [0, 0])[0]
@@ -698,12 +612,14 @@ async def update_sensors_from_api():
                         
                         # Sadece valid koordinatlara sahip sensörleri ekle
                         if lat != 0 and lon != 0:
-                            # Her sensör için detaylı veri çek
-                            air_quality = await api_client.get_latest_by_coordinates(
-                                latitude=lat,
-                                longitude=lon,
-                                location_name=city_name
-                            )
+                            # get_locations ile gelen ölçümleri kullan, yoksa tekil istek at
+                            air_quality = loc.get("air_quality")
+                            if not air_quality:
+                                air_quality = await api_client.get_latest_by_coordinates(
+                                    latitude=lat,
+                                    longitude=lon,
+                                    location_name=city_name
+                                )
                             
                             # API'den dönen ölçüm değerlerini al
                             measurements = air_quality.get("measurements", {})
@@ -715,15 +631,8 @@ async def update_sensors_from_api():
                             aqi = measurements.get("aqi", 0) or loc.get("aqi", 0)
                             
                             # Manuel eklenen bir sensör ile koordinat çakışması var mı kontrol et
-                            is_manual_location = False
-                            for manual_sensor in manual_sensors:
-                                manual_lat = manual_sensor.latitude if isinstance(manual_sensor, Sensor) else manual_sensor.get("latitude", 0)
-                                manual_lon = manual_sensor.longitude if isinstance(manual_sensor, Sensor) else manual_sensor.get("longitude", 0)
-                                
-                                # Koordinat karşılaştırması
-                                if abs(float(manual_lat) - float(lat)) < 0.5 and abs(float(manual_lon) - float(lon)) < 0.5:
-                                    is_manual_location = True
-                                    break
+                            # (ID'si 1000 ve üzeri olanlar manuel eklenenler; yalnızca manuel sensörlerin ızgarası taranır)
+                            is_manual_location = sensor_registry.has_manual_near(float(lat), float(lon))
                             
                             # Eğer bu konum manuel olarak eklenmişse, API'den güncelleme yapma
                             if is_manual_location:
@@ -731,7 +640,7 @@ async def update_sensors_from_api():
                                 continue
                             
                             sensor = Sensor(
-                                id=i + 1,
+                                id=loc.get("index", i) + 1,
                                 location=city_name,
                                 latitude=lat,
                                 longitude=lon,
@@ -752,25 +661,19 @@ async def update_sensors_from_api():
                                 sensor_data["timestamp"] = datetime.now().isoformat()
                                 await send_sensor_data_to_queue(sensor_data)
                                 
-                            # Veritabanına kaydet
-                            try:
-                                now = datetime.now()
-                                db_record = AirQualityData(
-                                    timestamp=now,
-                                    latitude=lat,
-                                    longitude=lon,
-                                    pm25=pm25,
-                                    pm10=pm10,
-                                    no2=no2,
-                                    so2=so2,
-                                    o3=o3,
-                                    aqi=aqi
-                                )
-                                db.add(db_record)
-                                db.commit()
-                            except Exception as db_error:
-                                db.rollback()
-                                logger.error(f"Veri kaydederken hata: {str(db_error)}")
+                            # Veritabanına kaydet (yazma tamponu satırları toplu olarak ekler)
+                            now = datetime.now()
+                            db_writer.add({
+                                "timestamp": now,
+                                "latitude": lat,
+                                "longitude": lon,
+                                "pm25": pm25,
+                                "pm10": pm10,
+                                "no2": no2,
+                                "so2": so2,
+                                "o3": o3,
+                                "aqi": aqi
+                            })
                             
                             # Uyarı eşiklerini kontrol et ve gerekirse uyarı oluştur
                             if aqi >= 50 and len(connected_websockets) > 0:  # Sarı kategori (AQI >= 50)
@@ -812,112 +715,48 @@ async def update_sensors_from_api():
                                     logger.warning(f"Uyarı hiçbir WebSocket bağlantısına gönderilemedi")
                 
                 if updated_sensors:
-                    # Önceki sensörlerle yenileri birleştirirken tekrarları önleyelim
-                    unique_sensors = {}
+                    # Tur boyunca kayıt defterine dokunulmaz; yeni kayıtlar yukarıda ayrı bir listede toplanır
+                    # ve tur sonunda tek seferde yayınlanır (okuyucular yarım güncellenmiş durum görmez)
                     
-                    # Önce yeni sensörleri ekle
+                    # Önce ölçümleri tamponlara ekle: yeni nesli gören okuyucu ölçümlerini de görür
+                    timestamp = datetime.now().isoformat()
                     for sensor in updated_sensors:
-                        key = f"{sensor.latitude:.3f}_{sensor.longitude:.3f}"
-                        unique_sensors[key] = sensor
-                    
-                    # Manuel eklenen sensörleri koru
-                    for manual_sensor in manual_sensors:
-                        if isinstance(manual_sensor, Sensor):
-                            key = f"{manual_sensor.latitude:.3f}_{manual_sensor.longitude:.3f}"
-                            unique_sensors[key] = manual_sensor
-                        elif isinstance(manual_sensor, dict):
-                            key = f"{manual_sensor.get('latitude', 0):.3f}_{manual_sensor.get('longitude', 0):.3f}"
-                            unique_sensors[key] = manual_sensor
-                    
-                    # Eğer eski sensörler yeni listede yoksa ve geçerli koordinatlara sahipse ekle
-                    for old_sensor in sensors:
-                        # Manuel sensörler zaten eklendi, tekrar ekleme
-                        if (isinstance(old_sensor, dict) and old_sensor.get("id", 0) >= 1000) or \
-                           (isinstance(old_sensor, Sensor) and old_sensor.id >= 1000):
-                            continue
-                            
-                        if isinstance(old_sensor, Sensor):
-                            key = f"{old_sensor.latitude:.3f}_{old_sensor.longitude:.3f}"
-                            if key not in unique_sensors and old_sensor.latitude != 0 and old_sensor.longitude != 0:
-                                unique_sensors[key] = old_sensor
-                        elif isinstance(old_sensor, dict):
-                            lat = old_sensor.get("latitude", 0)
-                            lon = old_sensor.get("longitude", 0)
-                            key = f"{lat:.3f}_{lon:.3f}"
-                            if key not in unique_sensors and lat != 0 and lon != 0:
-                                unique_sensors[key] = old_sensor
-                    
-                    # Listeyi güncelleyip hazır hale getir
-                    sensors = list(unique_sensors.values())
-                    logger.info(f"Sensör listesi API'den güncellendi: {len(sensors)} sensör")
+                        readings.append_record(sensor.to_record(timestamp))
                     
-                    # air_quality_data listesini de güncelle - manuel veriler korunacak
-                    new_air_quality_data = []
+                    # Artık veri gelmeyen sensörlerin eski ölçümlerini de temizle
+                    readings.expire_all()
                     
-                    # Mevcut manuel verileri koru
-                    for data in air_quality_data:
-                        sensor_id = data.get("sensor_id", 0)
-                        if sensor_id >= 1000:  # Manuel eklenen sensör verisi
-                            new_air_quality_data.append(data)
-                    
-                    # API'den gelen verilerle güncelle
-                    now = datetime.now()
-                    for sensor in sensors:
-                        if isinstance(sensor, Sensor) and sensor.id < 1000:  # Sadece API sensörleri
-                            new_data = {
-                                "sensor_id": sensor.id,
-                                "location": sensor.location,
-                                "latitude": sensor.latitude,
-                                "longitude": sensor.longitude,
-                                "timestamp": now.isoformat(),
-                                "pm25": sensor.pm25,
-                                "pm10": sensor.pm10,
-                                "no2": sensor.no2,
-                                "so2": sensor.so2,
-                                "o3": sensor.o3,
-                                "aqi": sensor.aqi
-                            }
-                            new_air_quality_data.append(new_data)
-                        elif isinstance(sensor, dict) and sensor.get("id", 0) < 1000:  # Eski format API sensörleri
-                            new_data = {
-                                "sensor_id": sensor.get("id", 0),
-                                "location": sensor.get("location", "Unknown"),
-                                "latitude": sensor.get("latitude", 0),
-                                "longitude": sensor.get("longitude", 0),
-                                "timestamp": now.isoformat(),
-                                "pm25": sensor.get("pm25", 0),
-                                "pm10": sensor.get("pm10", 0),
-                                "no2": sensor.get("no2", 0),
-                                "so2": sensor.get("so2", 0),
-                                "o3": sensor.get("o3", 0),
-                                "aqi": sensor.get("aqi", 0)
-                            }
-                            new_air_quality_data.append(new_data)
-                    
-                    # Güncellenen listeyi ata
-                    air_quality_data = new_air_quality_data
+                    # Yeni sensörleri kimliğe göre ekle/güncelle; aynı koordinattaki eski kayıt yenisiyle
+                    # değiştirilir, manuel sensörler ve bu turda çekilmeyen sensörler korunur
+                    sensor_registry.upsert_many(updated_sensors)
+                    generation = sensor_registry.generation()
+                    logger.info(f"Sensör listesi API'den güncellendi: {len(generation.sensors)} sensör (nesil {generation.number})")
             else:
                 logger.warning("API'den hiç sensör verisi alınamadı, mevcut sensörler korunuyor")
     except Exception as e:
         logger.error(f"Sensör verilerini güncellerken hata: {str(e)}")
         import traceback
         logger.error(traceback.format_exc())
-    finally:
-        # Veritabanı bağlantısını kapat
-        db.close()
+    
+    return fetched
 
 # Periyodik olarak veri güncelleme ve anomali kontrolü yapacak arka plan görevi
 async def update_data_background():
     """Arka planda düzenli olarak sensör verilerini API'den günceller"""
-    global api_client, sensors
+    global api_client
     
+    fetched = {}
     try:
         logger.info("İlk sensör verileri çekiliyor...")
         # İlk başta hemen bir kez veri çek
-        await update_sensors_from_api()
+        fetched = await update_sensors_from_api()
     except Exception as e:
         logger.error(f"İlk veri çekme işleminde hata: {str(e)}")
     
+    if POLL_MODE == "adaptive" and api_client:
+        await adaptive_update_loop(fetched)
+        return
+    
     while True:
         try:
             # 5 dakikada bir güncelle
@@ -934,6 +773,45 @@ async def update_data_background():
             # Hata durumunda kısa süre bekleyip devam et
             await asyncio.sleep(10)
 
+async def adaptive_update_loop(initial_fetch: Dict[str, Any]):
+    """
+    Lokasyonları sabit 5 dakikada bir topluca değil, zamanı geldikçe çeker.
+    Sağlayıcının saatlik güncellemesine göre planlanır, istekler aralığa yayılır.
+    """
+    locations_by_name = {location["name"]: location for location in api_client.all_locations[:40]}
+    poll_scheduler.register(list(locations_by_name))
+    
+    # İlk turun sonuçlarını kaydet
+    for name in locations_by_name:
+        if name in initial_fetch:
+            poll_scheduler.record(name, initial_fetch[name])
+        else:
+            poll_scheduler.mark_failed(name)
+    
+    logger.info(f"Uyarlamalı veri çekme başlatıldı: {len(locations_by_name)} lokasyon")
+    
+    while True:
+        try:
+            # Bir sonraki grubun zamanına kadar bekle (en az POLL_MIN_SLEEP_SECONDS, en fazla POLL_TICK_SECONDS)
+            await asyncio.sleep(min(POLL_TICK_SECONDS, max(POLL_MIN_SLEEP_SECONDS, poll_scheduler.seconds_until_next())))
+            
+            # Yakında zamanı gelecekler de (ör. dalgalı lokasyonların tekrar çekimi) aynı toplu isteğe eklenir
+            due = poll_scheduler.due(window=POLL_BATCH_WINDOW_SECONDS)
+            if not due:
+                continue
+            
+            logger.info(f"Zamanı gelen {len(due)} lokasyon çekiliyor")
+            fetched = await update_sensors_from_api([locations_by_name[name] for name in due])
+            
+            for name in due:
+                if name in fetched:
+                    poll_scheduler.record(name, fetched[name])
+                else:
+                    poll_scheduler.mark_failed(name)
+        except Exception as e:
+            logger.error(f"Uyarlamalı güncelleme sırasında hata: {str(e)}")
+            await asyncio.sleep(10)
+
 # Şehir adına göre veri çekme yardımcı fonksiyonu
 async def fetch_city_data(city_name, api_client):
     try:
@@ -970,29 +848,140 @@ async def fetch_city_data(city_name, api_client):
             
             if "error" not in air_quality:
                 # Sensör listesinde bu şehir var mı?
-                for sensor in sensors:
-                    if isinstance(sensor, Sensor):
-                        if sensor.location.lower() == city_location["name"].lower():
-                            # Mevcut sensörü güncelle
-                            sensor.aqi = air_quality.get("measurements", {}).get("aqi", 50)
-                            logger.info(f"{sensor.location} sensörü güncellendi, AQI: {sensor.aqi}")
-                            break
-                    elif isinstance(sensor, dict):
-                        if sensor["location"].lower() == city_location["name"].lower():
-                            # Mevcut sensörü güncelle (eski dict formatı için)
-                            sensor["aqi"] = air_quality.get("measurements", {}).get("aqi", 50)
-                            logger.info(f"{sensor['location']} sensörü güncellendi, AQI: {sensor['aqi']}")
-                            break
+                sensor = sensor_registry.by_name(city_location["name"])
+                if sensor:
+                    # Mevcut sensörü güncelle
+                    sensor = sensor_registry.update(sensor.id, aqi=air_quality.get("measurements", {}).get("aqi", 50))
+                    logger.info(f"{sensor.location} sensörü güncellendi, AQI: {sensor.aqi}")
         else:
             logger.warning(f"{city_name} için koordinat bulunamadı")
             
     except Exception as e:
         logger.error(f"{city_name} verileri çekilirken hata: {str(e)}")
 
+async def save_state_snapshot():
+    """Kayıt defteri ve ölçümleri diske yazar (dosya yazımı executor'da)"""
+    if not STATE_SNAPSHOT_PATH:
+        return
+    try:
+        result = await asyncio.get_event_loop().run_in_executor(
+            None, save_snapshot, STATE_SNAPSHOT_PATH, sensor_registry, readings
+        )
+        snapshot_stats["last_save"] = result
+        logger.info(f"Durum anlık görüntüsü kaydedildi: {result['sensors']} sensör, {result['readings']} ölçüm, {result['bytes']} byte")
+    except Exception as e:
+        logger.error(f"Durum anlık görüntüsü kaydedilirken hata: {str(e)}")
+
+async def snapshot_loop():
+    """Durumu STATE_SNAPSHOT_INTERVAL_SECONDS aralıklarla diske yazar"""
+    while True:
+        await asyncio.sleep(STATE_SNAPSHOT_INTERVAL_SECONDS)
+        await save_state_snapshot()
+
+def load_state_snapshot():
+    """Önceki çalışmadan kalan durumu ilk API turundan önce yükler"""
+    if not STATE_SNAPSHOT_PATH:
+        return
+    try:
+        result = load_snapshot(STATE_SNAPSHOT_PATH, sensor_registry, readings)
+        snapshot_stats["last_load"] = result
+        if result["status"] == "loaded":
+            logger.info(f"Durum anlık görüntüsü yüklendi: {result['sensors']} sensör, {result['readings']} ölçüm ({result['age_seconds']} sn önce kaydedilmiş, {result['seconds']} sn)")
+        else:
+            logger.info(f"Durum anlık görüntüsü yüklenmedi: {result['status']}")
+    except Exception as e:
+        logger.error(f"Durum anlık görüntüsü yüklenirken hata: {str(e)}")
+
+def start_leader_tasks():
+    """Veri çekme ve anlık görüntü döngülerini başlatır (yalnızca lider worker'da çalışır)"""
+    background_tasks.append(asyncio.create_task(update_data_background()))
+    
+    if STATE_SNAPSHOT_PATH:
+        background_tasks.append(asyncio.create_task(snapshot_loop()))
+
+async def refresh_shared_state():
+    """Takipçi worker: lider yeni durum yayınladıysa yükler ve tek atamayla mevcut durumun yerine koyar"""
+    global sensor_registry, readings
+    
+    registry, series = new_sensor_registry(), new_readings()
+    result = await asyncio.get_event_loop().run_in_executor(None, state_store.refresh, registry, series)
+    if result:
+        sensor_registry, readings = registry, series
+        logger.debug(f"Paylaşılan durum yüklendi: {result['sensors']} sensör, {result['readings']} ölçüm")
+
+async def state_sync_loop():
+    """
+    Lider: takipçilerden iletilen yazmaları uygular ve değişen durumu yayınlar.
+    Takipçi: liderliği almayı dener (lider süreç ölmüşse), alamazsa yayınlanan durumu yükler.
+    """
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(STATE_SYNC_INTERVAL_SECONDS)
+        try:
+            if state_store.is_leader:
+                await loop.run_in_executor(None, state_store.drain, sensor_registry, readings)
+                await loop.run_in_executor(None, state_store.publish, sensor_registry, readings)
+            elif state_store.acquire_leadership():
+                logger.info(f"Liderlik devralındı (pid {os.getpid()}), veri çekme bu worker'da başlıyor")
+                start_leader_tasks()
+                await loop.run_in_executor(None, prepare_timescale)
+            else:
+                await refresh_shared_state()
+                if not rollups.is_available() and time.monotonic() - rollups_checked_at >= ROLLUP_RECHECK_SECONDS:
+                    await loop.run_in_executor(None, prepare_timescale)
+        except Exception as e:
+            logger.error(f"Paylaşılan durum senkronizasyonunda hata: {str(e)}")
+
+def prepare_timescale():
+    """
+    Lider air_quality_data'yı hypertable'a çevirir, özet görünümlerini ve sıkıştırma/saklama politikalarını
+    ekler; takipçi yalnızca görünümlerin hazır olup olmadığını kontrol eder. Bloke edicidir.
+    """
+    global rollups_checked_at
+    rollups_checked_at = time.monotonic()
+    hypertable = ensure_hypertable() if state_store.is_leader else False
+    rollups.ensure_rollups(engine, create=state_store.is_leader)
+    
+    # Sıkıştırma ve saklama hypertable'a bağlıdır; dönüşüm başarısızsa politikalar eklenmez
+    if hypertable:
+        storage_policies.ensure_storage_policies(engine)
+
+def store_manual_sensor(sensor: Sensor, record: Optional[Dict[str, Any]] = None):
+    """
+    Manuel girişin sensör kaydını ve ölçümünü yazar.
+    Lider yerelde uygular; takipçi lidere iletir, değişiklik sonraki yayında tüm worker'lara ulaşır.
+    """
+    if state_store.is_leader:
+        sensor_registry.upsert(sensor)
+        if record:
+            readings.append_record(record)
+    else:
+        state_store.submit(sensor, record)
+
+def store_reading(record: Dict[str, Any]):
+    """
+    Ölçümü sensörün tamponuna yazar. Lider yerelde uygular; takipçinin yerel tamponu bir sonraki
+    yenilemede liderin durumuyla değiştirildiği için takipçi ölçümü gelen kutusu üzerinden lidere iletir.
+    """
+    if state_store.is_leader:
+        readings.append_record(record)
+    else:
+        state_store.submit(None, record)
+
 # Uygulama başlatma olayı
 @app.on_event("startup")
 async def startup_event():
-    global api_client, rabbitmq_client, anomaly_detector
+    global api_client, rabbitmq_client, main_loop
+    
+    main_loop = asyncio.get_event_loop()
+    
+    # Worker'lardan yalnızca biri (lider) veri çeker; diğerleri liderin yayınladığı durumu okur
+    if state_store.acquire_leadership():
+        logger.info(f"Bu worker lider (pid {os.getpid()}, durum deposu: {state_store.kind})")
+        load_state_snapshot()
+    else:
+        logger.info(f"Bu worker takipçi (pid {os.getpid()}), durum liderden okunacak")
+        await refresh_shared_state()
     
     # Veritabanını başlat
     try:
@@ -1000,23 +989,20 @@ async def startup_event():
         Base.metadata.create_all(bind=engine)
         logger.info("Veritabanı tabloları başarıyla oluşturuldu")
         
-        # Anomali tespit nesnesini oluştur
-        # Not: Bu daha sonra asenkron bağlamda ilk ihtiyaç olduğunda da oluşturulabilir
-        from sqlalchemy.orm import sessionmaker
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        db = SessionLocal()
-        try:
-            anomaly_detector = AnomalyDetector(db)
-            logger.info("Anomali tespit modülü başlatıldı")
-        finally:
-            db.close()
+        # Hypertable dönüşümü, saatlik/günlük özet görünümleri ve sıkıştırma/saklama politikaları
+        # (TimescaleDB yoksa uyarı yazılır, ham tablo kullanılır)
+        await asyncio.get_event_loop().run_in_executor(None, prepare_timescale)
     except Exception as e:
         logger.error(f"Veritabanı başlatılırken hata: {str(e)}")
     
+    # Ölçümlerin toplu yazma thread'ini başlat
+    db_writer.start()
+    
     # API istemcisini başlat
     try:
         # Open-Meteo API için istemci oluştur (API anahtarı gerektirmez)
         api_client = AirQualityClient()
+        await api_client.open()
         logger.info("Open-Meteo Air Quality API istemcisi başlatıldı")
     except Exception as e:
         logger.error(f"API istemcisi başlatılırken hata: {str(e)}")
@@ -1052,148 +1038,60 @@ async def startup_event():
         logger.error(f"RabbitMQ istemcisi başlatılırken hata: {str(e)}")
         logger.warning("RabbitMQ bağlantısı kurulamadı. Kuyruk sistemi devre dışı.")
     
-    # Arka plan görevini hemen başlat
-    asyncio.create_task(update_data_background())
+    # Arka plan görevlerini hemen başlat
+    if state_store.is_leader:
+        start_leader_tasks()
+    if state_store.kind != "local":
+        background_tasks.append(asyncio.create_task(state_sync_loop()))
     
     logger.info("Hava Kalitesi API başlatıldı ve hazır")
 
 # Tek seferlik veri güncelleme fonksiyonu - Başlangıçta hemen veri yüklemek için
 async def update_data_once():
-    global air_quality_data, rabbitmq_client
+    global rabbitmq_client
     
     # Yeni veri ekle
     now = datetime.now()
     new_data = []
     
-    for sensor in sensors:
+    for sensor in sensor_registry.snapshot():
         try:
             # Sensördeki koordinatlardan gerçek veri çek
-            latitude = None
-            longitude = None
-            location = None
-            sensor_id = None
-            pm25 = 0
-            pm10 = 0
-            no2 = 0
-            so2 = 0
-            o3 = 0
-            aqi_value = 0
-            
-            if isinstance(sensor, Sensor):
-                latitude = sensor.latitude
-                longitude = sensor.longitude
-                location = sensor.location
-                sensor_id = sensor.id
-            elif isinstance(sensor, dict):
-                latitude = sensor.get("latitude")
-                longitude = sensor.get("longitude")
-                location = sensor.get("location")
-                sensor_id = sensor.get("id")
-            
-            if api_client and latitude and longitude:
+            if api_client and sensor.latitude and sensor.longitude:
                 api_data = await api_client.get_latest_by_coordinates(
-                    latitude=latitude,
-                    longitude=longitude,
-                    location_name=location
+                    latitude=sensor.latitude,
+                    longitude=sensor.longitude,
+                    location_name=sensor.location
                 )
                 
                 # API'den gelen verileri çıkar
                 measurements = api_data.get("measurements", {})
                 pm25 = measurements.get("pm25", 0)
-                pm10 = measurements.get("pm10", 0)
-                no2 = measurements.get("no2", 0)
-                so2 = measurements.get("so2", 0)
-                o3 = measurements.get("o3", 0)
                 
-                # AQI değeri güncelle
-                api_aqi = measurements.get("aqi", None)
-                if api_aqi:
-                    if isinstance(sensor, Sensor):
-                        sensor.aqi = api_aqi
-                        sensor.pm25 = pm25
-                        sensor.pm10 = pm10
-                        sensor.no2 = no2
-                        sensor.so2 = so2
-                        sensor.o3 = o3
-                    else:
-                        sensor["aqi"] = api_aqi
-                        sensor["pm25"] = pm25
-                        sensor["pm10"] = pm10
-                        sensor["no2"] = no2
-                        sensor["so2"] = so2
-                        sensor["o3"] = o3
-                else:
-                    # API'den AQI gelmezse PM2.5'ten basit hesapla
-                    calculated_aqi = int(pm25 * 1.25) if pm25 else 0
-                    if isinstance(sensor, Sensor):
-                        sensor.aqi = calculated_aqi
-                        sensor.pm25 = pm25
-                        sensor.pm10 = pm10
-                        sensor.no2 = no2
-                        sensor.so2 = so2
-                        sensor.o3 = o3
-                    else:
-                        sensor["aqi"] = calculated_aqi
-                        sensor["pm25"] = pm25
-                        sensor["pm10"] = pm10
-                        sensor["no2"] = no2
-                        sensor["so2"] = so2
-                        sensor["o3"] = o3
+                # API'den AQI gelmezse PM2.5'ten basit hesapla
+                aqi_value = measurements.get("aqi", None) or (int(pm25 * 1.25) if pm25 else 0)
                 
-                if isinstance(sensor, Sensor):
-                    aqi_value = sensor.aqi
-                    pm25 = sensor.pm25
-                    pm10 = sensor.pm10
-                    no2 = sensor.no2
-                    so2 = sensor.so2
-                    o3 = sensor.o3
-                else:
-                    aqi_value = sensor["aqi"]
-                    pm25 = sensor.get("pm25", 0)
-                    pm10 = sensor.get("pm10", 0)
-                    no2 = sensor.get("no2", 0)
-                    so2 = sensor.get("so2", 0)
-                    o3 = sensor.get("o3", 0)
+                sensor = sensor_registry.update(
+                    sensor.id,
+                    aqi=aqi_value,
+                    pm25=pm25,
+                    pm10=measurements.get("pm10", 0),
+                    no2=measurements.get("no2", 0),
+                    so2=measurements.get("so2", 0),
+                    o3=measurements.get("o3", 0)
+                ) or sensor
                     
-                logger.info(f"Gerçek veri çekildi: {location}, AQI: {aqi_value}, PM2.5: {pm25}, PM10: {pm10}, NO2: {no2}, SO2: {so2}, O3: {o3}")
+                logger.info(f"Gerçek veri çekildi: {sensor.location}, AQI: {sensor.aqi}, PM2.5: {sensor.pm25}, PM10: {sensor.pm10}, NO2: {sensor.no2}, SO2: {sensor.so2}, O3: {sensor.o3}")
             else:
-                # API yoksa veya koordinat bulunamazsa hata logla ve boş veri döndür
-                logger.warning(f"API'den veri çekilemedi veya koordinat yok: {location}")
-                
-                # Sensor nesnesinden mevcut değerleri al (eğer daha önce güncellendiğinde set edilmişse)
-                if isinstance(sensor, Sensor):
-                    pm25 = sensor.pm25
-                    pm10 = sensor.pm10
-                    no2 = sensor.no2
-                    so2 = sensor.so2
-                    o3 = sensor.o3
-                    aqi_value = sensor.aqi
-                elif isinstance(sensor, dict):
-                    pm25 = sensor.get("pm25", 0)
-                    pm10 = sensor.get("pm10", 0)
-                    no2 = sensor.get("no2", 0)
-                    so2 = sensor.get("so2", 0)
-                    o3 = sensor.get("o3", 0)
-                    aqi_value = sensor.get("aqi", 0)
-                    
-                logger.info(f"API verisi kullanılamadı: {location}, AQI: {aqi_value}")
+                # API yoksa veya koordinat bulunamazsa sensördeki mevcut değerler kullanılır
+                logger.warning(f"API'den veri çekilemedi veya koordinat yok: {sensor.location}")
+                logger.info(f"API verisi kullanılamadı: {sensor.location}, AQI: {sensor.aqi}")
             
             # Veri oluştur - Tüm ölçüm değerlerini dahil et
-            sensor_data = {
-                "sensor_id": sensor_id,
-                "location": location,
-                "latitude": latitude,
-                "longitude": longitude,
-                "timestamp": now.isoformat(),
-                "pm25": pm25,
-                "pm10": pm10,
-                "no2": no2,
-                "so2": so2,
-                "o3": o3,
-                "aqi": aqi_value
-            }
+            sensor_data = sensor.to_record(now.isoformat())
             
-            # Veriyi listeye ekle
+            # Veriyi tampona ekle
+            readings.append_record(sensor_data)
             new_data.append(sensor_data)
             
             # Sensör verisini RabbitMQ kuyruğuna gönder
@@ -1201,24 +1099,43 @@ async def update_data_once():
                 await send_sensor_data_to_queue(sensor_data)
                 
         except Exception as e:
-            sensor_location = getattr(sensor, 'location', sensor.get('location', 'Unknown')) if hasattr(sensor, 'get') else 'Unknown'
-            logger.error(f"Sensör verisi güncellenirken hata: {sensor_location}, Error: {str(e)}")
+            logger.error(f"Sensör verisi güncellenirken hata: {sensor.location}, Error: {str(e)}")
     
-    # Veri listesini güncelle
-    air_quality_data = new_data  # Tamamen yeni verilerle değiştir
     logger.info(f"İlk veriler başarıyla yüklendi: {len(new_data)} sensör")
 
 # Uygulama sonlandırma olayı 
 @app.on_event("shutdown")
 async def shutdown_event():
-    global rabbitmq_client
+    global rabbitmq_client, api_client
     
+    # Önce ölçüm üreticilerini durdur (RabbitMQ tüketicisi, veri çekme ve eşitleme döngüleri);
+    # yazma tamponu kapandıktan sonra eklenen satırlar yazılamaz
     if rabbitmq_client:
         try:
             await rabbitmq_client.close()
             logger.info("RabbitMQ bağlantısı kapatıldı")
         except Exception as e:
             logger.error(f"RabbitMQ bağlantısı kapatılırken hata: {str(e)}")
+    
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+    
+    # Son durumu kaydet (bir sonraki başlatmada yüklenir) ve liderliği bırak
+    if state_store.is_leader:
+        await save_state_snapshot()
+    state_store.close()
+    
+    # Tamponda bekleyen ölçümleri veritabanına yaz
+    await asyncio.get_event_loop().run_in_executor(None, db_writer.close)
+    await async_engine.dispose()
+    
+    if api_client:
+        try:
+            await api_client.close()
+        except Exception as e:
+            logger.error(f"API istemcisi kapatılırken hata: {str(e)}")
 
 @app.get("/api/v1/air-quality/history")
 async def get_air_quality_history(
@@ -1226,34 +1143,67 @@ async def get_air_quality_history(
     latitude: Optional[float] = Query(None, description="Filtrelemek için enlem"),
     longitude: Optional[float] = Query(None, description="Filtrelemek için boylam"),
     radius: float = Query(25.0, description="Yarıçap (km cinsinden)"),
-    db: Session = Depends(get_db)
+    resolution: str = Query("auto", description="raw, hour, day veya auto (süreye göre seçilir)"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     
     # Zaman sınırını hesapla
     time_threshold = datetime.now() - timedelta(hours=hours)
     
-    # Sorguyu oluştur
-    query = db.query(AirQualityData).filter(AirQualityData.timestamp >= time_threshold)
+    # Çözünürlüğü seç: uzun aralıklar ham satırlar yerine saatlik/günlük özetlerden okunur
+    if resolution == "auto":
+        if hours <= HISTORY_RAW_MAX_HOURS:
+            resolution = "raw"
+        elif hours <= HISTORY_HOURLY_MAX_HOURS:
+            resolution = "hour"
+        else:
+            resolution = "day"
+    if resolution not in ("raw", "hour", "day"):
+        raise HTTPException(status_code=400, detail="resolution raw, hour, day veya auto olmalı")
     
-    # Koordinat filtrelemesi (opsiyonel)
+    # Koordinat kutusu: Haversine formülü basitleştirilmiş - 1 derece ~= 111 km
+    # Bu, yaklaşık bir hesaplama yapar ve performans sağlar
+    lat_delta = lng_delta = 0.0
     if latitude is not None and longitude is not None:
-        # Haversine formülü basitleştirilmiş - 1 derece ~= 111 km
-        # Bu, yaklaşık bir hesaplama yapar ve performans sağlar
-        lat_min = latitude - (radius / 111.0)
-        lat_max = latitude + (radius / 111.0)
-        
+        lat_delta = radius / 111.0
         # Boylam için düzeltme (enlem arttıkça uzunluk azalır)
         lng_factor = abs(math.cos(math.radians(latitude)))
-        lng_min = longitude - (radius / (111.0 * lng_factor))
-        lng_max = longitude + (radius / (111.0 * lng_factor))
-        
-        query = query.filter(
-            AirQualityData.latitude.between(lat_min, lat_max),
-            AirQualityData.longitude.between(lng_min, lng_max)
+        lng_delta = radius / (111.0 * lng_factor)
+    
+    if resolution != "raw" and rollups.is_available():
+        view = "air_quality_hourly" if resolution == "hour" else "air_quality_daily"
+        try:
+            statement, params = rollups.history_query(
+                view, time_threshold, latitude, longitude, lat_delta, lng_delta
+            )
+            records = rollups.history_rows(await db.execute(statement, params))
+            return {
+                "count": len(records),
+                "records": records,
+                "time_range": {
+                    "from": time_threshold.isoformat(),
+                    "to": datetime.now().isoformat()
+                },
+                "resolution": resolution,
+                "source": "rollup"  # Verinin kaynağını belirt
+            }
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Özet görünümünden geçmiş okunamadı, ham veri kullanılıyor: {str(e)}")
+    resolution = "raw"
+    
+    # Sorguyu oluştur (asenkron oturum: yavaş sorgu event loop'u ve WebSocket uyarılarını bekletmez)
+    query = select(AirQualityData).where(AirQualityData.timestamp >= time_threshold)
+    
+    # Koordinat filtrelemesi (opsiyonel)
+    if latitude is not None and longitude is not None:
+        query = query.where(
+            AirQualityData.latitude.between(latitude - lat_delta, latitude + lat_delta),
+            AirQualityData.longitude.between(longitude - lng_delta, longitude + lng_delta)
         )
     
     # Verileri al ve sırala
-    records = query.order_by(AirQualityData.timestamp.desc()).limit(1000).all()
+    records = (await db.execute(query.order_by(AirQualityData.timestamp.desc()).limit(1000))).scalars().all()
     
     # Sonuçları düzenle
     result = []
@@ -1271,38 +1221,16 @@ async def get_air_quality_history(
             "aqi": record.aqi
         })
     
-    # Veritabanında kayıt yoksa, mevcut air_quality_data listesini kullan
+    # Veritabanında kayıt yoksa, bellekteki sensör tamponlarını kullan
     if not result:
         logger.info("Veritabanında kayıt bulunamadı, mevcut sensör verilerini kullanıyoruz")
         
-        # air_quality_data listesinden filtreleme yap
-        filtered_data = []
-        for data in air_quality_data:
-            # Zaman kontrolü
-            try:
-                data_time = datetime.fromisoformat(data["timestamp"].replace('Z', '+00:00'))
-                if data_time < time_threshold:
-                    continue
-            except (ValueError, TypeError):
-                continue
-                
-            # Koordinat kontrolü (varsa)
-            if latitude is not None and longitude is not None:
-                try:
-                    data_lat = float(data.get("latitude", 0))
-                    data_lon = float(data.get("longitude", 0))
-                    
-                    # Basit mesafe hesabı
-                    distance = (((data_lat - latitude) ** 2 + 
-                                (data_lon - longitude) ** 2) ** 0.5) * 111
-                    
-                    if distance > radius:
-                        continue
-                except (ValueError, TypeError):
-                    continue
-            
-            # Veriyi ekle
-            filtered_data.append(data)
+        # Koordinat verildiyse yalnızca yarıçap içindeki sensörlerin verileri
+        sensor_ids = None
+        if latitude is not None and longitude is not None:
+            sensor_ids = [sensor.id for _, sensor in sensor_registry.within_radius(latitude, longitude, radius)]
+        
+        filtered_data = readings.rows(since=time_threshold.timestamp(), sensor_ids=sensor_ids)
         
         # Sonuçları döndür
         return {
@@ -1312,6 +1240,7 @@ async def get_air_quality_history(
                 "from": time_threshold.isoformat(),
                 "to": datetime.now().isoformat()
             },
+            "resolution": resolution,
             "source": "memory"  # Verinin kaynağını belirt
         }
     
@@ -1322,6 +1251,7 @@ async def get_air_quality_history(
             "from": time_threshold.isoformat(),
             "to": datetime.now().isoformat()
         },
+        "resolution": resolution,
         "source": "database"  # Verinin kaynağını belirt
     }
 
@@ -1331,51 +1261,83 @@ async def debug_sensors():
 
     result = []
     
-    logger.info(f"Debug sensors endpoint çağrıldı. Toplam sensör sayısı: {len(sensors)}")
-    
-    for i, sensor in enumerate(sensors):
-        if isinstance(sensor, dict):
-            result.append({
-                "index": i,
-                "type": "dict",
-                "id": sensor.get("id"),
-                "location": sensor.get("location"),
-                "latitude": sensor.get("latitude"),
-                "longitude": sensor.get("longitude"),
-                "aqi": sensor.get("aqi"),
-                "pm25": sensor.get("pm25"),
-                "pm10": sensor.get("pm10"),
-                "no2": sensor.get("no2"),
-                "so2": sensor.get("so2"),
-                "o3": sensor.get("o3")
-            })
-        elif isinstance(sensor, Sensor):
-            result.append({
-                "index": i,
-                "type": "Sensor",
-                "id": sensor.id,
-                "location": sensor.location,
-                "latitude": sensor.latitude,
-                "longitude": sensor.longitude,
-                "aqi": sensor.aqi,
-                "pm25": sensor.pm25,
-                "pm10": sensor.pm10,
-                "no2": sensor.no2,
-                "so2": sensor.so2,
-                "o3": sensor.o3
-            })
-        else:
-            result.append({
-                "index": i,
-                "type": str(type(sensor)),
-                "data": str(sensor)
-            })
+    snapshot = sensor_registry.snapshot()
+    logger.info(f"Debug sensors endpoint çağrıldı. Toplam sensör sayısı: {len(snapshot)}")
+    
+    for i, sensor in enumerate(snapshot):
+        entry = {"index": i, "type": "Sensor"}
+        entry.update(sensor.to_dict())
+        result.append(entry)
     
     return {
-        "total_sensors": len(sensors),
+        "total_sensors": len(snapshot),
+        "registry": sensor_registry.stats(),
+        "readings": readings.stats(),
+        "snapshot": snapshot_stats,
+        "state_store": state_store.stats(),
         "sensors": result
     }
 
+@app.get("/debug/api-client")
+async def debug_api_client():
+    """API istemcisinin bağlantı havuzu, önbellek ve rate limit istatistiklerini döndürür"""
+    if not api_client:
+        return {"status": "not_initialized"}
+    
+    return {
+        "pool": api_client.get_pool_stats(),
+        "cache": api_client.get_cache_stats(),
+        "rate_limiter": api_client.get_rate_limit_stats(),
+        "poll_scheduler": poll_scheduler.stats()
+    }
+
+@app.get("/debug/db-pool")
+async def debug_db_pool():
+    """Senkron ve asenkron bağlantı havuzlarının kullanım, bekleme süresi ve zaman aşımı istatistiklerini döndürür"""
+    return {
+        "sync": pool_stats(engine),
+        "async": pool_stats(async_engine)
+    }
+
+@app.get("/debug/rollups")
+async def debug_rollups():
+    """Continuous aggregate görünümlerinin durumunu döndürür"""
+    return {"status": rollups.status, "views": list(rollups.VIEWS)}
+
+@app.get("/admin/storage")
+async def admin_storage():
+    """Ham tabloların chunk boyutları ve sıkıştırma oranları, özet görünümlerinin boyutları ve politika işleri"""
+    try:
+        return await asyncio.get_event_loop().run_in_executor(None, storage_policies.storage_report, engine)
+    except Exception as e:
+        logger.error(f"Depolama raporu alınamadı: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Depolama raporu alınamadı: {str(e)}")
+
+@app.get("/debug/db-writer")
+async def debug_db_writer():
+    """Ölçüm yazma tamponunun kuyruk, toplu yazma süresi ve atılan satır istatistiklerini döndürür"""
+    return db_writer.stats()
+
+def get_hourly_chart_points(sensor_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Sensörün koordinatı için API istemcisinde saklanan saatlik seriden (ağ isteği yapmadan) grafik noktaları üretir"""
+    if not api_client:
+        return []
+    
+    rows = api_client.hourly.rows(
+        sensor_data["latitude"],
+        sensor_data["longitude"],
+        end=datetime.now().timestamp(),
+        local_time=False
+    )
+    
+    points = []
+    for row in rows:
+        point = dict(sensor_data)
+        point.update({key: value for key, value in row.items() if value is not None})
+        points.append(point)
+    
+    return points
+
 # Yeni endpoint ekle - Grafik verileri için son 24 saatlik veriyi döndür
 @app.get("/api/v1/air-quality/latest")
 async def get_latest_air_quality_data(
@@ -1395,126 +1357,35 @@ async def get_latest_air_quality_data(
     target_sensor = None
     
     if location:
-        # İsme göre sensör ara
-        for sensor in sensors:
-            if isinstance(sensor, Sensor):
-                if location.lower() in sensor.location.lower():
-                    target_sensor = sensor
-                    break
-            elif isinstance(sensor, dict):
-                if location.lower() in sensor.get("location", "").lower():
-                    target_sensor = sensor
-                    break
+        # İsme göre sensör ara (tam eşleşme O(1), yoksa ad içinde arama)
+        target_sensor = sensor_registry.search(location)
     elif latitude and longitude:
-        # Koordinata göre sensör ara
-        for sensor in sensors:
-            if isinstance(sensor, Sensor):
-                sensor_lat = sensor.latitude
-                sensor_lon = sensor.longitude
-            elif isinstance(sensor, dict):
-                sensor_lat = sensor.get("latitude", 0)
-                sensor_lon = sensor.get("longitude", 0)
-            else:
-                continue
-                
-            # Mesafe hesapla
-            distance = (((sensor_lat - latitude) ** 2 + 
-                        (sensor_lon - longitude) ** 2) ** 0.5) * 111
-                        
-            if distance <= radius:
-                target_sensor = sensor
-                break
+        # Koordinata göre yarıçap içindeki en yakın sensörü ara
+        nearest = sensor_registry.nearest(latitude, longitude, k=1, max_distance_km=radius)
+        if nearest:
+            target_sensor = nearest[0][1]
     
-    # Eğer hedef sensör bulunduysa, onun için veri oluştur
+    # Eğer hedef sensör bulunduysa onun verisini, bulunamazsa ilk sensörün verisini döndür
     if target_sensor:
-        # Sensör ID'sini al
-        sensor_id = target_sensor.id if isinstance(target_sensor, Sensor) else target_sensor.get("id", 0)
-        
-        # Sensör verilerini al
-        for data in air_quality_data:
-            if data.get("sensor_id") == sensor_id:
-                filtered_data.append(data)
-                break
-        
-        # Eğer veri yoksa, mevcut sensör bilgilerinden bir veri noktası oluştur
-        if not filtered_data:
-            now = datetime.now()
-            
-            if isinstance(target_sensor, Sensor):
-                new_data = {
-                    "sensor_id": target_sensor.id,
-                    "location": target_sensor.location,
-                    "latitude": target_sensor.latitude,
-                    "longitude": target_sensor.longitude,
-                    "timestamp": now.isoformat(),
-                    "pm25": target_sensor.pm25,
-                    "pm10": target_sensor.pm10,
-                    "no2": target_sensor.no2,
-                    "so2": target_sensor.so2,
-                    "o3": target_sensor.o3,
-                    "aqi": target_sensor.aqi
-                }
-            else:
-                new_data = {
-                    "sensor_id": target_sensor.get("id", 0),
-                    "location": target_sensor.get("location", "Unknown"),
-                    "latitude": target_sensor.get("latitude", 0),
-                    "longitude": target_sensor.get("longitude", 0),
-                    "timestamp": now.isoformat(),
-                    "pm25": target_sensor.get("pm25", 0),
-                    "pm10": target_sensor.get("pm10", 0),
-                    "no2": target_sensor.get("no2", 0),
-                    "so2": target_sensor.get("so2", 0),
-                    "o3": target_sensor.get("o3", 0),
-                    "aqi": target_sensor.get("aqi", 0)
-                }
-            
-            filtered_data.append(new_data)
-            
-            # Grafik için 24 saatlik veri noktaları oluştur
-            for i in range(1, 24):
-                past_time = now - timedelta(hours=i)
-                past_data = new_data.copy()
-                past_data["timestamp"] = past_time.isoformat()
-                filtered_data.append(past_data)
+        # Sensörün son 24 saatlik verilerini al
+        filtered_data = readings.rows(since=time_threshold.timestamp(), sensor_ids=[target_sensor.id])
     else:
-        # Hedef sensör bulunamazsa, tüm sensörlerden ilk veriyi al
-        if sensors and len(sensors) > 0:
-            target_sensor = sensors[0]
-            
-            if isinstance(target_sensor, Sensor):
-                new_data = {
-                    "sensor_id": target_sensor.id,
-                    "location": target_sensor.location,
-                    "latitude": target_sensor.latitude,
-                    "longitude": target_sensor.longitude,
-                    "timestamp": datetime.now().isoformat(),
-                    "pm25": target_sensor.pm25,
-                    "pm10": target_sensor.pm10,
-                    "no2": target_sensor.no2,
-                    "so2": target_sensor.so2,
-                    "o3": target_sensor.o3,
-                    "aqi": target_sensor.aqi
-                }
-            else:
-                new_data = {
-                    "sensor_id": target_sensor.get("id", 0),
-                    "location": target_sensor.get("location", "Unknown"),
-                    "latitude": target_sensor.get("latitude", 0),
-                    "longitude": target_sensor.get("longitude", 0),
-                    "timestamp": datetime.now().isoformat(),
-                    "pm25": target_sensor.get("pm25", 0),
-                    "pm10": target_sensor.get("pm10", 0),
-                    "no2": target_sensor.get("no2", 0),
-                    "so2": target_sensor.get("so2", 0),
-                    "o3": target_sensor.get("o3", 0),
-                    "aqi": target_sensor.get("aqi", 0)
-                }
-                
+        snapshot = sensor_registry.snapshot()
+        target_sensor = snapshot[0] if snapshot else None
+    
+    # Veri yoksa, mevcut sensör bilgilerinden veri noktaları oluştur
+    if target_sensor and not filtered_data:
+        now = datetime.now()
+        new_data = target_sensor.to_record(now.isoformat())
+        
+        # Sağlayıcıdan gelen saatlik seri varsa grafiği onunla doldur
+        hourly_points = get_hourly_chart_points(new_data)
+        if hourly_points:
+            filtered_data.extend(hourly_points)
+        else:
             filtered_data.append(new_data)
             
             # Grafik için 24 saatlik veri noktaları oluştur
-            now = datetime.now()
             for i in range(1, 24):
                 past_time = now - timedelta(hours=i)
                 past_data = new_data.copy()
@@ -1605,16 +1476,6 @@ async def add_manual_measurement(data: ManualAirQualityInput = Body(...)):
     try:
         logger.info(f"Manuel veri girişi: {data.location}")
         
-        # Yeni sensör ID'si oluştur (1000 ve üzeri ID'ler manuel sensörler için)
-        max_sensor_id = 1000
-        for sensor in sensors:
-            if isinstance(sensor, Sensor) and sensor.id >= 1000:
-                max_sensor_id = max(max_sensor_id, sensor.id)
-            elif isinstance(sensor, dict) and sensor.get("id", 0) >= 1000:
-                max_sensor_id = max(max_sensor_id, sensor.get("id", 0))
-        
-        new_sensor_id = max_sensor_id + 1
-        
         # Eksik değerler için varsayılanlar
         pm25 = data.pm25 or 0
         pm10 = data.pm10 or 0
@@ -1624,78 +1485,45 @@ async def add_manual_measurement(data: ManualAirQualityInput = Body(...)):
         aqi = data.aqi or 0
         
         # Aynı koordinatlara sahip sensör var mı kontrol et
-        existing_sensor = None
-        for sensor in sensors:
-            if isinstance(sensor, Sensor):
-                if abs(sensor.latitude - data.latitude) < 0.01 and abs(sensor.longitude - data.longitude) < 0.01:
-                    existing_sensor = sensor
-                    break
-            elif isinstance(sensor, dict):
-                if abs(sensor.get("latitude", 0) - data.latitude) < 0.01 and abs(sensor.get("longitude", 0) - data.longitude) < 0.01:
-                    existing_sensor = sensor
-                    break
+        existing_sensor = sensor_registry.find_duplicate(data.latitude, data.longitude)
         
         # Eğer aynı koordinatta sensör varsa onu güncelle, yoksa yeni oluştur
         if existing_sensor:
             logger.info(f"Mevcut sensör güncelleniyor: {data.location}")
             
-            if isinstance(existing_sensor, Sensor):
-                # Mevcut değerleri koru
-                if not data.pm25:
-                    pm25 = existing_sensor.pm25
-                if not data.pm10:
-                    pm10 = existing_sensor.pm10
-                if not data.no2:
-                    no2 = existing_sensor.no2
-                if not data.so2:
-                    so2 = existing_sensor.so2
-                if not data.o3:
-                    o3 = existing_sensor.o3
-                if not data.aqi:
-                    aqi = existing_sensor.aqi
-                
-                # Sensörü güncelle
-                existing_sensor.location = data.location
-                existing_sensor.pm25 = pm25
-                existing_sensor.pm10 = pm10
-                existing_sensor.no2 = no2
-                existing_sensor.so2 = so2
-                existing_sensor.o3 = o3
-                existing_sensor.aqi = aqi
-                
-                # Veri için sensör ID'sini al
-                sensor_id = existing_sensor.id
-            else:
-                # Mevcut değerleri koru (dict formatı)
-                if not data.pm25:
-                    pm25 = existing_sensor.get("pm25", 0)
-                if not data.pm10:
-                    pm10 = existing_sensor.get("pm10", 0)
-                if not data.no2:
-                    no2 = existing_sensor.get("no2", 0)
-                if not data.so2:
-                    so2 = existing_sensor.get("so2", 0)
-                if not data.o3:
-                    o3 = existing_sensor.get("o3", 0)
-                if not data.aqi:
-                    aqi = existing_sensor.get("aqi", 0)
-                
-                # Sensörü güncelle
-                existing_sensor["location"] = data.location
-                existing_sensor["pm25"] = pm25
-                existing_sensor["pm10"] = pm10
-                existing_sensor["no2"] = no2
-                existing_sensor["so2"] = so2
-                existing_sensor["o3"] = o3
-                existing_sensor["aqi"] = aqi
-                
-                # Veri için sensör ID'sini al
-                sensor_id = existing_sensor.get("id", 0)
+            # Girilmeyen değerler için mevcut değerleri koru
+            if not data.pm25:
+                pm25 = existing_sensor.pm25
+            if not data.pm10:
+                pm10 = existing_sensor.pm10
+            if not data.no2:
+                no2 = existing_sensor.no2
+            if not data.so2:
+                so2 = existing_sensor.so2
+            if not data.o3:
+                o3 = existing_sensor.o3
+            if not data.aqi:
+                aqi = existing_sensor.aqi
+            
+            # Sensörü güncelle (yazma aşağıda ölçümle birlikte yapılır)
+            sensor = existing_sensor.replace(
+                location=data.location,
+                pm25=pm25,
+                pm10=pm10,
+                no2=no2,
+                so2=so2,
+                o3=o3,
+                aqi=aqi
+            )
+            
+            # Veri için sensör ID'sini al
+            sensor_id = existing_sensor.id
         else:
-            # Yeni sensör oluştur
+            # Yeni sensör oluştur (1000 ve üzeri ID'ler manuel sensörler için, tüm worker'larda tekil)
+            new_sensor_id = state_store.allocate_id(sensor_registry, MANUAL_SENSOR_ID_START)
             logger.info(f"Yeni sensör oluşturuluyor: {data.location}")
             
-            new_sensor = Sensor(
+            sensor = Sensor(
                 id=new_sensor_id,
                 location=data.location,
                 latitude=data.latitude,
@@ -1707,9 +1535,6 @@ async def add_manual_measurement(data: ManualAirQualityInput = Body(...)):
                 so2=so2,
                 o3=o3
             )
-            
-            # Sensörü listeye ekle
-            sensors.append(new_sensor)
             logger.info(f"Yeni sensör eklendi: {data.location}, ID: {new_sensor_id}")
             
             # Veri için sensör ID'sini ayarla
@@ -1731,29 +1556,23 @@ async def add_manual_measurement(data: ManualAirQualityInput = Body(...)):
             "aqi": aqi
         }
         
-        # Veriyi listeye ekle
-        air_quality_data.append(air_quality_record)
+        # Sensörü ve veriyi sensörün tamponuna yaz
+        store_manual_sensor(sensor, air_quality_record)
         
-        # Veritabanına kaydet
-        from sqlalchemy.orm import sessionmaker
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        db = SessionLocal()
+        # Veritabanına kaydet (yazma tamponu satırı toplu olarak ekler)
+        db_writer.add({
+            "timestamp": now,
+            "latitude": data.latitude,
+            "longitude": data.longitude,
+            "pm25": pm25,
+            "pm10": pm10,
+            "no2": no2,
+            "so2": so2,
+            "o3": o3,
+            "aqi": aqi
+        })
         
         try:
-            db_record = AirQualityData(
-                timestamp=now,
-                latitude=data.latitude,
-                longitude=data.longitude,
-                pm25=pm25,
-                pm10=pm10,
-                no2=no2,
-                so2=so2,
-                o3=o3,
-                aqi=aqi
-            )
-            db.add(db_record)
-            db.commit()
-            
             # Uyarı kontrolü - AQI 50 ve üzeri değerler için uyarı oluştur
             if aqi >= 50 and len(connected_websockets) > 0:
                 # AQI değerine göre uyarı seviyesini belirle
@@ -1792,11 +1611,8 @@ async def add_manual_measurement(data: ManualAirQualityInput = Body(...)):
                 if rabbitmq_client:
                     await send_alert_to_queue(alert)
             
-        except Exception as db_error:
-            db.rollback()
-            logger.error(f"Veritabanına kayıt sırasında hata: {str(db_error)}")
-        finally:
-            db.close()
+        except Exception as alert_error:
+            logger.error(f"Manuel uyarı gönderilirken hata: {str(alert_error)}")
         
         # Yanıt döndür
         return {
@@ -1814,8 +1630,6 @@ async def add_manual_air_quality_data(data: ManualAirQualityInput):
     Manuel olarak hava kalitesi verisi girişi için API.
     Bu endpoint, kullanıcı tarafından girilen verileri sisteme ekler.
     """
-    global sensors, air_quality_data
-    
     try:
         # AQI değerlerini hesapla (girilen değerler varsa onları kullan)
         pm25 = data.pm25 if data.pm25 is not None else 0
@@ -1846,29 +1660,21 @@ async def add_manual_air_quality_data(data: ManualAirQualityInput):
             "aqi": aqi
         }
         
-        # Veriyi listeye ekle
-        air_quality_data.append(air_quality_record)
-        
-        # Veritabanına kaydet
-        from sqlalchemy.orm import sessionmaker
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        db = SessionLocal()
+        # Veritabanına kaydet (yazma tamponu satırı toplu olarak ekler; yazma hataları
+        # istekte değil db_writer günlüğünde ve /debug/db-writer sayaçlarında görünür)
+        db_writer.add({
+            "timestamp": now,
+            "latitude": data.latitude,
+            "longitude": data.longitude,
+            "pm25": pm25,
+            "pm10": pm10,
+            "no2": no2,
+            "so2": so2,
+            "o3": o3,
+            "aqi": aqi
+        })
         
         try:
-            db_record = AirQualityData(
-                timestamp=now,
-                latitude=data.latitude,
-                longitude=data.longitude,
-                pm25=pm25,
-                pm10=pm10,
-                no2=no2,
-                so2=so2,
-                o3=o3,
-                aqi=aqi
-            )
-            db.add(db_record)
-            db.commit()
-            
             # Uyarı kontrolü - AQI değerine göre uyarı gönder
             if aqi >= 50:  # Sarı veya daha yüksek kategori
                 severity = "low"  # Default: Sarı kategori (AQI 50-75)
@@ -1904,52 +1710,33 @@ async def add_manual_air_quality_data(data: ManualAirQualityInput):
                     except Exception as e:
                         logger.error(f"WebSocket üzerinden uyarı gönderilirken hata: {str(e)}")
             
-            # Sensör verilerini güncelle
-            found = False
-            for i, sensor in enumerate(sensors):
-                # Aynı konumdaki sensör varsa güncelle
-                if sensor["location"] == data.location or (
-                    abs(sensor["latitude"] - data.latitude) < 0.001 and
-                    abs(sensor["longitude"] - data.longitude) < 0.001
-                ):
-                    sensors[i]["aqi"] = aqi
-                    sensors[i]["pm25"] = pm25
-                    sensors[i]["pm10"] = pm10
-                    sensors[i]["no2"] = no2
-                    sensors[i]["so2"] = so2
-                    sensors[i]["o3"] = o3
-                    sensors[i]["co"] = co
-                    sensors[i]["timestamp"] = now.isoformat()
-                    found = True
-                    break
+            # Sensör verilerini güncelle (aynı ad veya aynı koordinattaki sensör)
+            sensor_fields = dict(aqi=aqi, pm25=pm25, pm10=pm10, no2=no2, so2=so2, o3=o3, co=co, timestamp=now.isoformat())
+            existing_sensor = sensor_registry.find_duplicate(data.latitude, data.longitude, name=data.location)
+            if existing_sensor:
+                sensor_id = existing_sensor.id
+                sensor = existing_sensor.replace(**sensor_fields)
+            else:
+                # Yeni sensör ekle
+                sensor_id = state_store.allocate_id(sensor_registry, MANUAL_SENSOR_ID_START)
+                sensor = Sensor(
+                    id=sensor_id,
+                    location=data.location,
+                    latitude=data.latitude,
+                    longitude=data.longitude,
+                    **sensor_fields
+                )
             
-            # Yeni sensör ekle
-            if not found:
-                new_sensor = {
-                    "id": len(sensors) + 1,
-                    "location": data.location,
-                    "latitude": data.latitude,
-                    "longitude": data.longitude,
-                    "aqi": aqi,
-                    "pm25": pm25,
-                    "pm10": pm10,
-                    "no2": no2,
-                    "so2": so2,
-                    "o3": o3,
-                    "co": co,
-                    "timestamp": now.isoformat()
-                }
-                sensors.append(new_sensor)
+            # Sensörü ve veriyi sensörün tamponuna yaz
+            air_quality_record["sensor_id"] = sensor_id
+            store_manual_sensor(sensor, air_quality_record)
             
             logger.info(f"Manuel veri girişi başarılı: {data.location}")
             return {"success": True, "message": "Veri başarıyla eklendi", "data": air_quality_record}
         
-        except Exception as db_error:
-            db.rollback()
-            logger.error(f"Veritabanı kaydı sırasında hata: {str(db_error)}")
-            raise HTTPException(status_code=500, detail=f"Veritabanı hatası: {str(db_error)}")
-        finally:
-            db.close()
+        except Exception as inner_error:
+            logger.error(f"Manuel veri işlenirken hata: {str(inner_error)}")
+            raise HTTPException(status_code=500, detail=f"Veri işleme hatası: {str(inner_error)}")
         
     except Exception as e:
         logger.error(f"Manuel veri girişi sırasında hata: {str(e)}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -17,8 +17,9 @@ class User(Base):
 class AirQualityData(Base):
     __tablename__ = "air_quality_data"
 
-    id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    # TimescaleDB hypertable'ında her tekil kısıt bölümleme sütununu (timestamp) içermelidir
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow)
     latitude = Column(Float)
     longitude = Column(Float)
     pm25 = Column(Float)  # PM2.5 değeri
@@ -33,11 +34,16 @@ class Anomaly(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
-    air_quality_data_id = Column(Integer, ForeignKey("air_quality_data.id"))
+    # Hypertable'a (id, timestamp) dışında yabancı anahtar tanımlanamaz; ilişki yalnızca okuma içindir
+    air_quality_data_id = Column(Integer, index=True)
     type = Column(String)  # Anomali tipi (PM2.5, PM10, NO2, vb.)
     severity = Column(String)  # Anomali şiddeti (LOW, MEDIUM, HIGH, CRITICAL)
     description = Column(String)
     is_resolved = Column(Boolean, default=False)
     resolved_at = Column(DateTime, nullable=True)
 
-    air_quality_data = relationship("AirQualityData") 
\ No newline at end of file
+    air_quality_data = relationship(
+        "AirQualityData",
+        primaryjoin="foreign(Anomaly.air_quality_data_id) == AirQualityData.id",
+        viewonly=True
+    ) 
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+Lokasyon bazında uyarlamalı veri çekme zamanlayıcısı.
+Sağlayıcı verileri saatlik güncellediği için her lokasyon bir sonraki beklenen güncellemeden
+sonra çekilir; lokasyonlar batch_size'lık gruplara ayrılır ve gruplar aralığa eşit dağıtılır (her grup
+tek toplu istek), değerleri hızlı değişen lokasyonlar daha sık çekilir.
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+HOUR = 3600
+
+
+class LocationPollState:
+    """Tek bir lokasyonun çekme durumu"""
+
+    __slots__ = ("key", "offset", "next_due", "last_aqi", "volatility", "polls", "failures")
+
+    def __init__(self, key: str):
+        self.key = key
+        self.offset = 0.0  # Sağlayıcı güncellemesinden sonraki sabit kaydırma (yük dağıtımı için)
+        self.next_due = 0.0  # İlk turda hemen çekilsin
+        self.last_aqi: Optional[float] = None
+        self.volatility = 0.0  # AQI'deki göreli değişimin üssel hareketli ortalaması
+        self.polls = 0
+        self.failures = 0
+
+
+class AdaptivePollScheduler:
+    """
+    update_interval: sağlayıcının güncelleme periyodu (saniye)
+    provider_delay: saat başından sonra verinin yayınlanması için beklenen süre
+    spread: isteklerin dağıtılacağı pencere (saat başı + provider_delay'den itibaren)
+    batch_size: aynı zamana yerleştirilen lokasyon sayısı (sağlayıcıya tek istekte gönderilen koordinat sayısı)
+    min_interval: dalgalı lokasyonlar için en kısa çekme aralığı
+    volatility_threshold: bu değerin üzerindeki lokasyonlar dalgalı sayılır
+    """
+
+    def __init__(self, update_interval: float = HOUR, provider_delay: float = 300, spread: float = 1800,
+                 batch_size: int = 25, min_interval: float = 900, retry_interval: float = 120,
+                 volatility_threshold: float = 0.15, smoothing: float = 0.3):
+        self.update_interval = update_interval
+        self.provider_delay = provider_delay
+        self.spread = spread
+        self.batch_size = max(1, batch_size)
+        self.min_interval = min_interval
+        self.retry_interval = retry_interval
+        self.volatility_threshold = volatility_threshold
+        self.smoothing = smoothing
+
+        self._states: Dict[str, LocationPollState] = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def register(self, keys: List[str]):
+        """Lokasyonları ekler; grupların kaydırmalarını pencereye eşit aralıklarla yeniden dağıtır"""
+        for key in keys:
+            if key not in self._states:
+                self._states[key] = LocationPollState(key)
+
+        ordered = sorted(self._states)
+        batches = -(-len(ordered) // self.batch_size)
+        step = self.spread / max(1, batches)
+        for rank, key in enumerate(ordered):
+            self._states[key].offset = (rank // self.batch_size) * step
+
+    def due(self, now: Optional[float] = None, window: float = 0.0) -> List[str]:
+        """
+        Çekilme zamanı gelmiş lokasyonları döndürür. En az biri gelmişse window saniye içinde
+        gelecek olanlar da eklenir (aynı toplu isteğe binerler); hiçbiri gelmemişse erken çekim yapılmaz.
+        """
+        now = time.time() if now is None else now
+        if not any(state.next_due <= now for state in self._states.values()):
+            return []
+        return [state.key for state in self._states.values() if state.next_due <= now + window]
+
+    def seconds_until_next(self, now: Optional[float] = None) -> float:
+        """Bir sonraki lokasyonun çekilmesine kalan süre"""
+        if not self._states:
+            return self.retry_interval
+        now = time.time() if now is None else now
+        return max(0.0, min(state.next_due for state in self._states.values()) - now)
+
+    def _next_provider_slot(self, state: LocationPollState, now: float) -> float:
+        """Sağlayıcının bir sonraki güncellemesinden sonra bu lokasyona düşen zaman"""
+        period_start = now - (now % self.update_interval)
+        slot = period_start + self.provider_delay + state.offset
+        while slot <= now:
+            slot += self.update_interval
+        return slot
+
+    def record(self, key: str, aqi: Optional[float], now: Optional[float] = None):
+        """Başarılı bir çekimi kaydeder ve lokasyonun bir sonraki çekme zamanını hesaplar"""
+        now = time.time() if now is None else now
+        state = self._states.get(key)
+        if state is None:
+            self.register([key])
+            state = self._states[key]
+
+        if aqi is not None and state.last_aqi is not None:
+            change = abs(aqi - state.last_aqi) / max(1.0, abs(state.last_aqi))
+            state.volatility = self.smoothing * change + (1 - self.smoothing) * state.volatility
+        if aqi is not None:
+            state.last_aqi = aqi
+
+        state.polls += 1
+        state.failures = 0
+
+        # Zamanından erken (bir gruba eklenerek) çekildiyse bir sonraki yuva planlanan zamandan sonra aranır
+        next_due = self._next_provider_slot(state, max(now, state.next_due))
+        if state.volatility > self.volatility_threshold:
+            next_due = min(next_due, now + self.min_interval)
+        state.next_due = next_due
+
+    def mark_failed(self, key: str, now: Optional[float] = None):
+        """Başarısız çekimden sonra lokasyonu kısa süre sonra tekrar dener"""
+        now = time.time() if now is None else now
+        state = self._states.get(key)
+        if state is None:
+            return
+        state.failures += 1
+        state.next_due = now + min(self.retry_interval * state.failures, self.update_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "locations": len(self._states),
+            "due_now": len(self.due(now)),
+            "volatile": sum(1 for state in self._states.values() if state.volatility > self.volatility_threshold),
+            "seconds_until_next": round(self.seconds_until_next(now), 1),
+            "total_polls": sum(state.polls for state in self._states.values())
+        }
@@ -0,0 +1,126 @@
+"""
+Veritabanı bağlantı havuzu ölçümleri.
+Havuzdan bağlantı alma süresi (bekleme), anlık kullanım, taşma ve zaman aşımı sayıları tutulur;
+pool_size / max_overflow değerlerinin yük altında darboğaz olup olmadığı buradan görülür.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+    """Bir havuzun sayaçları; havuz sınıfları tarafından güncellenir"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.waited = 0  # Bekleme süresi 10 ms'yi aşan alma sayısı
+        self.in_use = 0
+        self.peak_in_use = 0
+        self._waits: Deque[float] = deque(maxlen=1024)  # Son alma işlemlerinin süresi (saniye)
+
+    def record_checkout(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            if seconds > 0.01:
+                self.waited += 1
+            self._waits.append(seconds)
+
+    def record_checkin(self):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self) -> Dict[str, Any]:
+        def percentile(values: List[float], fraction: float) -> Optional[float]:
+            if not values:
+                return None
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2)
+
+        with self._lock:
+            waits = list(self._waits)
+            return {
+                "checkouts": self.checkouts,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "waited_over_10ms": self.waited,
+                "timeouts": self.timeouts,
+                "wait_ms": {"p50": percentile(waits, 0.5), "p95": percentile(waits, 0.95),
+                            "p99": percentile(waits, 0.99),
+                            "max": round(max(waits) * 1000, 2) if waits else None}
+            }
+
+
+class _TimedPoolMixin:
+    """Havuzdan bağlantı almayı (_do_get) ve geri vermeyi (_do_return_conn) ölçer"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started)
+        return connection
+
+    def _do_return_conn(self, record):
+        self.metrics.record_checkin()
+        super()._do_return_conn(record)
+
+    def recreate(self):
+        # Yeniden oluşturulan havuz (ör. dispose sonrası) aynı sayaçları kullanmaya devam eder
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """Senkron engine için ölçümlü QueuePool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """Asenkron (asyncpg) engine için ölçümlü havuz"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+
+def pool_stats(engine) -> Dict[str, Any]:
+    """Engine havuzunun yapılandırması, anlık durumu ve ölçümleri"""
+    pool = engine.pool
+    stats: Dict[str, Any] = {
+        "class": type(pool).__name__,
+        "status": pool.status()
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow()
+        })
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(metrics.stats())
+    return stats
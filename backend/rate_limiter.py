@@ -0,0 +1,73 @@
+"""
+Asenkron token-bucket hız sınırlayıcı
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+
+class TokenBucketRateLimiter:
+    """
+    Saniyede `rate` token dolan, en fazla `burst` token biriktiren kova.
+    Bekleyenler geliş sırasıyla (FIFO) sırayla token alır; aynı anda uyanıp limiti aşmazlar.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None  # asyncio.Lock bekleyenleri FIFO sırasıyla uyandırır
+
+        # Metrikler
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.waiting = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Bir token alır; gerekirse bekler. Beklenen süreyi (saniye) döndürür"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                self._refill()
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    self._refill()
+                self._tokens -= 1
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        if waited > 0.001:
+            self.throttled += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "available_tokens": round(self._tokens, 2),
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "waiting": self.waiting,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "avg_wait_seconds": round(self.total_wait / self.throttled, 3) if self.throttled else 0,
+            "max_wait_seconds": round(self.max_wait, 3)
+        }
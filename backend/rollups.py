@@ -0,0 +1,210 @@
+"""
+TimescaleDB continuous aggregate'leri: air_quality_data için saatlik ve günlük özetler.
+Her kova 0.1 derecelik enlem/boylam hücresi başına kirletici başına ortalama/en küçük/en büyük/sayı tutar.
+Görünümler materialized_only=false ile oluşturulur; henüz işlenmemiş son veriler sorguda ham tablodan eklenir.
+Oluşturma sırasında geçmiş veriler bir kez işlenir (backfill); politikalar yalnızca son pencereyi yeniler.
+
+air_quality_data hypertable değilse (ör. TimescaleDB yoksa veya dönüşüm başarısızsa) hiçbir şey oluşturulmaz,
+uyarı yazılır ve çağıranlar ham tabloyu sorgulamaya devam eder. Dönüşümü database.ensure_hypertable yapar.
+"""
+import logging
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger("rollups")
+
+SOURCE_TABLE = "air_quality_data"
+POLLUTANTS = ("pm25", "pm10", "no2", "so2", "o3", "aqi")
+
+# Hücre anahtarı floor(derece * CELL_SCALE); 10 -> 0.1 derecelik hücreler (değişirse görünümler yeniden oluşturulmalı)
+CELL_SCALE = 10
+
+# görünüm adı -> (kova aralığı, yenileme başlangıcı, yenileme sıklığı)
+VIEWS = {
+    "air_quality_hourly": ("1 hour", "3 days", "30 minutes"),
+    "air_quality_daily": ("1 day", "7 days", "1 hour")
+}
+
+status: Dict[str, Any] = {"available": False, "reason": "not_checked"}
+
+
+def cell_key(degrees: float) -> int:
+    """Koordinatın rollup hücre anahtarı (SQL tarafındaki floor(x * CELL_SCALE) ile aynı)"""
+    return int(math.floor(degrees * CELL_SCALE))
+
+
+def _create_view_sql(view: str, bucket: str) -> str:
+    columns = []
+    for name in POLLUTANTS:
+        columns.extend([
+            f"avg({name}) AS {name}_avg",
+            f"min({name}) AS {name}_min",
+            f"max({name}) AS {name}_max",
+            f"count({name}) AS {name}_count"
+        ])
+    return f"""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS {view}
+        WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+        SELECT time_bucket(INTERVAL '{bucket}', "timestamp") AS bucket,
+               floor(latitude * {CELL_SCALE})::integer AS lat_cell,
+               floor(longitude * {CELL_SCALE})::integer AS lon_cell,
+               count(*) AS samples,
+               avg(latitude) AS latitude,
+               avg(longitude) AS longitude,
+               {", ".join(columns)}
+        FROM {SOURCE_TABLE}
+        GROUP BY bucket, lat_cell, lon_cell
+        WITH NO DATA
+    """
+
+
+def _policy_sql(view: str, start_offset: str, schedule: str) -> str:
+    return f"""
+        SELECT add_continuous_aggregate_policy('{view}',
+            start_offset => INTERVAL '{start_offset}',
+            end_offset => INTERVAL '1 hour',
+            schedule_interval => INTERVAL '{schedule}',
+            if_not_exists => TRUE)
+    """
+
+
+def ensure_rollups(engine, create: bool = True) -> Dict[str, Any]:
+    """
+    Görünümleri ve yenileme politikalarını oluşturur (create=False ise yalnızca varlığını kontrol eder).
+    Bloke edicidir; sonuç modül düzeyindeki status sözlüğüne de yazılır.
+    """
+    try:
+        with engine.connect() as conn:
+            if conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")).first() is None:
+                return _set_status(False, "timescaledb_missing")
+            hypertable = conn.execute(
+                text("SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = :table"),
+                {"table": SOURCE_TABLE}
+            ).first()
+            if hypertable is None:
+                logger.warning(f"{SOURCE_TABLE} bir hypertable değil, continuous aggregate'ler oluşturulmadı; "
+                               "geçmiş ve ortalama sorguları ham tabloyu kullanacak")
+                return _set_status(False, "not_hypertable")
+
+        if create:
+            # Continuous aggregate DDL'i transaction bloğu içinde çalışamaz
+            with engine.connect() as conn:
+                conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+                for view, (bucket, start_offset, schedule) in VIEWS.items():
+                    conn.execute(text(_create_view_sql(view, bucket)))
+                    # Görünüm WITH NO DATA oluşturulur ve politika yalnızca son start_offset'i yeniler;
+                    # daha eski veriler (ör. hypertable'a taşınan satırlar) burada işlenir. Yalnızca geçersiz
+                    # kılınmış aralıklar yeniden hesaplandığından sonraki başlatmalarda ucuzdur.
+                    conn.execute(text(f"CALL refresh_continuous_aggregate('{view}', NULL, now() - INTERVAL '1 hour')"))
+                    conn.execute(text(_policy_sql(view, start_offset, schedule)))
+
+        with engine.connect() as conn:
+            existing = {
+                row[0] for row in conn.execute(
+                    text("SELECT view_name FROM timescaledb_information.continuous_aggregates "
+                         "WHERE hypertable_name = :table"),
+                    {"table": SOURCE_TABLE}
+                )
+            }
+        missing = [view for view in VIEWS if view not in existing]
+        if missing:
+            return _set_status(False, "views_missing", missing=missing)
+        logger.info(f"Continuous aggregate'ler hazır: {', '.join(VIEWS)}")
+        return _set_status(True, "ready")
+    except Exception as e:
+        logger.warning(f"Continuous aggregate'ler hazırlanamadı, ham tablo kullanılacak: {str(e)}")
+        return _set_status(False, "error", error=str(e))
+
+
+def _set_status(available: bool, reason: str, **extra) -> Dict[str, Any]:
+    global status
+    status = {"available": available, "reason": reason, "checked_at": datetime.now().isoformat(), **extra}
+    return status
+
+
+def is_available() -> bool:
+    return bool(status.get("available"))
+
+
+def _cell_filter(latitude: Optional[float], longitude: Optional[float],
+                 lat_delta: float, lon_delta: float, params: Dict[str, Any]) -> str:
+    """Verilen kutuyu kapsayan hücre aralığı koşulu (koordinat yoksa boş)"""
+    if latitude is None or longitude is None:
+        return ""
+    params.update({
+        "lat_min": cell_key(latitude - lat_delta),
+        "lat_max": cell_key(latitude + lat_delta),
+        "lon_min": cell_key(longitude - lon_delta),
+        "lon_max": cell_key(longitude + lon_delta)
+    })
+    return " AND lat_cell BETWEEN :lat_min AND :lat_max AND lon_cell BETWEEN :lon_min AND :lon_max"
+
+
+def history_query(view: str, since: datetime, latitude: Optional[float] = None, longitude: Optional[float] = None,
+                  lat_delta: float = 0.0, lon_delta: float = 0.0, limit: int = 1000):
+    """
+    Kova başına bölge özeti (hücreler örnek sayısıyla ağırlıklandırılarak birleştirilir).
+    (sorgu, parametreler) döner; senkron veya asenkron oturumla çalıştırılabilir.
+    """
+    params: Dict[str, Any] = {"since": since, "limit": limit}
+    where = _cell_filter(latitude, longitude, lat_delta, lon_delta, params)
+    columns = []
+    for name in POLLUTANTS:
+        columns.extend([
+            f"sum({name}_avg * {name}_count) / nullif(sum({name}_count), 0) AS {name}",
+            f"min({name}_min) AS {name}_min",
+            f"max({name}_max) AS {name}_max"
+        ])
+    sql = f"""
+        SELECT bucket,
+               sum(samples) AS samples,
+               sum(latitude * samples) / sum(samples) AS latitude,
+               sum(longitude * samples) / sum(samples) AS longitude,
+               {", ".join(columns)}
+        FROM {view}
+        WHERE bucket >= :since{where}
+        GROUP BY bucket
+        ORDER BY bucket DESC
+        LIMIT :limit
+    """
+    return text(sql), params
+
+
+def history_rows(result) -> List[Dict[str, Any]]:
+    """history_query sonucunu API kayıt biçimine çevirir"""
+    records = []
+    for row in result.mappings():
+        record = {
+            "timestamp": row["bucket"].isoformat(),
+            "samples": int(row["samples"]),
+            "latitude": row["latitude"],
+            "longitude": row["longitude"]
+        }
+        for name in POLLUTANTS:
+            record[name] = row[name]
+            record[f"{name}_min"] = row[f"{name}_min"]
+            record[f"{name}_max"] = row[f"{name}_max"]
+        records.append(record)
+    return records
+
+
+def window_averages(db, latitude: float, longitude: float, since: datetime,
+                    tolerance: float = 0.1) -> Optional[Dict[str, float]]:
+    """
+    Koordinat çevresindeki hücrelerin since sonrasındaki saatlik özetlerinden kirletici ortalamaları.
+    Kayıt yoksa None. Kutu hücre sınırlarına, başlangıç saat başına yuvarlanır.
+    """
+    params: Dict[str, Any] = {"since": since}
+    where = _cell_filter(latitude, longitude, tolerance, tolerance, params)
+    columns = [f"sum({name}_avg * {name}_count) / nullif(sum({name}_count), 0) AS {name}" for name in POLLUTANTS]
+    row = db.execute(
+        text(f"SELECT sum(samples) AS samples, {', '.join(columns)} "
+             f"FROM air_quality_hourly WHERE bucket >= date_trunc('hour', CAST(:since AS timestamp)){where}"),
+        params
+    ).mappings().first()
+    if row is None or not row["samples"]:
+        return None
+    return {name: row[name] for name in POLLUTANTS if row[name] is not None}
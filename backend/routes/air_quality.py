@@ -51,14 +51,16 @@ class ManualMeasurementInput(BaseModel):
     so2: Optional[float] = Field(None, description="Kükürt dioksit (SO2) konsantrasyonu (μg/m³)")
     co: Optional[float] = Field(None, description="Karbon monoksit (CO) konsantrasyonu (mg/m³)")
 
+# Tüm isteklerin paylaştığı istemci (HTTP bağlantı havuzu istekler arasında yeniden kullanılır)
+_shared_client: Optional[AirQualityClient] = None
+
 # API istemci sınıfını sağlayan dependency
 async def get_air_quality_client():
-    # WAQI API'sini kullan
-    client = AirQualityClient(api_type="waqi")
-    try:
-        yield client
-    finally:
-        pass  # Cleanup işlemleri gerekirse burada
+    global _shared_client
+    
+    if _shared_client is None:
+        _shared_client = AirQualityClient()
+    yield _shared_client
 
 @router.get("/by-coordinates", response_model=AirQualityData)
 async def get_air_quality_by_coordinates(
@@ -184,42 +186,10 @@ async def get_forecast_by_coordinates(
     Belirtilen koordinatlar için önümüzdeki 24 saatin hava kalitesi tahminlerini döndürür.
     """
     try:
-        params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "hourly": "pm10,pm2_5,nitrogen_dioxide,sulphur_dioxide,ozone,european_aqi",
-            "timezone": "auto",
-            "forecast_days": 1
-        }
-        raw = await client._make_request(params)
-        logger.info(f"[FORECAST] Open-Meteo API yanıtı: {raw}")
-        if not raw or not isinstance(raw, dict):
-            return []
-        if "error" in raw:
-            return []
-        hourly = raw.get("hourly", {})
-        times = hourly.get("time", [])
-        # Alan isimlerini esnek kontrol et
-        pm25s = hourly.get("pm2_5", hourly.get("pm25", []))
-        pm10s = hourly.get("pm10", [])
-        no2s = hourly.get("nitrogen_dioxide", hourly.get("no2", []))
-        so2s = hourly.get("sulphur_dioxide", hourly.get("so2", []))
-        o3s = hourly.get("ozone", [])
-        aqis = hourly.get("european_aqi", hourly.get("aqi", []))
-        result = []
-        for i, t in enumerate(times):
-            result.append({
-                "timestamp": t,
-                "pm25": pm25s[i] if i < len(pm25s) else None,
-                "pm10": pm10s[i] if i < len(pm10s) else None,
-                "no2": no2s[i] if i < len(no2s) else None,
-                "so2": so2s[i] if i < len(so2s) else None,
-                "o3": o3s[i] if i < len(o3s) else None,
-                "aqi": aqis[i] if i < len(aqis) else None
-            })
-        return result
+        # Saatlik seri, son değerle aynı istekte alınıp saklanır; burada tekrar istek atılmaz
+        return await client.get_hourly_series(latitude, longitude)
     except Exception as e:
         import traceback
         logger.error(f"Forecast alınırken hata: {str(e)}")
         logger.error(traceback.format_exc())
-        return [] 
\ No newline at end of file
+        return []
\ No newline at end of file
@@ -0,0 +1,528 @@
+"""
+Sensörlerin tek tip kayıtlarla tutulduğu indeksli kayıt defteri.
+Kimlik, normalleştirilmiş konum adı ve yuvarlanmış koordinat anahtarı ile O(1) erişim sağlar.
+"""
+import json
+import math
+import threading
+import uuid
+from json.encoder import encode_basestring
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from columnar import COLUMNS, CellAggregates, LatestColumns, haversine_km_array
+from spatial_index import GridIndex
+
+# 1000 ve üzeri kimlikler manuel eklenen sensörlere ayrılmıştır
+MANUAL_SENSOR_ID_START = 1000
+# Manuel girişte bu kadar (derece) yakındaki sensör aynı sensör sayılır ve güncellenir
+MANUAL_DEDUP_DEGREES = 0.01
+# API verisi, bu kadar (derece) yakınında manuel sensör bulunan konumların üzerine yazılmaz
+MANUAL_OVERRIDE_DEGREES = 0.5
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Konum adını karşılaştırma için normalleştirir"""
+    return (name or "").strip().lower()
+
+
+def coordinate_key(latitude: float, longitude: float) -> int:
+    """Koordinatları ~100 m (0.001°) hassasiyetle tek bir tamsayı anahtara çevirir"""
+    return (int(round(float(latitude) * 1000)) + 90000) * 360001 + int(round(float(longitude) * 1000)) + 180000
+
+
+# Sensör alanları (to_dict / JSON çıktısındaki sırayla)
+SENSOR_FIELDS = ("id", "location", "latitude", "longitude", "aqi", "pm25", "pm10", "no2", "so2", "o3", "co", "timestamp")
+# to_arrays() çıktısında float sütun olarak tutulan alanlar
+ARRAY_FIELDS = ("latitude", "longitude", "aqi", "pm25", "pm10", "no2", "so2", "o3", "co")
+
+
+def _json_value(value: Any) -> str:
+    """Tek bir değeri JSON metnine çevirir (NaN/None -> null); sık görülen tipler önce denenir"""
+    kind = type(value)
+    if kind is float:
+        return float.__repr__(value) if math.isfinite(value) else "null"
+    if kind is int:
+        return int.__repr__(value)
+    if kind is str:
+        return encode_basestring(value)
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return float.__repr__(float(value)) if math.isfinite(value) else "null"
+    if isinstance(value, int):
+        return int.__repr__(int(value))
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+class Sensor:
+    """
+    Tek bir sensörün konumu ve son ölçüm değerleri.
+    __slots__ ile örnek başına __dict__ tutulmaz (100k sensörde ölçüm için bkz. bench_sensors.py).
+    Kayıtlar oluşturulduktan sonra değiştirilmez (güncelleme replace() ile yeni kopya üretir),
+    bu yüzden JSON çıktısı ilk serileştirmede önbelleğe alınır.
+    """
+
+    __slots__ = SENSOR_FIELDS + ("_json",)
+
+    def __init__(self, id: int, location: str, latitude: float, longitude: float, aqi: int = 0,
+                 pm25: float = 0, pm10: float = 0, no2: float = 0, so2: float = 0, o3: float = 0,
+                 co: Optional[float] = None, timestamp: Optional[str] = None):
+        self.id = id
+        self.location = location
+        self.latitude = latitude
+        self.longitude = longitude
+        self.aqi = aqi
+        self.pm25 = pm25
+        self.pm10 = pm10
+        self.no2 = no2
+        self.so2 = so2
+        self.o3 = o3
+        self.co = co
+        self.timestamp = timestamp
+        self._json: Optional[bytes] = None
+
+    @property
+    def is_manual(self) -> bool:
+        return self.id >= MANUAL_SENSOR_ID_START
+
+    @property
+    def key(self) -> int:
+        return coordinate_key(self.latitude, self.longitude)
+
+    def replace(self, **fields) -> "Sensor":
+        """Verilen alanları değiştirilmiş yeni bir kopya döndürür"""
+        values = {name: getattr(self, name) for name in SENSOR_FIELDS}
+        values.update(fields)
+        return Sensor(**values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "location": self.location,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "aqi": self.aqi,
+            "pm25": self.pm25,
+            "pm10": self.pm10,
+            "no2": self.no2,
+            "so2": self.so2,
+            "o3": self.o3
+        }
+        if self.co is not None:
+            data["co"] = self.co
+        if self.timestamp is not None:
+            data["timestamp"] = self.timestamp
+        return data
+
+    def to_json(self) -> bytes:
+        """to_dict() ile aynı JSON nesnesini ara dict oluşturmadan yazar (sonuç önbelleğe alınır)"""
+        if self._json is None:
+            value = _json_value
+            text = (
+                f'{{"id":{value(self.id)},"location":{value(self.location)},'
+                f'"latitude":{value(self.latitude)},"longitude":{value(self.longitude)},'
+                f'"aqi":{value(self.aqi)},"pm25":{value(self.pm25)},"pm10":{value(self.pm10)},'
+                f'"no2":{value(self.no2)},"so2":{value(self.so2)},"o3":{value(self.o3)}'
+            )
+            if self.co is not None:
+                text += f',"co":{value(self.co)}'
+            if self.timestamp is not None:
+                text += f',"timestamp":{value(self.timestamp)}'
+            self._json = (text + "}").encode("utf-8")
+        return self._json
+
+    def to_record(self, timestamp: str) -> Dict[str, Any]:
+        """air_quality_data biçiminde bir veri noktası üretir"""
+        return {
+            "sensor_id": self.id,
+            "location": self.location,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "timestamp": timestamp,
+            "pm25": self.pm25,
+            "pm10": self.pm10,
+            "no2": self.no2,
+            "so2": self.so2,
+            "o3": self.o3,
+            "aqi": self.aqi
+        }
+
+
+def sensors_to_json(sensors: Iterable[Sensor], key: Optional[str] = None,
+                    extra: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Sensörleri doğrudan JSON byte dizisine yazar.
+    key verilirse {"key": [...], **extra} nesnesi, verilmezse yalnızca dizi üretilir.
+    """
+    body = b"[" + b",".join([sensor.to_json() for sensor in sensors]) + b"]"
+    if key is not None:
+        fields = [json.dumps(key).encode("utf-8") + b":" + body]
+        for name, value in (extra or {}).items():
+            fields.append(f"{json.dumps(name)}:{json.dumps(value, ensure_ascii=False, default=str)}".encode("utf-8"))
+        body = b"{" + b",".join(fields) + b"}"
+    return body
+
+
+class RegistryGeneration:
+    """
+    Kayıt defterinin yayınlanmış bir sürümü: sensörler, kimlik/ad/koordinat indeksleri, ızgaralar,
+    son değer sütunları ve hücre toplamları. Oluşturulduktan sonra değiştirilmez (indeksler yayında
+    kopyalanır); okuyucular bir nesneyi alıp tüm sorgularını kilitsiz ve aynı durum üzerinde yapar.
+    number her yazmada artar; epoch ile birlikte HTTP ETag'i olarak kullanılabilir
+    (epoch, yeniden başlatmada sıfırlanan sayacın eski ETag'lerle çakışmasını önler).
+    """
+
+    __slots__ = ("epoch", "number", "sensors", "by_id", "by_name", "by_key",
+                 "grid", "manual_grid", "columns", "cells")
+
+    def __init__(self, epoch: str, number: int, sensors: Tuple[Sensor, ...],
+                 by_id: Dict[int, Sensor], by_name: Dict[str, int], by_key: Dict[int, int],
+                 grid: GridIndex, manual_grid: GridIndex, columns: LatestColumns, cells: CellAggregates):
+        self.epoch = epoch
+        self.number = number
+        self.sensors = sensors
+        self.by_id = by_id
+        self.by_name = by_name
+        self.by_key = by_key
+        self.grid = grid
+        self.manual_grid = manual_grid
+        self.columns = columns
+        self.cells = cells
+
+    @property
+    def etag(self) -> str:
+        return f'"sensors-{self.epoch}-{self.number}"'
+
+    def get(self, sensor_id: int) -> Optional[Sensor]:
+        return self.by_id.get(sensor_id)
+
+    def by_location(self, name: str) -> Optional[Sensor]:
+        sensor_id = self.by_name.get(normalize_name(name))
+        return self.by_id.get(sensor_id) if sensor_id is not None else None
+
+    def by_coordinates(self, latitude: float, longitude: float) -> Optional[Sensor]:
+        sensor_id = self.by_key.get(coordinate_key(latitude, longitude))
+        return self.by_id.get(sensor_id) if sensor_id is not None else None
+
+    def within_box(self, latitude: float, longitude: float, tolerance: float) -> List[Sensor]:
+        """Her iki eksende de tolerance dereceden yakın sensörler"""
+        return [self.by_id[sensor_id] for sensor_id in self.grid.within_box(latitude, longitude, tolerance)]
+
+    def find_near(self, latitude: float, longitude: float, tolerance: float) -> Optional[Sensor]:
+        """Aynı koordinat anahtarındaki, yoksa tolerance derece içindeki ilk sensörü döndürür"""
+        sensor = self.by_coordinates(latitude, longitude)
+        if sensor is not None:
+            return sensor
+        nearby = self.within_box(latitude, longitude, tolerance)
+        return nearby[0] if nearby else None
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[float, Sensor]]:
+        """radius_km içindeki sensörleri (mesafe km, sensör) olarak yakından uzağa döndürür"""
+        return [(distance, self.by_id[sensor_id])
+                for distance, sensor_id in self.grid.within_radius(latitude, longitude, radius_km)]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1,
+                max_distance_km: Optional[float] = None) -> List[Tuple[float, Sensor]]:
+        """En yakın k sensörü (mesafe km, sensör) olarak döndürür"""
+        return [(distance, self.by_id[sensor_id])
+                for distance, sensor_id in self.grid.nearest(latitude, longitude, k, max_distance_km)]
+
+    def aggregate(self, sensor_ids: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+        """Verilen sensörlerin (None: hepsi) son değerleri için ortalama/maksimum/yüzdelik istatistikleri"""
+        indices = None if sensor_ids is None else self.columns.indices(sensor_ids)
+        return self.columns.aggregate(indices)
+
+    def regional_summary(self, latitude: float, longitude: float, radius_km: float) -> Dict[str, Any]:
+        """
+        radius_km içindeki sensörlerin son değer ortalamaları (aggregate ile aynı biçimde count/mean).
+        Tamamen içeride kalan hücreler önceden tutulan toplamlardan gelir; yalnızca sınır
+        hücrelerindeki sensörlerin değerleri tek tek okunur.
+        """
+        inside, boundary = self.grid.cover_radius(latitude, longitude, radius_km)
+        sums, counts, sensors = self.cells.combine(inside)
+        if boundary:
+            # Sınır hücrelerindeki sensörlerin mesafesi tek vektörel geçişte
+            slots = self.columns.indices(boundary)
+            distance = haversine_km_array(self.columns.lat[slots], self.columns.lon[slots], latitude, longitude)
+            block = self.columns.values[slots[distance <= radius_km]]
+            sums = sums + np.nansum(block, axis=0)
+            counts = counts + np.count_nonzero(~np.isnan(block), axis=0)
+            sensors += len(block)
+
+        result: Dict[str, Any] = {"count": sensors}
+        for i, name in enumerate(COLUMNS):
+            result[name] = {
+                "count": int(counts[i]),
+                "mean": float(sums[i] / counts[i]) if counts[i] else None
+            }
+        return result
+
+    def has_manual_near(self, latitude: float, longitude: float,
+                        tolerance: float = MANUAL_OVERRIDE_DEGREES) -> bool:
+        """tolerance derece içinde manuel sensör var mı (yalnızca manuel sensörlerin ızgarası taranır)"""
+        return self.manual_grid.any_within_box(latitude, longitude, tolerance)
+
+
+class SensorRegistry:
+    """
+    Sensörleri kimlik, ad ve koordinat indeksleriyle tutar; konumlar ayrıca ızgara indeksinde
+    güncel tutulur (yarıçap ve en yakın sensör sorguları için); son değerler de sütunlu
+    dizilerde (vektörel bölgesel istatistikler için) ve hücre başına toplamlar olarak
+    (bölge ortalamaları için) tutulur.
+    Yazmalar kilit altında yapılır (RabbitMQ callback'leri ayrı thread'lerde çalışır).
+    Tüm okuma metotları generation() ile alınan değişmez RegistryGeneration üzerinden kilitsiz çalışır;
+    yazmalar canlı indeksleri günceller, yazmadan sonraki ilk okuma indeksleri kopyalayarak yeni nesli oluşturur
+    ve tek bir referans atamasıyla yayınlar (art arda gelen yazmalar tek bir yeniden oluşturmaya yol açar).
+    Birden çok sorguyu aynı durum üzerinde yapmak isteyen çağıran, generation()'ı bir kez alıp onu kullanmalıdır.
+    Kayıtlar yerinde değiştirilmez, güncellemede yeni Sensor nesnesi konur.
+    """
+
+    def __init__(self, cell_size: float = 0.1):
+        self._by_id: Dict[int, Sensor] = {}
+        self._by_name: Dict[str, int] = {}
+        self._by_key: Dict[int, int] = {}
+        self._grid = GridIndex(cell_size)
+        self._manual_grid = GridIndex(cell_size)  # Yalnızca manuel sensörler (API çakışma kontrolü için)
+        self._columns = LatestColumns()
+        self._cells = CellAggregates()  # Izgara hücresi başına son değer toplamları
+        self._max_id = 0
+
+        self._lock = threading.Lock()
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self._generation = self._build_generation()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Sensor]:
+        return iter(self.snapshot())
+
+    def __contains__(self, sensor_id: int) -> bool:
+        return sensor_id in self._by_id
+
+    # --- Okuma ---
+
+    def generation(self) -> RegistryGeneration:
+        """Son yayınlanan nesil; yazmadan sonraki ilk çağrıda kilit altında yeniden oluşturulur"""
+        generation = self._generation
+        if generation.number != self.version or generation.epoch != self.epoch:
+            with self._lock:
+                if self._generation.number != self.version or self._generation.epoch != self.epoch:
+                    self._generation = self._build_generation()
+                generation = self._generation
+        return generation
+
+    def _build_generation(self) -> RegistryGeneration:
+        # Kilit altında çağrılır; canlı indekslerin kopyaları yeni nesle verilir
+        return RegistryGeneration(
+            self.epoch, self.version, tuple(self._by_id.values()), dict(self._by_id), dict(self._by_name),
+            dict(self._by_key), self._grid.copy(), self._manual_grid.copy(), self._columns.copy(), self._cells.copy()
+        )
+
+    def snapshot(self) -> Tuple[Sensor, ...]:
+        """Ekleme sırasına göre tüm sensörlerin değişmez kopyası (son neslin sensörleri)"""
+        return self.generation().sensors
+
+    def get(self, sensor_id: int) -> Optional[Sensor]:
+        return self.generation().get(sensor_id)
+
+    def by_name(self, name: str) -> Optional[Sensor]:
+        return self.generation().by_location(name)
+
+    def by_coordinates(self, latitude: float, longitude: float) -> Optional[Sensor]:
+        return self.generation().by_coordinates(latitude, longitude)
+
+    def search(self, text: str) -> Optional[Sensor]:
+        """Önce tam ad eşleşmesine (O(1)) bakar, yoksa adında text geçen ilk sensörü döndürür"""
+        generation = self.generation()
+        sensor = generation.by_location(text)
+        if sensor is not None:
+            return sensor
+        needle = normalize_name(text)
+        for candidate in generation.sensors:
+            if needle in candidate.location.lower():
+                return candidate
+        return None
+
+    def within_box(self, latitude: float, longitude: float, tolerance: float) -> List[Sensor]:
+        return self.generation().within_box(latitude, longitude, tolerance)
+
+    def find_near(self, latitude: float, longitude: float, tolerance: float) -> Optional[Sensor]:
+        return self.generation().find_near(latitude, longitude, tolerance)
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[float, Sensor]]:
+        return self.generation().within_radius(latitude, longitude, radius_km)
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1,
+                max_distance_km: Optional[float] = None) -> List[Tuple[float, Sensor]]:
+        return self.generation().nearest(latitude, longitude, k, max_distance_km)
+
+    def aggregate(self, sensor_ids: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+        return self.generation().aggregate(sensor_ids)
+
+    def regional_summary(self, latitude: float, longitude: float, radius_km: float) -> Dict[str, Any]:
+        return self.generation().regional_summary(latitude, longitude, radius_km)
+
+    def has_manual_near(self, latitude: float, longitude: float,
+                        tolerance: float = MANUAL_OVERRIDE_DEGREES) -> bool:
+        return self.generation().has_manual_near(latitude, longitude, tolerance)
+
+    def find_duplicate(self, latitude: float, longitude: float, name: Optional[str] = None) -> Optional[Sensor]:
+        """Manuel girişin güncelleyeceği sensör: aynı ad, yoksa MANUAL_DEDUP_DEGREES içindeki sensör"""
+        generation = self.generation()
+        sensor = generation.by_location(name) if name else None
+        return sensor or generation.find_near(latitude, longitude, MANUAL_DEDUP_DEGREES)
+
+    def manual_sensors(self) -> List[Sensor]:
+        return [sensor for sensor in self.snapshot() if sensor.is_manual]
+
+    def allocate_id(self, start: int = 0) -> int:
+        """
+        start'tan ve şimdiye kadar görülen en büyük kimlikten büyük yeni bir kimlik ayırır.
+        Kimlikler hiç geri verilmez; aynı anda gelen iki istek aynı kimliği alamaz.
+        """
+        with self._lock:
+            self._max_id = max(start, self._max_id) + 1
+            return self._max_id
+
+    # --- Yazma ---
+
+    def upsert(self, sensor: Sensor) -> Sensor:
+        with self._lock:
+            self._put(sensor)
+            self._changed()
+        return sensor
+
+    def upsert_many(self, sensors: List[Sensor]):
+        if not sensors:
+            return
+        with self._lock:
+            for sensor in sensors:
+                self._put(sensor)
+            self._changed()
+
+    def update(self, sensor_id: int, **fields) -> Optional[Sensor]:
+        """Sensörün alanlarını günceller (yeni kopya ile değiştirir); sensör yoksa None"""
+        with self._lock:
+            current = self._by_id.get(sensor_id)
+            if current is None:
+                return None
+            sensor = current.replace(**fields)
+            self._put(sensor)
+            self._changed()
+        return sensor
+
+    def remove(self, sensor_id: int) -> Optional[Sensor]:
+        with self._lock:
+            sensor = self._by_id.pop(sensor_id, None)
+            if sensor is not None:
+                self._unindex(sensor)
+                self._changed()
+        return sensor
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            self._by_name.clear()
+            self._by_key.clear()
+            self._grid.clear()
+            self._manual_grid.clear()
+            self._columns.clear()
+            self._cells.clear()
+            self._changed()
+
+    def _put(self, sensor: Sensor):
+        current = self._by_id.get(sensor.id)
+        if current is not None:
+            self._unindex(current)
+
+        # Aynı koordinattaki farklı kimlikli kayıt yenisiyle değiştirilir
+        key = sensor.key
+        other_id = self._by_key.get(key)
+        if other_id is not None and other_id != sensor.id:
+            other = self._by_id.pop(other_id)
+            self._unindex(other)
+
+        self._by_id[sensor.id] = sensor
+        self._by_key[key] = sensor.id
+        self._grid.insert(sensor.id, sensor.latitude, sensor.longitude)
+        if sensor.is_manual:
+            self._manual_grid.insert(sensor.id, sensor.latitude, sensor.longitude)
+        row = CellAggregates.row([getattr(sensor, name) for name in COLUMNS])
+        self._columns.set(sensor.id, sensor.latitude, sensor.longitude, row)
+        self._cells.add(self._grid.cell_of(sensor.latitude, sensor.longitude), row)
+        name = normalize_name(sensor.location)
+        if name:
+            self._by_name[name] = sensor.id
+        self._max_id = max(self._max_id, sensor.id)
+
+    def _unindex(self, sensor: Sensor):
+        self._grid.remove(sensor.id)
+        self._manual_grid.remove(sensor.id)
+        self._columns.remove(sensor.id)
+        self._cells.subtract(self._grid.cell_of(sensor.latitude, sensor.longitude),
+                             CellAggregates.row([getattr(sensor, name) for name in COLUMNS]))
+        key = sensor.key
+        if self._by_key.get(key) == sensor.id:
+            del self._by_key[key]
+        name = normalize_name(sensor.location)
+        if self._by_name.get(name) == sensor.id:
+            del self._by_name[name]
+
+    def _changed(self):
+        # Yeni nesil ilk okumada oluşturulur (bkz. generation)
+        self.version += 1
+
+    # --- Anlık görüntü (snapshot.py) ---
+
+    def to_arrays(self, sensors: Optional[Tuple[Sensor, ...]] = None) -> Dict[str, np.ndarray]:
+        """Sensörleri (None: tümü) paralel NumPy dizileri olarak döndürür (None sayılar NaN, None metinler "")"""
+        if sensors is None:
+            sensors = self.snapshot()
+        values = np.array(
+            [[np.nan if getattr(sensor, name) is None else getattr(sensor, name) for name in ARRAY_FIELDS]
+             for sensor in sensors],
+            dtype=np.float64
+        ).reshape(len(sensors), len(ARRAY_FIELDS))
+        return {
+            "ids": np.array([sensor.id for sensor in sensors], dtype=np.int64),
+            "locations": np.array([sensor.location or "" for sensor in sensors], dtype=np.str_),
+            "timestamps": np.array([sensor.timestamp or "" for sensor in sensors], dtype=np.str_),
+            "values": values
+        }
+
+    def load_arrays(self, arrays: Dict[str, np.ndarray]) -> int:
+        """to_arrays() çıktısından sensörleri ekler; eklenen sensör sayısını döndürür"""
+        sensors = []
+        for sensor_id, location, timestamp, row in zip(arrays["ids"].tolist(), arrays["locations"].tolist(),
+                                                       arrays["timestamps"].tolist(), arrays["values"].tolist()):
+            # NaN: co için "ölçüm yok" (None), diğer alanlar için varsayılan 0
+            fields = {name: (None if name == "co" else 0) if math.isnan(value) else value
+                      for name, value in zip(ARRAY_FIELDS, row)}
+            fields["aqi"] = int(fields["aqi"])
+            sensors.append(Sensor(id=sensor_id, location=location, timestamp=timestamp or None, **fields))
+        self.upsert_many(sensors)
+        return len(sensors)
+
+    def restore_version(self, epoch: str, version: int):
+        """Anlık görüntüdeki epoch/sürümü devralır; aynı durum tüm worker'larda ve yeniden başlatmada aynı ETag'i alır"""
+        with self._lock:
+            self.epoch = epoch
+            self.version = max(self.version, version)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sensors": len(self._by_id),
+            "names": len(self._by_name),
+            "coordinate_keys": len(self._by_key),
+            "grid": self._grid.stats(),
+            "aggregate_cells": len(self._cells),
+            "manual": len(self._manual_grid),
+            "version": self.version,
+            "generation": self._generation.number
+        }
@@ -0,0 +1,105 @@
+"""
+Sensör kayıt defteri ve son ölçümlerin NumPy .npz dosyasına anlık görüntüsü.
+Yeniden başlatmada ilk API turunu beklemeden (manuel sensörler dahil) durum diskten yüklenir.
+"""
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+from sensor_registry import ARRAY_FIELDS, SensorRegistry
+from timeseries import FIELDS, TimeSeriesStore
+
+logger = logging.getLogger("snapshot")
+
+# Dosya biçimi değişirse artırılır; farklı sürümdeki dosyalar yüklenmez
+SNAPSHOT_FORMAT = 1
+
+
+def save_snapshot(path: str, registry: SensorRegistry, readings: TimeSeriesStore) -> Dict[str, Any]:
+    """
+    Durumu path'e yazar. Önce aynı dizinde geçici dosyaya yazılır, sonra os.replace ile
+    atomik olarak yer değiştirilir; yarıda kalan yazma eski görüntüyü bozmaz.
+    Bloke edicidir, event loop'tan executor ile çağrılmalıdır.
+    """
+    started = time.perf_counter()
+    # Sensörler ve sürüm numarası aynı nesilden alınır (sayı içerikle her zaman eşleşir)
+    generation = registry.generation()
+    sensors = registry.to_arrays(generation.sensors)
+    series = readings.to_arrays()
+
+    arrays = {
+        "format": np.array(SNAPSHOT_FORMAT),
+        "saved_at": np.array(time.time()),
+        "meta_registry_epoch": np.array(generation.epoch),
+        "meta_registry_version": np.array(generation.number),
+        "meta_sensor_fields": np.array(ARRAY_FIELDS, dtype=np.str_),
+        "meta_reading_fields": np.array(FIELDS, dtype=np.str_)
+    }
+    arrays.update({f"sensor_{name}": value for name, value in sensors.items()})
+    arrays.update({f"reading_{name}": value for name, value in series.items()})
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=".snapshot-", suffix=".npz", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            np.savez(handle, **arrays)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return {
+        "path": path,
+        "sensors": len(sensors["ids"]),
+        "readings": len(series["timestamps"]),
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - started, 4)
+    }
+
+
+def load_snapshot(path: str, registry: SensorRegistry, readings: TimeSeriesStore) -> Dict[str, Any]:
+    """
+    path'teki görüntüyü kayıt defterine ve tamponlara yükler.
+    Dosya yoksa, sürümü veya alanları uyuşmuyorsa hiçbir şey yüklenmez (status alanında nedeni döner).
+    Saklama süresini aşmış ölçümler yüklemeden sonra atılır.
+    """
+    if not os.path.exists(path):
+        return {"status": "missing", "path": path}
+
+    started = time.perf_counter()
+    with np.load(path, allow_pickle=False) as data:
+        if int(data["format"]) != SNAPSHOT_FORMAT:
+            return {"status": "incompatible", "path": path, "format": int(data["format"])}
+        if (tuple(data["meta_sensor_fields"].tolist()) != ARRAY_FIELDS
+                or tuple(data["meta_reading_fields"].tolist()) != FIELDS):
+            return {"status": "incompatible", "path": path, "reason": "fields"}
+
+        sensors = {name[len("sensor_"):]: data[name] for name in data.files if name.startswith("sensor_")}
+        series = {name[len("reading_"):]: data[name] for name in data.files if name.startswith("reading_")}
+        saved_at = float(data["saved_at"])
+        version = None
+        if "meta_registry_version" in data.files:
+            version = (str(data["meta_registry_epoch"]), int(data["meta_registry_version"]))
+
+    sensor_count = registry.load_arrays(sensors)
+    if version is not None:
+        registry.restore_version(*version)
+    reading_count = readings.load_arrays(series)
+    expired = readings.expire_all()
+
+    return {
+        "status": "loaded",
+        "path": path,
+        "sensors": sensor_count,
+        "readings": reading_count - expired,
+        "age_seconds": round(time.time() - saved_at, 1),
+        "seconds": round(time.perf_counter() - started, 4)
+    }
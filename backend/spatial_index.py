@@ -0,0 +1,206 @@
+"""
+Sensör konumları için düzenli enlem/boylam ızgarası.
+Yarıçap ve en yakın k sorguları yalnızca ilgili hücreleri tarar; mesafeler büyük daire (haversine) ile hesaplanır.
+"""
+import math
+from typing import Dict, Hashable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """İki koordinat arasındaki büyük daire mesafesi (km)"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """
+    Öğeleri cell_size derecelik hücrelere dağıtır; ekleme/taşıma/silme O(1)'dir.
+    Boylam ±180'de sarılır, kutuplara yakın sorgular tüm boylam sütunlarını tarar.
+    """
+
+    def __init__(self, cell_size: float = 0.5):
+        self.cell_size = cell_size
+        self._rows = int(math.ceil(180.0 / cell_size))
+        self._cols = int(math.ceil(360.0 / cell_size))
+
+        # Hücre -> öğe listesi (hücreler küçük tutulduğu için listeden silme ucuzdur; dict'e göre çok daha az bellek)
+        # (Hücre anahtarı satır * sütun_sayısı + sütun; demet anahtara göre daha az bellek)
+        self._cells: Dict[int, List[Hashable]] = {}
+        self._positions: Dict[Hashable, Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, item_id: Hashable) -> bool:
+        return item_id in self._positions
+
+    def _row(self, latitude: float) -> int:
+        return min(self._rows - 1, max(0, int(math.floor((latitude + 90.0) / self.cell_size))))
+
+    def _col(self, longitude: float) -> int:
+        return int(math.floor((longitude + 180.0) / self.cell_size)) % self._cols
+
+    def _cell(self, latitude: float, longitude: float) -> int:
+        return self._row(latitude) * self._cols + self._col(longitude)
+
+    def insert(self, item_id: Hashable, latitude: float, longitude: float):
+        """Öğeyi ekler; zaten varsa yeni konumuna taşır"""
+        if item_id in self._positions:
+            self.remove(item_id)
+        position = (float(latitude), float(longitude))
+        self._cells.setdefault(self._cell(*position), []).append(item_id)
+        self._positions[item_id] = position
+
+    def remove(self, item_id: Hashable) -> bool:
+        position = self._positions.pop(item_id, None)
+        if position is None:
+            return False
+        cell = self._cell(*position)
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.remove(item_id)
+            if not bucket:
+                del self._cells[cell]
+        return True
+
+    def clear(self):
+        self._cells.clear()
+        self._positions.clear()
+
+    def copy(self) -> "GridIndex":
+        """Bağımsız kopya (hücre listeleri ve konumlar kopyalanır; yayınlanan nesiller için)"""
+        other = GridIndex(self.cell_size)
+        other._cells = {cell: list(bucket) for cell, bucket in self._cells.items()}
+        other._positions = dict(self._positions)
+        return other
+
+    def _columns(self, longitude: float, dlon: float) -> List[int]:
+        if dlon >= 180.0:
+            return list(range(self._cols))
+        first = int(math.floor((longitude - dlon + 180.0) / self.cell_size))
+        last = int(math.floor((longitude + dlon + 180.0) / self.cell_size))
+        if last - first + 1 >= self._cols:
+            return list(range(self._cols))
+        return [col % self._cols for col in range(first, last + 1)]
+
+    def _scan(self, min_lat: float, max_lat: float, columns: List[int]):
+        """Satır aralığı ve sütunlardaki öğeleri (id, lat, lon) olarak üretir"""
+        positions = self._positions
+        for row in range(self._row(min_lat), self._row(max_lat) + 1):
+            base = row * self._cols
+            for col in columns:
+                bucket = self._cells.get(base + col)
+                if bucket:
+                    for item_id in bucket:
+                        latitude, longitude = positions[item_id]
+                        yield item_id, latitude, longitude
+
+    def _box(self, latitude: float, longitude: float, tolerance: float):
+        columns = self._columns(longitude, tolerance)
+        for item_id, lat, lon in self._scan(latitude - tolerance, latitude + tolerance, columns):
+            dlon = abs(lon - longitude) % 360.0
+            if abs(lat - latitude) < tolerance and min(dlon, 360.0 - dlon) < tolerance:
+                yield item_id
+
+    def within_box(self, latitude: float, longitude: float, tolerance: float) -> List[Hashable]:
+        """Her iki eksende de tolerance dereceden yakın öğeler"""
+        return list(self._box(latitude, longitude, tolerance))
+
+    def any_within_box(self, latitude: float, longitude: float, tolerance: float) -> bool:
+        """within_box ile aynı koşul; ilk eşleşmede durur"""
+        for _ in self._box(latitude, longitude, tolerance):
+            return True
+        return False
+
+    def _radius_window(self, latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, List[int]]:
+        """Yarıçapı kapsayan satır aralığı (enlem) ve sütunlar"""
+        angular = radius_km / EARTH_RADIUS_KM
+        dlat = math.degrees(angular)
+
+        # Küresel başlığın boylam genişliği: asin(sin(δ) / cos(φ)); kutba taşıyorsa tüm sütunlar
+        cos_lat = math.cos(math.radians(latitude))
+        if angular >= math.pi / 2 or math.sin(angular) >= cos_lat or latitude + dlat >= 90 or latitude - dlat <= -90:
+            dlon = 180.0
+        else:
+            dlon = math.degrees(math.asin(math.sin(angular) / cos_lat))
+        return latitude - dlat, latitude + dlat, self._columns(longitude, dlon)
+
+    def cell_of(self, latitude: float, longitude: float) -> int:
+        """Koordinatın düştüğü hücre numarası"""
+        return self._cell(latitude, longitude)
+
+    def cover_radius(self, latitude: float, longitude: float,
+                     radius_km: float) -> Tuple[List[int], List[Hashable]]:
+        """
+        Yarıçapı hücrelere ayırır: tamamen içeride kalan dolu hücreler ve yarıçapı kesen (sınır)
+        hücrelerdeki öğeler. İç hücrelerin öğelerine bakılmaz; sınır öğelerinin mesafesi çağırana kalır.
+        Bir enlem/boylam hücresinin merkeze en uzak noktası köşelerinden biridir; dört köşe de
+        yarıçap içindeyse hücre tamamen içeridedir. (Hücre merkezin karşı meridyenini içeriyorsa
+        bu geçerli değildir; bu yüzden yarım küreden büyük yarıçaplarda tüm hücreler sınır sayılır.)
+        """
+        min_lat, max_lat, columns = self._radius_window(latitude, longitude, radius_km)
+        shortcut = radius_km < EARTH_RADIUS_KM * math.pi / 2
+        inside: List[int] = []
+        boundary: List[Hashable] = []
+        size = self.cell_size
+        for row in range(self._row(min_lat), self._row(max_lat) + 1):
+            south = row * size - 90.0
+            north = min(90.0, south + size)
+            for col in columns:
+                cell = row * self._cols + col
+                bucket = self._cells.get(cell)
+                if not bucket:
+                    continue
+                west = col * size - 180.0
+                east = west + size
+                if (shortcut
+                        and haversine_km(latitude, longitude, south, west) <= radius_km
+                        and haversine_km(latitude, longitude, south, east) <= radius_km
+                        and haversine_km(latitude, longitude, north, west) <= radius_km
+                        and haversine_km(latitude, longitude, north, east) <= radius_km):
+                    inside.append(cell)
+                else:
+                    boundary.extend(bucket)
+        return inside, boundary
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[float, Hashable]]:
+        """radius_km içindeki öğeleri (mesafe, id) olarak yakından uzağa sıralı döndürür"""
+        min_lat, max_lat, columns = self._radius_window(latitude, longitude, radius_km)
+
+        result = []
+        for item_id, lat, lon in self._scan(min_lat, max_lat, columns):
+            distance = haversine_km(latitude, longitude, lat, lon)
+            if distance <= radius_km:
+                result.append((distance, item_id))
+        result.sort(key=lambda pair: pair[0])
+        return result
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1,
+                max_distance_km: Optional[float] = None) -> List[Tuple[float, Hashable]]:
+        """En yakın k öğe; arama yarıçapı k öğe bulunana kadar ikiye katlanarak büyütülür"""
+        if k <= 0 or not self._positions:
+            return []
+
+        limit = math.pi * EARTH_RADIUS_KM if max_distance_km is None else max_distance_km
+        radius = min(limit, self.cell_size * 111.2)
+        while True:
+            found = self.within_radius(latitude, longitude, radius)
+            # Yarıçap içindeki k öğe, dışarıdaki her öğeden yakındır
+            if len(found) >= k or radius >= limit:
+                return found[:k]
+            radius = min(limit, radius * 2)
+
+    def stats(self) -> Dict[str, float]:
+        occupied = len(self._cells)
+        return {
+            "cell_size_degrees": self.cell_size,
+            "items": len(self._positions),
+            "occupied_cells": occupied,
+            "avg_items_per_cell": round(len(self._positions) / occupied, 2) if occupied else 0
+        }
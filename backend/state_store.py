@@ -0,0 +1,233 @@
+"""
+Aynı makinedeki birden fazla uvicorn worker'ı arasında sensör durumunun paylaşımı.
+
+Worker'lardan biri dosya kilidiyle (flock) lider seçilir; veri çekme döngüsünü yalnızca lider çalıştırır
+ve durumu paylaşılan bellekteki (varsayılan /dev/shm, tmpfs) bir dosyaya yayınlar. Diğer worker'lar
+dosya değiştikçe yeni durumu yükler. Lider süreç ölürse çekirdek kilidi bırakır ve bir takipçi liderliği alır.
+Takipçilere gelen yazmalar (manuel girişler, kuyruktan gelen ölçümler) yerelde uygulanmaz; yalnızca gelen kutusu
+dizinine yazılır, lider bunları uygulayıp yayınlar ve bir senkron turu sonra tüm worker'larda görünür.
+
+STATE_STORE=local (varsayılan): tek süreç, paylaşım yok.
+STATE_STORE=shared: STATE_STORE_DIR altında paylaşılan durum (uvicorn --workers N).
+"""
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sensor_registry import SENSOR_FIELDS, Sensor, SensorRegistry
+from snapshot import load_snapshot, save_snapshot
+from timeseries import TimeSeriesStore
+
+logger = logging.getLogger("state_store")
+
+
+class LocalStateStore:
+    """Tek süreçli çalışma: süreç her zaman liderdir, yayınlama ve yenileme yapılmaz"""
+
+    kind = "local"
+
+    def __init__(self):
+        self.is_leader = False
+
+    def acquire_leadership(self) -> bool:
+        self.is_leader = True
+        return True
+
+    def allocate_id(self, registry: SensorRegistry, start: int) -> int:
+        return registry.allocate_id(start)
+
+    def publish(self, registry: SensorRegistry, readings: TimeSeriesStore) -> Optional[Dict[str, Any]]:
+        return None
+
+    def refresh(self, registry: SensorRegistry, readings: TimeSeriesStore) -> Optional[Dict[str, Any]]:
+        return None
+
+    def submit(self, sensor: Optional[Sensor], record: Optional[Dict[str, Any]] = None):
+        pass
+
+    def drain(self, registry: SensorRegistry, readings: TimeSeriesStore) -> int:
+        return 0
+
+    def close(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "is_leader": self.is_leader, "pid": os.getpid()}
+
+
+class SharedStateStore(LocalStateStore):
+    """
+    directory altındaki dosyalar:
+      leader.lock  lider kilidi (süreç açık tuttuğu sürece lider)
+      state.npz    liderin yayınladığı son durum (snapshot.py biçimi, atomik olarak değiştirilir)
+      ids          worker'lar arası ortak manuel kimlik sayacı (ids.lock ile korunur)
+      inbox/       takipçilerden lidere iletilen yazmalar (dosya başına bir JSON)
+    """
+
+    kind = "shared"
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        self.state_path = os.path.join(directory, "state.npz")
+        self.inbox = os.path.join(directory, "inbox")
+        os.makedirs(self.inbox, exist_ok=True)
+
+        self._leader_fd: Optional[int] = None
+        self._seen: Optional[Tuple[int, int]] = None  # Yüklenen state.npz'nin (inode, mtime_ns) değeri
+        self._published: Optional[Tuple[int, int]] = None  # Son yayınlanan (kayıt sürümü, ölçüm sayacı)
+        self._submitted = 0
+
+        self.publishes = 0
+        self.refreshes = 0
+        self.forwarded = 0
+        self.applied = 0
+
+    # --- Liderlik ---
+
+    def acquire_leadership(self) -> bool:
+        """Kilidi almayı bekletmeden dener; alınırsa süreç kapanana kadar lider kalır"""
+        if self._leader_fd is not None:
+            return True
+        fd = os.open(os.path.join(self.directory, "leader.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._leader_fd = fd
+        self.is_leader = True
+        return True
+
+    def close(self):
+        if self._leader_fd is not None:
+            fcntl.flock(self._leader_fd, fcntl.LOCK_UN)
+            os.close(self._leader_fd)
+            self._leader_fd = None
+            self.is_leader = False
+
+    # --- Kimlik ---
+
+    def allocate_id(self, registry: SensorRegistry, start: int) -> int:
+        """Tüm worker'larda tekil kimlik: ortak sayaç dosyası kilit altında artırılır"""
+        with open(os.path.join(self.directory, "ids.lock"), "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            path = os.path.join(self.directory, "ids")
+            try:
+                with open(path) as handle:
+                    current = int(handle.read().strip() or 0)
+            except (OSError, ValueError):
+                current = 0
+            # Yerel kayıt defterindeki kimliklerin de üzerine çık
+            sensor_id = max(current + 1, registry.allocate_id(start))
+            with open(path, "w") as handle:
+                handle.write(str(sensor_id))
+        return sensor_id
+
+    # --- Lider: yayınlama ---
+
+    def publish(self, registry: SensorRegistry, readings: TimeSeriesStore) -> Optional[Dict[str, Any]]:
+        """Durum son yayından beri değiştiyse state.npz'ye yazar (bloke edici)"""
+        marker = (registry.version, readings.appended + readings.expired)
+        if marker == self._published:
+            return None
+        result = save_snapshot(self.state_path, registry, readings)
+        self._published = marker
+        self.publishes += 1
+        return result
+
+    def drain(self, registry: SensorRegistry, readings: TimeSeriesStore) -> int:
+        """Takipçilerden gelen yazmaları uygular (bloke edici); uygulanan yazma sayısı"""
+        applied = 0
+        for name in sorted(os.listdir(self.inbox)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.inbox, name)
+            try:
+                with open(path) as handle:
+                    entry = json.load(handle)
+                if entry.get("sensor"):
+                    registry.upsert(Sensor(**entry["sensor"]))
+                if entry.get("record"):
+                    readings.append_record(entry["record"])
+                applied += 1
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"İletilen yazma uygulanamadı ({name}): {str(e)}")
+            finally:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self.applied += applied
+        return applied
+
+    # --- Takipçi: yenileme ve iletme ---
+
+    def refresh(self, registry: SensorRegistry, readings: TimeSeriesStore) -> Optional[Dict[str, Any]]:
+        """
+        state.npz değiştiyse verilen (boş) kayıt defteri ve tampona yükler; değişmediyse None.
+        Çağıran, yükleme sonrası yeni nesneleri mevcutların yerine koyar.
+        """
+        try:
+            stat = os.stat(self.state_path)
+        except OSError:
+            return None
+        marker = (stat.st_ino, stat.st_mtime_ns)
+        if marker == self._seen:
+            return None
+
+        result = load_snapshot(self.state_path, registry, readings)
+        if result["status"] == "loaded":
+            self._seen = marker
+            self.refreshes += 1
+            return result
+        return None
+
+    def submit(self, sensor: Optional[Sensor], record: Optional[Dict[str, Any]] = None):
+        """
+        Takipçideki yazmayı gelen kutusuna bırakır; lider sonraki yayından önce uygular.
+        sensor None ise yalnızca ölçüm (record) iletilir.
+        """
+        if self.is_leader:
+            return
+        self._submitted += 1
+        entry = {
+            "sensor": {name: getattr(sensor, name) for name in SENSOR_FIELDS} if sensor is not None else None,
+            "record": record,
+            "submitted_at": time.time()
+        }
+        # Önce geçici dosyaya yaz, sonra adlandır: lider yarım dosya okumaz
+        fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=self.inbox)
+        with os.fdopen(fd, "w") as handle:
+            json.dump(entry, handle, default=str)
+        os.replace(temp_path, os.path.join(self.inbox, f"{time.time_ns()}-{os.getpid()}-{self._submitted}.json"))
+        self.forwarded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update({
+            "directory": self.directory,
+            "publishes": self.publishes,
+            "refreshes": self.refreshes,
+            "forwarded": self.forwarded,
+            "applied": self.applied,
+            "pending_inbox": len([name for name in os.listdir(self.inbox) if name.endswith(".json")])
+        })
+        return stats
+
+
+def create_state_store() -> LocalStateStore:
+    """STATE_STORE ortam değişkenine göre durum deposunu oluşturur"""
+    kind = os.getenv("STATE_STORE", "local")
+    if kind == "shared":
+        return SharedStateStore(os.getenv("STATE_STORE_DIR", "/dev/shm/air-quality"))
+    if kind != "local":
+        logger.warning(f"Bilinmeyen STATE_STORE değeri: {kind}, local kullanılıyor")
+    return LocalStateStore()
@@ -0,0 +1,200 @@
+"""
+Ham ölçüm hypertable'ları için TimescaleDB sıkıştırma ve saklama (retention) politikaları, ve depolama raporu.
+
+Sıkıştırma konuma göre segmentlenir (latitude, longitude) ve zamana göre sıralanır; aynı sensörün
+ardışık değerleri birlikte saklandığı için oran yüksektir ve konum filtreli sorgular yalnızca ilgili segmentleri açar.
+Saklama yalnızca ham tablolara uygulanır; saatlik/günlük özetler (rollups.py) süresiz tutulur.
+Politikalar hypertable'a bağlıdır: air_quality_data'yı database.ensure_hypertable çevirir ve main.py bu
+fonksiyonu yalnızca dönüşüm başarılıysa çağırır; yine de hypertable olmayan tabloya politika eklenmez, uyarı yazılır.
+"""
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+import rollups
+
+logger = logging.getLogger("storage_policies")
+
+# Politika uygulanacak ham tablolar (zaman sütunu her ikisinde de "timestamp")
+RAW_TABLES = ("air_quality_data", "air_quality_measurements")
+
+
+def _days(name: str, default: str) -> Optional[int]:
+    """Gün sayısı ortam değişkeni; boş veya 0 ise devre dışı (None)"""
+    value = os.getenv(name, default).strip()
+    return int(value) if value and int(value) > 0 else None
+
+
+# Bu kadar günden eski chunk'lar sıkıştırılır (boş bırakılırsa devre dışı)
+COMPRESS_AFTER_DAYS = _days("DB_COMPRESS_AFTER_DAYS", "7")
+# Bu kadar günden eski ham veri silinir (boş bırakılırsa devre dışı; özet görünümleri etkilenmez)
+RAW_RETENTION_DAYS = _days("DB_RAW_RETENTION_DAYS", "")
+
+status: Dict[str, Any] = {"checked_at": None, "tables": {}}
+
+
+def _min_retention_days() -> int:
+    """Saklama süresi özetlerin yenileme penceresinden uzun olmalı; yoksa silinen ham veri özetten de düşer"""
+    # VIEWS'taki yenileme başlangıçları gün cinsindendir ("3 days", "7 days")
+    return max(int(start_offset.split()[0]) for _, start_offset, _ in rollups.VIEWS.values()) + 1
+
+
+def _hypertables(conn) -> Dict[str, bool]:
+    """Ham tablolardan hypertable olanlar -> sıkıştırma etkin mi"""
+    rows = conn.execute(
+        text("SELECT hypertable_name, compression_enabled FROM timescaledb_information.hypertables "
+             "WHERE hypertable_name = ANY(:tables)"),
+        {"tables": list(RAW_TABLES)}
+    )
+    return {row[0]: bool(row[1]) for row in rows}
+
+
+def ensure_storage_policies(engine) -> Dict[str, Any]:
+    """Sıkıştırma ve saklama politikalarını ekler (zaten varsa dokunmaz). Bloke edicidir."""
+    global status
+    tables: Dict[str, Any] = {}
+    try:
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            if conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")).first() is None:
+                status = {"checked_at": datetime.now().isoformat(), "reason": "timescaledb_missing", "tables": {}}
+                return status
+            hypertables = _hypertables(conn)
+
+            for table in RAW_TABLES:
+                if table not in hypertables:
+                    logger.warning(f"{table} bir hypertable değil, sıkıştırma ve saklama politikaları eklenmedi "
+                                   "(birincil anahtar timestamp sütununu içermeli)")
+                    tables[table] = {"hypertable": False}
+                    continue
+                result: Dict[str, Any] = {"hypertable": True, "compression": None, "retention": None}
+
+                if COMPRESS_AFTER_DAYS:
+                    if not hypertables[table]:
+                        conn.execute(text(
+                            f"ALTER TABLE {table} SET (timescaledb.compress, "
+                            f"timescaledb.compress_segmentby = 'latitude, longitude', "
+                            f"timescaledb.compress_orderby = '\"timestamp\" DESC')"
+                        ))
+                    conn.execute(
+                        text(f"SELECT add_compression_policy('{table}', "
+                             f"INTERVAL '{COMPRESS_AFTER_DAYS} days', if_not_exists => TRUE)")
+                    )
+                    result["compression"] = f"{COMPRESS_AFTER_DAYS} days"
+
+                if RAW_RETENTION_DAYS:
+                    if RAW_RETENTION_DAYS < _min_retention_days():
+                        logger.warning(f"DB_RAW_RETENTION_DAYS={RAW_RETENTION_DAYS} özetlerin yenileme penceresinden kısa, "
+                                       f"saklama politikası eklenmedi (en az {_min_retention_days()} gün)")
+                        result["retention"] = "skipped"
+                    else:
+                        conn.execute(
+                            text(f"SELECT add_retention_policy('{table}', "
+                                 f"INTERVAL '{RAW_RETENTION_DAYS} days', if_not_exists => TRUE)")
+                        )
+                        result["retention"] = f"{RAW_RETENTION_DAYS} days"
+
+                tables[table] = result
+                logger.info(f"{table} depolama politikaları: sıkıştırma {result['compression']}, saklama {result['retention']}")
+    except Exception as e:
+        logger.warning(f"Depolama politikaları eklenemedi: {str(e)}")
+        status = {"checked_at": datetime.now().isoformat(), "error": str(e), "tables": tables}
+        return status
+
+    status = {"checked_at": datetime.now().isoformat(), "tables": tables}
+    return status
+
+
+def _chunk_rows(conn, table: str) -> List[Dict[str, Any]]:
+    rows = conn.execute(text("""
+        SELECT c.chunk_name,
+               c.range_start,
+               c.range_end,
+               c.is_compressed,
+               s.total_bytes,
+               cs.before_compression_total_bytes,
+               cs.after_compression_total_bytes
+        FROM timescaledb_information.chunks c
+        LEFT JOIN chunks_detailed_size(CAST(:table AS regclass)) s ON s.chunk_name = c.chunk_name
+        LEFT JOIN chunk_compression_stats(CAST(:table AS regclass)) cs ON cs.chunk_name = c.chunk_name
+        WHERE c.hypertable_name = :table
+        ORDER BY c.range_start
+    """), {"table": table}).mappings()
+
+    chunks = []
+    for row in rows:
+        before = row["before_compression_total_bytes"]
+        after = row["after_compression_total_bytes"]
+        chunks.append({
+            "chunk": row["chunk_name"],
+            "range_start": row["range_start"].isoformat() if row["range_start"] else None,
+            "range_end": row["range_end"].isoformat() if row["range_end"] else None,
+            "compressed": bool(row["is_compressed"]),
+            "total_bytes": row["total_bytes"],
+            "before_compression_bytes": before,
+            "after_compression_bytes": after,
+            "compression_ratio": round(before / after, 2) if before and after else None
+        })
+    return chunks
+
+
+def storage_report(engine) -> Dict[str, Any]:
+    """Ham tabloların chunk boyutları ve sıkıştırma oranları, özet görünümlerinin boyutları. Bloke edicidir."""
+    report: Dict[str, Any] = {"tables": {}, "rollups": {}, "jobs": [], "policies": status}
+    with engine.connect() as conn:
+        timescale = conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")).first() is not None
+        hypertables = _hypertables(conn) if timescale else {}
+
+        for table in RAW_TABLES:
+            exists = conn.execute(text("SELECT to_regclass(:table) IS NOT NULL"), {"table": table}).scalar()
+            if not exists:
+                continue
+            if table not in hypertables:
+                report["tables"][table] = {
+                    "hypertable": False,
+                    "total_bytes": conn.execute(text("SELECT pg_total_relation_size(CAST(:table AS regclass))"),
+                                                {"table": table}).scalar()
+                }
+                continue
+
+            chunks = _chunk_rows(conn, table)
+            before = sum(chunk["before_compression_bytes"] or 0 for chunk in chunks)
+            after = sum(chunk["after_compression_bytes"] or 0 for chunk in chunks)
+            report["tables"][table] = {
+                "hypertable": True,
+                "compression_enabled": hypertables[table],
+                "total_bytes": conn.execute(text("SELECT hypertable_size(CAST(:table AS regclass))"),
+                                            {"table": table}).scalar(),
+                "chunk_count": len(chunks),
+                "compressed_chunks": sum(1 for chunk in chunks if chunk["compressed"]),
+                "compression_ratio": round(before / after, 2) if before and after else None,
+                "chunks": chunks
+            }
+
+        if timescale:
+            for row in conn.execute(text("""
+                SELECT view_name,
+                       hypertable_size(format('%I.%I', materialization_hypertable_schema,
+                                              materialization_hypertable_name)::regclass) AS total_bytes
+                FROM timescaledb_information.continuous_aggregates
+            """)).mappings():
+                report["rollups"][row["view_name"]] = {"total_bytes": row["total_bytes"]}
+
+            for row in conn.execute(text("""
+                SELECT job_id, proc_name, hypertable_name, schedule_interval, config, next_start
+                FROM timescaledb_information.jobs
+                WHERE proc_name IN ('policy_compression', 'policy_retention', 'policy_refresh_continuous_aggregate')
+                ORDER BY job_id
+            """)).mappings():
+                report["jobs"].append({
+                    "job_id": row["job_id"],
+                    "type": row["proc_name"],
+                    "table": row["hypertable_name"],
+                    "schedule_interval": str(row["schedule_interval"]),
+                    "config": row["config"],
+                    "next_start": row["next_start"].isoformat() if row["next_start"] else None
+                })
+    return report
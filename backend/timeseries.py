@@ -0,0 +1,326 @@
+"""
+Sensör başına kapasitesi sınırlı, NumPy tabanlı zaman serisi halka tamponları.
+air_quality_data listesinin yerini alır: ekleme O(1), süre aşımı amorti O(1), zaman penceresi okuması kopyasız.
+"""
+import math
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Tamponlarda tutulan ölçümler (sütun sırası)
+FIELDS = ("pm25", "pm10", "no2", "so2", "o3", "co", "aqi")
+FIELD_INDEX = {name: i for i, name in enumerate(FIELDS)}
+
+
+def to_epoch(timestamp: Any) -> float:
+    """ISO metin, datetime veya sayıyı epoch saniyeye çevirir"""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    if isinstance(timestamp, str):
+        return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+    return datetime.now().timestamp()
+
+
+class SensorRingBuffer:
+    """
+    Tek bir sensörün son `capacity` ölçümü.
+    Her değer hem i hem i+slots konumuna yazılır (çift yazma); böylece mantıksal içerik
+    her zaman bitişik bir dilimdir ve pencere okumaları kopya yerine görünüm (view) döndürür.
+    Tampon initial_capacity yuvayla başlar ve dolunca capacity'ye kadar iki katına çıkar
+    (saatte bir ölçüm alan sensör 512 yuvalık bellek ayırmaz); büyütme bitişik dilimin kopyasıdır.
+    Zaman damgaları artan sırada tutulur.
+    """
+
+    __slots__ = ("capacity", "slots", "timestamps", "values", "_start", "_size")
+
+    def __init__(self, capacity: int, initial_capacity: int = 8):
+        self.capacity = capacity
+        self.slots = max(1, min(capacity, initial_capacity))  # Şu an ayrılmış yuva sayısı
+        self.timestamps = np.zeros(2 * self.slots, dtype=np.float64)
+        self.values = np.full((2 * self.slots, len(FIELDS)), np.nan, dtype=np.float64)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self, needed: int):
+        """Yuva sayısını needed'i karşılayana kadar (en fazla capacity) iki katına çıkarır"""
+        slots = self.slots
+        while slots < needed and slots < self.capacity:
+            slots = min(self.capacity, slots * 2)
+        if slots == self.slots:
+            return
+        timestamps = np.zeros(2 * slots, dtype=np.float64)
+        values = np.full((2 * slots, len(FIELDS)), np.nan, dtype=np.float64)
+        size = self._size
+        timestamps[:size] = timestamps[slots:slots + size] = self.timestamps[self._start:self._start + size]
+        values[:size] = values[slots:slots + size] = self.values[self._start:self._start + size]
+        self.timestamps, self.values, self.slots, self._start = timestamps, values, slots, 0
+
+    def _set(self, position: int, timestamp: float, row: np.ndarray):
+        index = (self._start + position) % self.slots
+        self.timestamps[index] = self.timestamps[index + self.slots] = timestamp
+        self.values[index] = self.values[index + self.slots] = row
+
+    def _drop_oldest(self, count: int = 1):
+        count = min(count, self._size)
+        self._start = (self._start + count) % self.slots
+        self._size -= count
+
+    def append(self, timestamp: float, row: np.ndarray):
+        """Ölçüm ekler; tampon capacity'ye ulaştıysa en eskisinin üzerine yazar"""
+        if self._size and timestamp <= self.timestamps[self._start + self._size - 1]:
+            self._insert_past(timestamp, row)
+            return
+
+        if self._size == self.slots:
+            self._grow(self._size + 1)
+        if self._size == self.slots:
+            self._drop_oldest()
+        self._set(self._size, timestamp, row)
+        self._size += 1
+
+    def _insert_past(self, timestamp: float, row: np.ndarray):
+        """Sırası bozuk gelen ölçümü doğru yere koyar (aynı zaman damgası varsa üzerine yazar)"""
+        timestamps = self.timestamps[self._start:self._start + self._size]
+        position = int(np.searchsorted(timestamps, timestamp, side="left"))
+        if position < self._size and timestamps[position] == timestamp:
+            self._set(position, timestamp, row)
+            return
+
+        if self._size == self.slots:
+            self._grow(self._size + 1)
+        if self._size == self.slots:
+            if position == 0:
+                return  # Tampondaki en eski ölçümden de eski
+            self._drop_oldest()
+            position -= 1
+
+        # Sonraki ölçümleri bir kaydır (genelde yalnızca son birkaç kayıt)
+        for i in range(self._size, position, -1):
+            source = self._start + i - 1
+            self._set(i, self.timestamps[source], self.values[source].copy())
+        self._set(position, timestamp, row)
+        self._size += 1
+
+    def expire(self, cutoff: float) -> int:
+        """cutoff'tan eski ölçümleri atar, atılan sayısını döndürür"""
+        if not self._size or self.timestamps[self._start] >= cutoff:
+            return 0
+        timestamps = self.timestamps[self._start:self._start + self._size]
+        count = int(np.searchsorted(timestamps, cutoff, side="left"))
+        self._drop_oldest(count)
+        return count
+
+    def window(self, since: float = -math.inf, until: float = math.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """[since, until] aralığındaki (zaman damgaları, değerler) görünümleri"""
+        timestamps = self.timestamps[self._start:self._start + self._size]
+        lo = int(np.searchsorted(timestamps, since, side="left"))
+        hi = int(np.searchsorted(timestamps, until, side="right"))
+        return timestamps[lo:hi], self.values[self._start + lo:self._start + hi]
+
+    def latest(self) -> Optional[Tuple[float, np.ndarray]]:
+        if not self._size:
+            return None
+        last = self._start + self._size - 1
+        return float(self.timestamps[last]), self.values[last]
+
+    def load(self, timestamps: np.ndarray, values: np.ndarray):
+        """Tamponu zaman sıralı dizilerle toplu doldurur (kapasiteden fazlasının yalnızca en yenileri tutulur)"""
+        timestamps = timestamps[-self.capacity:]
+        values = values[-self.capacity:]
+        count = len(timestamps)
+        self._start = 0
+        self._size = 0
+        self._grow(count)
+        self.timestamps[:count] = self.timestamps[self.slots:self.slots + count] = timestamps
+        self.values[:count] = self.values[self.slots:self.slots + count] = values
+        self._size = count
+
+
+class TimeSeriesStore:
+    """
+    Sensör kimliği -> halka tampon. Yazmalar RabbitMQ thread'lerinden de gelebildiği için kilitlidir.
+    retention süresinden eski ölçümler ekleme sırasında ilgili tampondan atılır.
+    """
+
+    def __init__(self, capacity: int = 512, retention: float = 24 * 3600, initial_capacity: int = 8):
+        self.capacity = capacity
+        self.initial_capacity = initial_capacity
+        self.retention = retention
+
+        self._buffers: Dict[int, SensorRingBuffer] = {}
+        self._meta: Dict[int, Tuple[str, float, float]] = {}  # sensor_id -> (konum, enlem, boylam)
+        self._lock = threading.Lock()
+
+        self.appended = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    def __contains__(self, sensor_id: int) -> bool:
+        return sensor_id in self._buffers
+
+    def append(self, sensor_id: int, timestamp: float, values: Dict[str, Any],
+               location: Optional[str] = None, latitude: Optional[float] = None, longitude: Optional[float] = None):
+        row = np.full(len(FIELDS), np.nan, dtype=np.float64)
+        for name, value in values.items():
+            index = FIELD_INDEX.get(name)
+            if index is not None and value is not None:
+                row[index] = value
+
+        with self._lock:
+            buffer = self._buffers.get(sensor_id)
+            if buffer is None:
+                buffer = self._buffers[sensor_id] = SensorRingBuffer(self.capacity, self.initial_capacity)
+
+            previous = self._meta.get(sensor_id, ("Unknown", 0.0, 0.0))
+            self._meta[sensor_id] = (
+                location if location is not None else previous[0],
+                float(latitude) if latitude is not None else previous[1],
+                float(longitude) if longitude is not None else previous[2]
+            )
+
+            buffer.append(timestamp, row)
+            self.expired += buffer.expire(timestamp - self.retention)
+            self.appended += 1
+
+    def append_record(self, record: Dict[str, Any]):
+        """air_quality_data biçimindeki bir kaydı (sensor_id, timestamp, ölçümler) ekler"""
+        self.append(
+            record["sensor_id"],
+            to_epoch(record.get("timestamp")),
+            {name: record.get(name) for name in FIELDS},
+            location=record.get("location"),
+            latitude=record.get("latitude"),
+            longitude=record.get("longitude")
+        )
+
+    def remove(self, sensor_id: int):
+        with self._lock:
+            self._buffers.pop(sensor_id, None)
+            self._meta.pop(sensor_id, None)
+
+    def sensor_ids(self) -> List[int]:
+        return list(self._buffers)
+
+    def window(self, sensor_id: int, since: float = -math.inf,
+               until: float = math.inf) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sensörün aralıktaki (zaman damgaları, değerler[n, len(FIELDS)]) görünümleri.
+        Görünümler kopya değildir; sonraki eklemelerde değişebilir, saklanacaksa kopyalanmalıdır.
+        """
+        with self._lock:
+            buffer = self._buffers.get(sensor_id)
+            if buffer is None:
+                return np.empty(0), np.empty((0, len(FIELDS)))
+            return buffer.window(since, until)
+
+    def _row(self, sensor_id: int, timestamp: float, values: np.ndarray) -> Dict[str, Any]:
+        location, latitude, longitude = self._meta[sensor_id]
+        row = {
+            "sensor_id": sensor_id,
+            "location": location,
+            "latitude": latitude,
+            "longitude": longitude,
+            "timestamp": datetime.fromtimestamp(timestamp).isoformat()
+        }
+        for name, value in zip(FIELDS, values.tolist()):
+            if not math.isnan(value):
+                row[name] = int(value) if name == "aqi" else value
+        return row
+
+    def latest_row(self, sensor_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            buffer = self._buffers.get(sensor_id)
+            latest = buffer.latest() if buffer is not None else None
+            return self._row(sensor_id, *latest) if latest else None
+
+    def rows(self, since: float = -math.inf, until: float = math.inf,
+             sensor_ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """Aralıktaki ölçümleri API yanıtı için dict listesine dönüştürür (sensör sensör, zaman sıralı)"""
+        result = []
+        with self._lock:
+            ids = self._buffers.keys() if sensor_ids is None else sensor_ids
+            for sensor_id in ids:
+                buffer = self._buffers.get(sensor_id)
+                if buffer is None:
+                    continue
+                timestamps, values = buffer.window(since, until)
+                for timestamp, row in zip(timestamps.tolist(), values):
+                    result.append(self._row(sensor_id, timestamp, row))
+        return result
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Tüm tamponları düz dizilere döker (anlık görüntü için).
+        Ölçümler sensör sensör, zaman sıralı; sensörün satırları offsets[i]:offsets[i+1] aralığındadır.
+        """
+        with self._lock:
+            ids = list(self._buffers)
+            windows = [self._buffers[sensor_id].window() for sensor_id in ids]
+            meta = [self._meta[sensor_id] for sensor_id in ids]
+            sizes = [len(timestamps) for timestamps, _ in windows]
+            timestamps = np.concatenate([timestamps for timestamps, _ in windows]) if ids else np.empty(0)
+            values = np.concatenate([values for _, values in windows]) if ids else np.empty((0, len(FIELDS)))
+
+        return {
+            "ids": np.array(ids, dtype=np.int64),
+            "offsets": np.concatenate(([0], np.cumsum(sizes))).astype(np.int64),
+            "locations": np.array([location for location, _, _ in meta], dtype=np.str_),
+            "latitudes": np.array([latitude for _, latitude, _ in meta], dtype=np.float64),
+            "longitudes": np.array([longitude for _, _, longitude in meta], dtype=np.float64),
+            "timestamps": timestamps,
+            "values": values
+        }
+
+    def load_arrays(self, arrays: Dict[str, np.ndarray]) -> int:
+        """to_arrays() çıktısını tamponlara yükler (sensörün mevcut tamponu değiştirilir); yüklenen ölçüm sayısı"""
+        offsets = arrays["offsets"].tolist()
+        loaded = 0
+        with self._lock:
+            for i, sensor_id in enumerate(arrays["ids"].tolist()):
+                start, end = offsets[i], offsets[i + 1]
+                if start == end:
+                    continue
+                buffer = self._buffers[sensor_id] = SensorRingBuffer(self.capacity, self.initial_capacity)
+                buffer.load(arrays["timestamps"][start:end], arrays["values"][start:end])
+                self._meta[sensor_id] = (
+                    str(arrays["locations"][i]),
+                    float(arrays["latitudes"][i]),
+                    float(arrays["longitudes"][i])
+                )
+                loaded += len(buffer)
+        return loaded
+
+    def expire_all(self, now: Optional[float] = None) -> int:
+        """Tüm tamponlardan süresi dolanları atar; boşalan tamponları siler"""
+        cutoff = (datetime.now().timestamp() if now is None else now) - self.retention
+        removed = 0
+        with self._lock:
+            for sensor_id in list(self._buffers):
+                buffer = self._buffers[sensor_id]
+                removed += buffer.expire(cutoff)
+                if not len(buffer):
+                    del self._buffers[sensor_id]
+                    del self._meta[sensor_id]
+            self.expired += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sensors": len(self._buffers),
+            "readings": len(self),
+            "capacity_per_sensor": self.capacity,
+            "allocated_slots": sum(buffer.slots for buffer in self._buffers.values()),
+            "retention_hours": round(self.retention / 3600, 2),
+            "appended": self.appended,
+            "expired": self.expired,
+            "bytes": sum(buffer.timestamps.nbytes + buffer.values.nbytes for buffer in self._buffers.values())
+        }
@@ -0,0 +1,115 @@
+"""
+Boyutu ve bellek kullanımı sınırlı LRU + TTL önbellek
+"""
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def estimate_size(value: Any) -> int:
+    """Değerin yaklaşık bellek kullanımını (byte) hesaplar"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+class TTLCache:
+    """
+    En az kullanılan (LRU) kayıtları atan, süresi dolan kayıtları temizleyen önbellek.
+    Kayıt sayısı max_entries, toplam tahmini boyut max_bytes ile sınırlıdır.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 120, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # key -> (expires_at, size, value)
+        self._data: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.time()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, _, value = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        if key in self._data:
+            self._remove(key)
+
+        size = estimate_size(value)
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, size, value)
+        self._bytes += size
+
+        # Sınırlar aşıldıysa en eski kullanılanlardan başlayarak at
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            oldest_key = next(iter(self._data))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        if key not in self._data:
+            return default
+        value = self._data[key][2]
+        self._remove(key)
+        return value
+
+    def purge_expired(self) -> int:
+        """Süresi dolmuş tüm kayıtları siler, silinen kayıt sayısını döndürür"""
+        now = time.time()
+        expired = [key for key, (expires_at, _, _) in self._data.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+
+    def _remove(self, key: str):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
@@ -2,8 +2,9 @@
 CREATE EXTENSION IF NOT EXISTS timescaledb CASCADE;
 
 -- Create air quality measurements table
+-- (Hypertable'daki tekil kısıtlar zaman sütununu içermeli; birincil anahtar (id, timestamp))
 CREATE TABLE IF NOT EXISTS air_quality_measurements (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     timestamp TIMESTAMPTZ NOT NULL,
     latitude DOUBLE PRECISION NOT NULL,
     longitude DOUBLE PRECISION NOT NULL,
@@ -12,11 +13,12 @@ CREATE TABLE IF NOT EXISTS air_quality_measurements (
     no2 DOUBLE PRECISION,
     so2 DOUBLE PRECISION,
     o3 DOUBLE PRECISION,
-    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp)
 );
 
 -- Convert to hypertable
-SELECT create_hypertable('air_quality_measurements', 'timestamp');
+SELECT create_hypertable('air_quality_measurements', 'timestamp', if_not_exists => TRUE);
 
 -- Create index for geospatial queries
 CREATE INDEX idx_air_quality_location 
@@ -29,7 +31,7 @@ ON air_quality_measurements (timestamp DESC);
 -- Create anomalies table
 CREATE TABLE IF NOT EXISTS anomalies (
     id SERIAL PRIMARY KEY,
-    measurement_id INTEGER REFERENCES air_quality_measurements(id),
+    measurement_id INTEGER,
     parameter VARCHAR(10) NOT NULL,
     threshold_value DOUBLE PRECISION NOT NULL,
     actual_value DOUBLE PRECISION NOT NULL,